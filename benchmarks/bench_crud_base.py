@@ -0,0 +1,111 @@
+"""Per-call cost of CRUDBase.create and CRUDBase.update
+
+Compares current implementation, with column metadata computed once per CRUD object,
+with the previous one, which used `jsonable_encoder` in `create`
+and walked all mapper attributes in `update`.
+
+Run: python benchmarks/bench_crud_base.py
+"""
+import datetime
+import timeit
+from typing import Any, Callable, Dict, Optional, Union
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel  # pylint: disable=no-name-in-module
+from sqlalchemy import Column, DateTime, Integer, String
+
+from fastapi_starter.crud import CRUDBase
+from fastapi_starter.db import Base
+
+NUMBER = 20_000
+
+
+class Hero(Base):
+    __tablename__ = "bench_hero"
+
+    id: int = Column(Integer, primary_key=True)
+    name: str = Column(String(256), nullable=False)
+    secret_name: str = Column(String(256), nullable=False)
+    age = Column(Integer, nullable=True)
+    team = Column(String(256), nullable=True)
+    city = Column(String(256), nullable=True)
+    created_date = Column(DateTime, nullable=False)
+    updated_date = Column(DateTime, nullable=True)
+
+
+class HeroCreate(BaseModel):
+    name: str
+    secret_name: str
+    age: Optional[int] = None
+    team: Optional[str] = None
+    city: Optional[str] = None
+    created_date: datetime.datetime
+
+
+class HeroUpdate(BaseModel):
+    name: Optional[str] = None
+    age: Optional[int] = None
+
+
+class Session:
+    """Stand-in for SQLAlchemy session, so only CRUDBase overhead is measured."""
+
+    def add(self, _: Any) -> None:
+        pass
+
+
+def legacy_create(db: Session, obj_in: HeroCreate) -> Hero:
+    db_obj = Hero(**jsonable_encoder(obj_in))
+    db.add(db_obj)
+    return db_obj
+
+
+def legacy_update(db: Session, db_obj: Hero, obj_in: Union[HeroUpdate, Dict[str, Any]]) -> Hero:
+    update_data = obj_in if isinstance(obj_in, dict) else obj_in.dict(exclude_unset=True)
+    for field in db_obj.__mapper__.attrs.keys():  # type: ignore
+        if field in update_data:
+            try:
+                setattr(db_obj, field, update_data[field])
+            except AttributeError:
+                pass
+    db.add(db_obj)
+    return db_obj
+
+
+def _report(name: str, legacy: Callable[[], Any], current: Callable[[], Any]) -> None:
+    legacy_us = min(timeit.repeat(legacy, number=NUMBER, repeat=5)) / NUMBER * 1e6
+    current_us = min(timeit.repeat(current, number=NUMBER, repeat=5)) / NUMBER * 1e6
+    print(
+        f"{name:<8} legacy {legacy_us:7.2f} us/call  current {current_us:7.2f} us/call"
+        f"  speedup {legacy_us / current_us:4.2f}x"
+    )
+
+
+def main() -> None:
+    crud: CRUDBase = CRUDBase(Hero)
+    db: Any = Session()
+    hero_create = HeroCreate(
+        name="Deadpond",
+        secret_name="Dive Wilson",
+        age=30,
+        team="X-Force",
+        city="New York",
+        created_date=datetime.datetime(2022, 5, 18),
+    )
+    hero_update = HeroUpdate(name="Deadpool", age=31)
+    hero_db = Hero(name="Deadpond", secret_name="Dive Wilson")
+
+    _report(
+        "create",
+        lambda: legacy_create(db, hero_create),
+        lambda: crud.create(db, obj_in=hero_create),
+    )
+    _report(
+        "update",
+        lambda: legacy_update(db, hero_db, hero_update),
+        lambda: crud.update(db, db_obj=hero_db, obj_in=hero_update),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Requests per second for a large `response_model` list
+
+Compares FastAPI default serialization (`jsonable_encoder` + stdlib json `JSONResponse`)
+with `FastJSONResponse` (orjson) and with direct serialization of validated `response_model`
+output. Requests are sent straight to the ASGI app, without a server.
+
+Run: python benchmarks/bench_json_responses.py
+"""
+import asyncio
+import datetime
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI
+from pydantic import BaseModel  # pylint: disable=no-name-in-module
+
+from fastapi_starter.responses import (
+    JSONSerializer,
+    enable_direct_serialization,
+    get_json_response_class,
+)
+
+ITEMS = 5_000
+REQUESTS = 30
+
+
+class Power(BaseModel):
+    name: str
+    level: float
+
+
+class Hero(BaseModel):
+    id: uuid.UUID
+    name: str
+    secret_name: str
+    age: Optional[int] = None
+    created_at: datetime.datetime
+    powers: List[Power]
+
+
+HEROES = [
+    Hero(
+        id=uuid.uuid4(),
+        name=f"Hero {i}",
+        secret_name=f"Secret {i}",
+        age=i % 80,
+        created_at=datetime.datetime(2022, 5, 18, 12, 30, 15),
+        powers=[Power(name="swim", level=9.5), Power(name="fly", level=3.0)],
+    )
+    for i in range(ITEMS)
+]
+
+
+def create_app(serializer: JSONSerializer, direct: bool) -> FastAPI:
+    app = FastAPI(default_response_class=get_json_response_class(serializer))
+
+    @app.get("/heroes", response_model=List[Hero])
+    async def read_heroes() -> Any:
+        return HEROES
+
+    if direct:
+        enable_direct_serialization(app)
+    return app
+
+
+def _scope() -> Dict[str, Any]:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/heroes",
+        "raw_path": b"/heroes",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"testserver")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+
+
+async def _request(app: FastAPI) -> int:
+    messages: List[Dict[str, Any]] = []
+
+    async def receive() -> Dict[str, Any]:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Dict[str, Any]) -> None:
+        messages.append(message)
+
+    await app(_scope(), receive, send)
+    assert messages[0]["status"] == 200
+    return len(messages[1]["body"])
+
+
+async def _requests_per_second(app: FastAPI) -> float:
+    await _request(app)
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        await _request(app)
+    return REQUESTS / (time.perf_counter() - start)
+
+
+def main() -> None:
+    variants = [
+        ("json", JSONSerializer.STDLIB, False),
+        ("json direct", JSONSerializer.STDLIB, True),
+        ("orjson", JSONSerializer.ORJSON, False),
+        ("orjson direct", JSONSerializer.ORJSON, True),
+    ]
+    baseline = None
+    print(f"{ITEMS} items per response")
+    for name, serializer, direct in variants:
+        requests_per_second = asyncio.run(_requests_per_second(create_app(serializer, direct)))
+        baseline = baseline or requests_per_second
+        print(
+            f"{name:<14} {requests_per_second:7.1f} req/s"
+            f"  speedup {requests_per_second / baseline:4.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
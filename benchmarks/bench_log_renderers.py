@@ -0,0 +1,71 @@
+"""Log events per second for each production structlog renderer
+
+Compares `KeyValueRenderer(sort_keys=True)` with `LogRenderer.JSON`, serialized
+with stdlib json and with orjson. Full processor chain is used with request context bound,
+but rendered entries go to a `NullHandler`, so output stream is not measured.
+
+Run: python benchmarks/bench_log_renderers.py
+"""
+import json
+import logging
+import timeit
+from typing import Tuple
+
+import structlog
+from structlog.contextvars import bind_contextvars
+from structlog.types import Processor
+
+from fastapi_starter.middleware import LogRenderer
+from fastapi_starter.middleware.logging import (
+    get_json_serializer,
+    get_structlog_processors,
+)
+
+NUMBER = 50_000
+
+
+def _events_per_second(processors: Tuple[Processor, ...]) -> float:
+    structlog.configure(
+        processors=list(processors),
+        context_class=dict,
+        logger_factory=structlog.stdlib.LoggerFactory(),
+        wrapper_class=structlog.stdlib.BoundLogger,
+        cache_logger_on_first_use=True,
+    )
+    logger = structlog.get_logger("bench")
+
+    def log() -> None:
+        logger.info("hero_created", hero_id=42, name="Deadpond", duration_ms=1.5)
+
+    seconds = min(timeit.repeat(log, number=NUMBER, repeat=5))
+    return NUMBER / seconds
+
+
+def main() -> None:
+    stdlib_logger = logging.getLogger("bench")
+    stdlib_logger.setLevel(logging.INFO)
+    stdlib_logger.addHandler(logging.NullHandler())
+    stdlib_logger.propagate = False
+    bind_contextvars(
+        method="GET",
+        path="/api/v1/heroes",
+        remote_addr="127.0.0.1",
+        request_id="4a4c8c1b1f4e4b3e9d6f0b1f6f2d3c4e",
+        scheme="http",
+    )
+    key_value = get_structlog_processors("iso", False, False, LogRenderer.KEY_VALUE)
+    json_processors = get_structlog_processors("iso", False, False, LogRenderer.JSON)
+    stdlib_json = json_processors[:-1] + (structlog.processors.JSONRenderer(),)
+
+    results = [
+        ("key_value", _events_per_second(key_value)),
+        ("json", _events_per_second(stdlib_json)),
+    ]
+    if get_json_serializer() is not json.dumps:
+        results.append(("orjson", _events_per_second(json_processors)))
+    for name, events_per_second in results:
+        print(f"{name:<10} {events_per_second:9.0f} events/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Requests per second through StructlogLoggingMiddleware
+
+Compares current pure ASGI implementation with the previous one,
+which subclassed Starlette's `BaseHTTPMiddleware`.
+Requests are sent straight to the ASGI app, without a server, so only middleware overhead
+and a minimal endpoint are measured.
+
+Run: python benchmarks/bench_logging_middleware.py
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+from asgi_correlation_id import CorrelationIdMiddleware
+from asgi_correlation_id.context import correlation_id
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+from starlette.routing import Route
+from structlog.contextvars import bind_contextvars, clear_contextvars
+
+from fastapi_starter.middleware.logging import StructlogLoggingMiddleware
+
+REQUESTS = 20_000
+
+
+class LegacyStructlogLoggingMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+        clear_contextvars()
+        bind_contextvars(
+            method=request.method,
+            path=request.url.path,
+            remote_addr=request.client.host if request.client else None,
+            request_id=correlation_id.get(),
+            scheme=request.url.scheme,
+        )
+        return await call_next(request)
+
+
+def homepage(_: Request) -> PlainTextResponse:
+    return PlainTextResponse("ok")
+
+
+def create_app(middleware_class: Any, **options: Any) -> Starlette:
+    return Starlette(
+        routes=[Route("/", homepage)],
+        middleware=[Middleware(CorrelationIdMiddleware), Middleware(middleware_class, **options)],
+    )
+
+
+def _scope() -> Dict[str, Any]:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/",
+        "raw_path": b"/",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"testserver")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+
+
+async def _request(app: Callable[..., Awaitable[None]]) -> None:
+    messages: List[Dict[str, Any]] = []
+    response_complete = asyncio.Event()
+    request_sent = False
+
+    async def receive() -> Dict[str, Any]:
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # Like a server, wait for disconnect until response is sent
+        await response_complete.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Dict[str, Any]) -> None:
+        messages.append(message)
+        if message["type"] == "http.response.body" and not message.get("more_body", False):
+            response_complete.set()
+
+    await app(_scope(), receive, send)
+    assert messages[0]["status"] == 200
+
+
+async def _requests_per_second(app: Starlette) -> float:
+    for _ in range(100):
+        await _request(app)
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        await _request(app)
+    return REQUESTS / (time.perf_counter() - start)
+
+
+def main() -> None:
+    legacy = asyncio.run(_requests_per_second(create_app(LegacyStructlogLoggingMiddleware)))
+    # Previous implementation had no access log
+    current = asyncio.run(
+        _requests_per_second(create_app(StructlogLoggingMiddleware, sample_rate=0.0))
+    )
+    print(
+        f"legacy {legacy:9.0f} req/s  current {current:9.0f} req/s"
+        f"  speedup {current / legacy:4.2f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import os
 from typing import Any
 
 import structlog
@@ -8,6 +9,7 @@ from sqlalchemy.orm import Session
 
 from .... import schemas
 from ....db import get_db
+from ....db.pool_stats import get_pool_stats
 
 router = APIRouter()
 logger: structlog.stdlib.BoundLogger = structlog.get_logger()
@@ -45,3 +47,9 @@ def readiness(response: Response, db: Session = Depends(get_db)) -> Any:
     readiness_ = schemas.Readiness(**result)
     logger.info("readiness", **result)
     return readiness_
+
+
+@router.get("/pool", response_model=schemas.WorkerPoolStats)
+def pool() -> Any:
+    """Return connection pool statistics of the worker process which handled the request."""
+    return schemas.WorkerPoolStats(pid=os.getpid(), pools=get_pool_stats())
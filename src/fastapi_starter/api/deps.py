@@ -0,0 +1,22 @@
+from typing import Optional
+
+from fastapi import HTTPException, Query
+
+from .. import schemas
+from ..crud.pagination import InvalidCursorError, decode_cursor
+
+PAGE_LIMIT_DEFAULT = 100
+PAGE_LIMIT_MAX = 1000
+
+
+def keyset_pagination(
+    cursor: Optional[str] = None,
+    limit: int = Query(PAGE_LIMIT_DEFAULT, ge=1, le=PAGE_LIMIT_MAX),
+) -> schemas.KeysetPagination:
+    """Pagination query parameters; pass them to `CRUDBase.get_multi_keyset`."""
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except InvalidCursorError as exc:
+            raise HTTPException(status_code=400, detail="Invalid cursor") from exc
+    return schemas.KeysetPagination(cursor=cursor, limit=limit)
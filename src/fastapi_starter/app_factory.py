@@ -1,3 +1,6 @@
+import os
+from typing import Optional
+
 import sentry_sdk
 from fastapi import FastAPI
 from fastapi.exceptions import RequestValidationError
@@ -9,8 +12,47 @@ from starlette.middleware.httpsredirect import HTTPSRedirectMiddleware
 
 from .api.api_v1.api import api_router as api_v1_router
 from .core.config import Settings, get_settings
-from .errors import log_http_error, log_unhandled_exception, log_validation_error
-from .middleware import LoggingMiddleware, StructlogLoggingMiddlewareFactory
+from .crud.pagination import InvalidCursorError
+from .db.connectors import reset_engines_after_fork, shutdown_engines
+from .errors import (
+    ERROR_LOG_DEDUPLICATOR,
+    invalid_cursor_error,
+    log_http_error,
+    log_unhandled_exception,
+    log_validation_error,
+)
+from .metrics import REGISTRY, metrics
+from .middleware import (
+    ApiKeyValidator,
+    CompressionMiddleware,
+    ETagMiddleware,
+    LoggingMiddleware,
+    LogRenderer,
+    MetricsMiddleware,
+    OverflowPolicy,
+    ProfilerMode,
+    ProfilingMiddleware,
+    RateLimitKey,
+    RateLimitMiddleware,
+    StructlogLoggingMiddlewareFactory,
+    TokenBuckets,
+    stop_log_queue,
+)
+from .responses import (
+    RESPONSE_CACHE,
+    JSONSerializer,
+    enable_direct_serialization,
+    enable_request_coalescing,
+    enable_response_cache,
+    get_json_response_class,
+)
+from .tracing import (
+    TRACER,
+    SamplingFeedbackMiddleware,
+    TracesSampler,
+    create_span_exporter,
+    instrument_app,
+)
 
 
 class FastAPIStarterTemplate:
@@ -23,10 +65,16 @@ class FastAPIStarterTemplate:
 
     def create_app(self) -> FastAPI:
         self.configure_logging()
+        self.configure_lifespan()
         self.configure_error_handlers()
         self.configure_default_routes()
+        self.configure_metrics()
         self.configure_middleware()
         self.configure_sentry()
+        self.configure_serialization()
+        self.configure_request_coalescing()
+        self.configure_response_cache()
+        self.configure_tracing()
         return self.app
 
     def init_settings(self) -> Settings:
@@ -40,6 +88,9 @@ class FastAPIStarterTemplate:
             openapi_url=settings.OPENAPI_URL,
             docs_url=settings.DOCS_URL,
             redoc_url=settings.REDOC_URL,
+            default_response_class=get_json_response_class(
+                JSONSerializer(settings.JSON_SERIALIZER)
+            ),
         )
 
     def configure_logging(self) -> None:
@@ -48,17 +99,85 @@ class FastAPIStarterTemplate:
             factory=StructlogLoggingMiddlewareFactory(),
             log_level=self.settings.LOG_LEVEL,
             dev=self.settings.LOG_DEV,
+            queue_size=self.settings.LOG_QUEUE_SIZE,
+            queue_overflow=OverflowPolicy(self.settings.LOG_QUEUE_OVERFLOW),
+            renderer=LogRenderer(self.settings.LOG_RENDERER),
+            access_log_sample_rate=self.settings.LOG_ACCESS_SAMPLE_RATE,
+            access_log_error_sample_rate=self.settings.LOG_ACCESS_ERROR_SAMPLE_RATE,
+            access_log_exclude_paths=[
+                self.settings.HEALTHCHECK_ENDPOINT,
+                *self.settings.LOG_ACCESS_EXCLUDE_PATHS,
+            ],
         )
 
+    def configure_lifespan(self) -> None:
+        # Engines inherited from a parent process (gunicorn preload_app) must not reuse its sockets
+        self.app.add_event_handler("startup", reset_engines_after_fork)
+        self.app.add_event_handler("shutdown", shutdown_engines)
+        self.app.add_event_handler("shutdown", ERROR_LOG_DEDUPLICATOR.flush)
+        self.app.add_event_handler("shutdown", stop_log_queue)
+
     def configure_error_handlers(self) -> None:
+        ERROR_LOG_DEDUPLICATOR.configure(
+            window=self.settings.LOG_ERROR_DEDUP_WINDOW,
+            max_keys=self.settings.LOG_ERROR_DEDUP_MAX_KEYS,
+        )
         self.app.add_exception_handler(StarletteHTTPException, log_http_error)
         self.app.add_exception_handler(RequestValidationError, log_validation_error)
+        self.app.add_exception_handler(InvalidCursorError, invalid_cursor_error)
         self.app.add_exception_handler(Exception, log_unhandled_exception)
 
     def configure_default_routes(self) -> None:
         self.app.include_router(api_v1_router, prefix=self.settings.API_V1_STR)
 
+    def configure_metrics(self) -> None:
+        if not self.settings.METRICS_ENDPOINT:
+            return
+        REGISTRY.configure(self.settings.METRICS_DIR)
+        self.app.add_route(self.settings.METRICS_ENDPOINT, metrics, include_in_schema=False)
+        self.app.add_middleware(MetricsMiddleware)
+
     def configure_middleware(self) -> None:
+        # Inside compression, so the ETag is computed from the uncompressed body
+        if self.settings.ETAG_ENABLED:
+            self.app.add_middleware(ETagMiddleware)
+        if self.settings.COMPRESSION_ENCODINGS:
+            self.app.add_middleware(
+                CompressionMiddleware,
+                encodings=self.settings.COMPRESSION_ENCODINGS,
+                minimum_size=self.settings.COMPRESSION_MINIMUM_SIZE,
+            )
+        if self.settings.PROFILING_SECRET or self.settings.PROFILING_SAMPLE_RATE:
+            self.app.add_middleware(
+                ProfilingMiddleware,
+                secret=self.settings.PROFILING_SECRET,
+                header=self.settings.PROFILING_HEADER,
+                sample_rate=self.settings.PROFILING_SAMPLE_RATE,
+                paths=self.settings.PROFILING_PATHS,
+                mode=ProfilerMode(self.settings.PROFILING_MODE),
+                directory=self.settings.PROFILING_DIR,
+            )
+        # Outside compression and profiling, so rejected requests are cheap
+        if self.settings.RATE_LIMIT or self.settings.RATE_LIMIT_ROUTES:
+            self.app.add_middleware(
+                RateLimitMiddleware,
+                limit=self.settings.RATE_LIMIT,
+                route_limits=self.settings.RATE_LIMIT_ROUTES,
+                key=RateLimitKey(self.settings.RATE_LIMIT_KEY),
+                api_key_header=self.settings.RATE_LIMIT_API_KEY_HEADER,
+                api_key_validator=self.create_api_key_validator(),
+                exclude_paths=[
+                    f"{self.settings.API_V1_STR}/health/",
+                    self.settings.HEALTHCHECK_ENDPOINT,
+                    *([self.settings.METRICS_ENDPOINT] if self.settings.METRICS_ENDPOINT else []),
+                ],
+                buckets=TokenBuckets(
+                    os.path.join(self.settings.RATE_LIMIT_DIR, "buckets")
+                    if self.settings.RATE_LIMIT_DIR
+                    else None,
+                    slots=self.settings.RATE_LIMIT_SLOTS,
+                ),
+            )
         if self.settings.ALLOWED_HOSTS:
             self.app.add_middleware(
                 TrustedHostMiddleware,
@@ -75,14 +194,72 @@ class FastAPIStarterTemplate:
         if self.settings.HTTPS_FORCE_REDIRECT:
             self.app.add_middleware(HTTPSRedirectMiddleware)
 
+    def create_api_key_validator(self) -> Optional[ApiKeyValidator]:
+        """Override to rate limit valid API keys from all client addresses together."""
+        return None
+
     def configure_sentry(self) -> None:
         if self.settings.SENTRY_DSN:
-            SentryAsgiMiddleware(self.app)
+            traces_sampler = self.create_traces_sampler()
+            self.app.add_middleware(SamplingFeedbackMiddleware, sampler=traces_sampler)
+            # Starts request transactions, the sampler gets their ASGI scope
+            self.app.add_middleware(SentryAsgiMiddleware)
             # pylint: disable=abstract-class-instantiated
             sentry_sdk.init(
                 dsn=self.settings.SENTRY_DSN,
                 environment=self.settings.ENVIRONMENT,
                 debug=self.settings.SENTRY_DEBUG,
                 sample_rate=self.settings.SENTRY_SAMPLE_RATE,
-                traces_sample_rate=self.settings.SENTRY_TRACES_SAMPLE_RATE,
+                traces_sampler=traces_sampler,
             )
+
+    def create_traces_sampler(self) -> TracesSampler:
+        slow_ms = self.settings.SENTRY_TRACES_SLOW_MS
+        return TracesSampler(
+            self.app,
+            default_rate=self.settings.SENTRY_TRACES_SAMPLE_RATE,
+            route_rates=self.settings.SENTRY_TRACES_ROUTE_SAMPLE_RATES,
+            exclude_paths=[
+                f"{self.settings.API_V1_STR}/health/",
+                self.settings.HEALTHCHECK_ENDPOINT,
+                *([self.settings.METRICS_ENDPOINT] if self.settings.METRICS_ENDPOINT else []),
+                *self.settings.SENTRY_TRACES_EXCLUDE_PATHS,
+            ],
+            target_per_second=self.settings.SENTRY_TRACES_TARGET_PER_SECOND,
+            slow_threshold=slow_ms / 1000 if slow_ms is not None else None,
+            boost=self.settings.SENTRY_TRACES_BOOST,
+        )
+
+    def configure_serialization(self) -> None:
+        if self.settings.JSON_DIRECT_SERIALIZATION:
+            enable_direct_serialization(self.app)
+
+    def configure_request_coalescing(self) -> None:
+        enable_request_coalescing(self.app)
+
+    def configure_response_cache(self) -> None:
+        RESPONSE_CACHE.configure(
+            max_size=self.settings.RESPONSE_CACHE_SIZE,
+            shared_dir=self.settings.RESPONSE_CACHE_DIR,
+            slots=self.settings.RESPONSE_CACHE_SLOTS,
+            slot_size=self.settings.RESPONSE_CACHE_SLOT_SIZE,
+        )
+        # After direct serialization and coalescing, which replace route apps too
+        enable_response_cache(self.app)
+
+    def configure_tracing(self) -> None:
+        if not self.settings.TRACING_EXPORTER:
+            return
+        TRACER.configure(
+            [
+                create_span_exporter(
+                    self.settings.TRACING_EXPORTER,
+                    path=self.settings.TRACING_FILE,
+                    endpoint=self.settings.TRACING_OTLP_ENDPOINT,
+                    service_name=self.settings.TRACING_SERVICE_NAME,
+                )
+            ]
+        )
+        # After all middleware and routes, so they are instrumented too
+        instrument_app(self.app)
+        self.app.add_event_handler("shutdown", TRACER.shutdown)
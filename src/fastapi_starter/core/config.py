@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import logging
 from functools import lru_cache
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic import AnyHttpUrl, BaseSettings  # pylint: disable=no-name-in-module
 
@@ -18,11 +18,22 @@ class Settings(BaseSettings):
 
     HOST: str = "127.0.0.1"
     PORT: int = 8000
+    WORKERS: int = 1
 
     ENVIRONMENT: str
 
     LOG_LEVEL: int = logging.INFO
     LOG_DEV: bool = False
+    LOG_RENDERER: str = "key_value"  # key_value, json; not used in dev mode
+    # Share of requests written to access log; HEALTHCHECK_ENDPOINT is always excluded
+    LOG_ACCESS_SAMPLE_RATE: float = 1.0
+    LOG_ACCESS_ERROR_SAMPLE_RATE: float = 1.0  # 4xx and 5xx responses
+    LOG_ACCESS_EXCLUDE_PATHS: List[str] = []
+    # Identical errors are logged once per window, with count of repeats; 0 disables
+    LOG_ERROR_DEDUP_WINDOW: float = 10.0  # Seconds
+    LOG_ERROR_DEDUP_MAX_KEYS: int = 1000
+    LOG_QUEUE_SIZE: Optional[int] = None  # Write logs from a background thread if set
+    LOG_QUEUE_OVERFLOW: str = "block"  # block, drop_oldest, drop
 
     API_V1_STR: str = "/api/v1"
 
@@ -33,19 +44,80 @@ class Settings(BaseSettings):
 
     HEALTHCHECK_ENDPOINT: str = "/api/v1/health/liveness"
 
+    JSON_SERIALIZER: str = "json"  # json (stdlib), orjson (stdlib json if not installed)
+    # Serialize response_model output without jsonable_encoder; see responses/json.py
+    JSON_DIRECT_SERIALIZATION: bool = False
+
+    METRICS_ENDPOINT: Optional[str] = "/metrics"
+    # Shared by all worker processes, e.g. in /dev/shm; temporary directory if not set
+    METRICS_DIR: Optional[str] = None
+
     ALLOWED_HOSTS: List[str] = []
     CORS_ALLOW_ORIGINS: List[AnyHttpUrl] = []
     HTTPS_FORCE_REDIRECT: bool = False
 
     SQLALCHEMY_DATABASE_URI: str  # Secret
+    SQLALCHEMY_ASYNC_DATABASE_URI: Optional[str] = None  # Secret; derived if not set
+    SQLALCHEMY_ASYNC_ENGINE: bool = True  # Disable if the app doesn't use get_async_db
     SQLALCHEMY_POOL_SIZE: int = 10
     SQLALCHEMY_MAX_OVERFLOW: int = 0
+    # Max connections to a database from all workers; caps pool size and overflow per worker,
+    # the primary database budget is split between the sync and async engine, unless
+    # SQLALCHEMY_ASYNC_ENGINE is disabled
+    SQLALCHEMY_POOL_BUDGET: Optional[int] = None
     SQLALCHEMY_ECHO: bool = False
+    SQLALCHEMY_SLOW_QUERY_MS: Optional[float] = None
+    SQLALCHEMY_STATEMENT_TIMEOUT_MS: Optional[int] = None  # PostgreSQL only
+    SQLALCHEMY_REPLICA_URIS: List[str] = []  # Secret
+    SQLALCHEMY_REPLICA_SELECTION: str = "round_robin"  # round_robin, least_connections
+
+    # Encodings in order of preference: br (brotli), zstd (zstandard), gzip; disabled if empty
+    COMPRESSION_ENCODINGS: List[str] = []
+    COMPRESSION_MINIMUM_SIZE: int = 500  # Bytes
+    ETAG_ENABLED: bool = False  # ETag for GET responses and 304 for If-None-Match
+    # Responses of routes declared with cache_response; see responses/cache.py
+    RESPONSE_CACHE_SIZE: int = 1024  # Responses per worker
+    # Shared by all worker processes, e.g. in /dev/shm; per worker only if not set
+    RESPONSE_CACHE_DIR: Optional[str] = None
+    RESPONSE_CACHE_SLOTS: int = 1024
+    RESPONSE_CACHE_SLOT_SIZE: int = 65536  # Bytes; larger responses are cached per worker
+
+    # Token buckets per client, e.g. 100/minute (bursts of 100); disabled if not set
+    RATE_LIMIT: Optional[str] = None
+    RATE_LIMIT_ROUTES: Dict[str, str] = {}  # Route template -> limit, with own buckets
+    # ip, api_key (with ip, unless valid by FastAPIStarterTemplate.create_api_key_validator)
+    RATE_LIMIT_KEY: str = "ip"
+    RATE_LIMIT_API_KEY_HEADER: str = "X-API-Key"
+    # Shared by all worker processes, e.g. in /dev/shm; per worker if not set
+    RATE_LIMIT_DIR: Optional[str] = None
+    RATE_LIMIT_SLOTS: int = 65536  # Buckets; 32 bytes each
+
+    # Profile request with PROFILING_HEADER set to PROFILING_SECRET, or sampled requests
+    PROFILING_SECRET: Optional[str] = None  # Secret
+    PROFILING_HEADER: str = "X-Profile"
+    PROFILING_SAMPLE_RATE: float = 0.0  # Requires PROFILING_DIR
+    PROFILING_PATHS: List[str] = []  # Path prefixes for sampling; all paths if empty
+    PROFILING_MODE: str = "sampling"  # sampling (speedscope JSON), deterministic (pstats)
+    PROFILING_DIR: Optional[str] = None  # Profile is returned inline if not set
+
+    # Spans of request, middleware, dependencies and SQL; disabled if not set
+    TRACING_EXPORTER: Optional[str] = None  # memory, file, otlp
+    TRACING_FILE: str = "traces.jsonl"  # For file exporter
+    TRACING_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"  # OTLP/HTTP JSON
+    TRACING_SERVICE_NAME: str = "fastapi-starter"
 
     SENTRY_DSN: Optional[str] = None  # Secret
     SENTRY_DEBUG: bool = False
     SENTRY_SAMPLE_RATE: float = 1.0
-    SENTRY_TRACES_SAMPLE_RATE: float = 0.1
+    SENTRY_TRACES_SAMPLE_RATE: float = 0.1  # Default rate
+    SENTRY_TRACES_ROUTE_SAMPLE_RATES: Dict[str, float] = {}  # Route template -> rate
+    # Path prefixes never traced; health checks and METRICS_ENDPOINT are always excluded
+    SENTRY_TRACES_EXCLUDE_PATHS: List[str] = []
+    # Adaptive default rate, targeting number of traces per second per worker
+    SENTRY_TRACES_TARGET_PER_SECOND: Optional[float] = None
+    # Recently slow routes and routes with >= 5% server errors are sampled more often
+    SENTRY_TRACES_SLOW_MS: Optional[float] = None
+    SENTRY_TRACES_BOOST: float = 10.0
 
     class Config:
         # Case sensitive set to false for secrets_dir to work
@@ -54,12 +126,24 @@ class Settings(BaseSettings):
         secrets_dir = "/run/secrets"
         # Synonyms
         fields = {
+            "WORKERS": {
+                "env": [
+                    "WORKERS",
+                    "WEB_CONCURRENCY",  # gunicorn
+                ]
+            },
+            "METRICS_DIR": {
+                "env": [
+                    "METRICS_DIR",
+                    "PROMETHEUS_MULTIPROC_DIR",  # prometheus_client
+                ]
+            },
             "SQLALCHEMY_DATABASE_URI": {
                 "env": [
                     "SQLALCHEMY_DATABASE_URI",
                     "DATABASE_URL",  # DigitalOcean
                 ]
-            }
+            },
         }
 
     # In order to use lru_cache, the class must be hashable
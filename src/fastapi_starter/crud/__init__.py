@@ -1 +1,3 @@
+from .async_base import AsyncCRUDBase  # noqa
 from .base import CRUDBase  # noqa
+from .cache import CacheBackend, LRUCache  # noqa
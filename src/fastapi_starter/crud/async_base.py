@@ -0,0 +1,75 @@
+from typing import Any, AsyncIterator, Dict, Generic, List, Optional, Type, Union
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .base import (
+    CreateSchemaType,
+    ModelType,
+    UpdateSchemaType,
+    encode_obj_in,
+    get_json_attributes,
+    get_writable_attributes,
+    set_attributes,
+)
+
+
+class AsyncCRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
+    def __init__(self, model: Type[ModelType]):
+        """Async CRUD object with default methods to Create, Read, Update, Delete (CRUD).
+
+        Mirrors `CRUDBase`, but works with `AsyncSession` from `get_async_db`.
+
+        **Parameters**
+
+        * `model`: A SQLAlchemy model class
+        """
+        self.model = model
+        self._writable_attributes = get_writable_attributes(model)
+        self._json_attributes = get_json_attributes(model)
+
+    async def get(self, db: AsyncSession, obj_id: Any) -> Optional[ModelType]:
+        return await db.get(self.model, obj_id)
+
+    async def get_multi(
+        self, db: AsyncSession, *, skip: int = 0, limit: int = 100
+    ) -> List[ModelType]:
+        result = await db.execute(select(self.model).offset(skip).limit(limit))
+        return result.scalars().all()
+
+    async def get_all(self, db: AsyncSession) -> List[ModelType]:
+        result = await db.execute(select(self.model))
+        return result.scalars().all()
+
+    async def stream_all(
+        self, db: AsyncSession, *, chunk_size: int = 1000
+    ) -> AsyncIterator[ModelType]:
+        """Iterate over all rows with a server-side cursor, fetching `chunk_size` rows at a time."""
+        result = await db.stream(
+            select(self.model).execution_options(stream_results=True, yield_per=chunk_size)
+        )
+        async for partition in result.scalars().partitions(chunk_size):
+            for obj in partition:
+                yield obj
+
+    async def create(self, db: AsyncSession, *, obj_in: CreateSchemaType) -> ModelType:
+        obj_in_data = encode_obj_in(obj_in, self._json_attributes)
+        db_obj = self.model(**obj_in_data)
+        db.add(db_obj)
+        return db_obj
+
+    async def update(
+        self,
+        db: AsyncSession,
+        *,
+        db_obj: ModelType,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
+    ) -> ModelType:
+        set_attributes(db_obj, obj_in, self._writable_attributes)
+        db.add(db_obj)
+        return db_obj
+
+    async def remove(self, db: AsyncSession, *, obj_id: int) -> Optional[ModelType]:
+        obj = await self.get(db, obj_id)
+        await db.delete(obj)
+        return obj
@@ -1,11 +1,35 @@
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+from itertools import groupby
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    Generic,
+    Hashable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
 
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel  # pylint: disable=no-name-in-module
-from sqlalchemy import select
+from sqlalchemy import bindparam, insert, inspect, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.session import make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
+from sqlalchemy.sql import Insert, sqltypes
 
 from ..db import Base
+from .cache import CacheBackend, has_uncommitted_writes, invalidate_after_commit
+from .pagination import encode_cursor, parse_cursor_values
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
@@ -13,27 +37,98 @@ UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
 
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
-    def __init__(self, model: Type[ModelType]):
+    def __init__(
+        self,
+        model: Type[ModelType],
+        *,
+        keyset_columns: Optional[Sequence[str]] = None,
+        cache: Optional[CacheBackend] = None,
+    ):
         """CRUD object with default methods to Create, Read, Update, Delete (CRUD).
 
         **Parameters**
 
         * `model`: A SQLAlchemy model class
-        * `schema`: A Pydantic model (schema) class
+        * `keyset_columns`: Ordered unique columns for keyset pagination; primary key by default
+        * `cache`: Read-through cache for `get`, e.g. `LRUCache`; column values are cached
+          and shared between sessions, so mutable values (e.g. JSON) must not be modified in place
         """
         self.model = model
+        self.cache = cache
+        self._table = model.__table__  # type: ignore
+        self._primary_key = [column.key for column in inspect(model).primary_key]
+        self._keyset_columns = [self._table.c[key] for key in keyset_columns or self._primary_key]
+        self._column_attributes = [attr.key for attr in inspect(model).column_attrs]
+        # Attribute names differ from column keys of columns like `name_ = Column("name", ...)`
+        self._column_keys = {attr.key: attr.columns[0].key for attr in inspect(model).column_attrs}
+        self._writable_attributes = get_writable_attributes(model)
+        self._json_attributes = get_json_attributes(model)
+        self._keyset_attributes = [
+            inspect(model).get_property_by_column(column).key for column in self._keyset_columns
+        ]
 
     def get(self, db: Session, obj_id: Any) -> Optional[ModelType]:
-        return db.get(self.model, obj_id)
+        if self.cache is None:
+            return db.get(self.model, obj_id)
+        if identity_key(self.model, obj_id) in db.identity_map:
+            return db.get(self.model, obj_id)
+        key = self._get_cache_key(obj_id)
+        values = self.cache.get(key)
+        if values is not None:
+            return self._merge_cached(db, values)
+        # Read before the database, so a value invalidated meanwhile is not stored
+        generation = self.cache.generation
+        obj = db.get(self.model, obj_id)
+        if obj is not None and not has_uncommitted_writes(db):
+            self.cache.set(
+                key,
+                {attr: getattr(obj, attr) for attr in self._column_attributes},
+                generation=generation,
+            )
+        return obj
 
     def get_multi(self, db: Session, *, skip: int = 0, limit: int = 100) -> List[ModelType]:
         return db.execute(select(self.model).offset(skip).limit(limit)).scalars().all()
 
+    def get_multi_keyset(
+        self, db: Session, *, cursor: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """Return a page of rows ordered by keyset columns, and a cursor of the next page.
+
+        Next page cursor is `None` on the last page.
+        """
+        stmt = select(self.model).order_by(*self._keyset_columns).limit(limit + 1)
+        if cursor:
+            values = parse_cursor_values(cursor, self._keyset_columns)
+            if len(self._keyset_columns) == 1:
+                stmt = stmt.where(self._keyset_columns[0] > values[0])
+            else:
+                stmt = stmt.where(tuple_(*self._keyset_columns) > tuple_(*values))
+        rows = db.execute(stmt).scalars().all()
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        last_row = rows[-1]
+        next_cursor = encode_cursor([getattr(last_row, key) for key in self._keyset_attributes])
+        return rows, next_cursor
+
     def get_all(self, db: Session) -> List[ModelType]:
         return db.execute(select(self.model)).scalars().all()
 
+    def stream_all(self, db: Session, *, chunk_size: int = 1000) -> Iterator[ModelType]:
+        """Iterate over all rows with a server-side cursor, fetching `chunk_size` rows at a time.
+
+        Session keeps only weak references to unmodified objects,
+        so memory usage is constant as long as the caller doesn't keep them.
+        """
+        result = db.execute(
+            select(self.model).execution_options(stream_results=True, yield_per=chunk_size)
+        )
+        for partition in result.scalars().partitions(chunk_size):
+            yield from partition
+
     def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
-        obj_in_data = jsonable_encoder(obj_in)
+        obj_in_data = encode_obj_in(obj_in, self._json_attributes)
         db_obj = self.model(**obj_in_data)
         db.add(db_obj)
         return db_obj
@@ -41,20 +136,349 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def update(
         self, db: Session, *, db_obj: ModelType, obj_in: Union[UpdateSchemaType, Dict[str, Any]]
     ) -> ModelType:
-        if isinstance(obj_in, dict):
-            update_data = obj_in
-        else:
-            update_data = obj_in.dict(exclude_unset=True)
-        for field in db_obj.__mapper__.attrs.keys():  # type: ignore
-            if field in update_data:
-                try:
-                    setattr(db_obj, field, update_data[field])
-                except AttributeError:
-                    pass
+        set_attributes(db_obj, obj_in, self._writable_attributes)
         db.add(db_obj)
+        if self.cache is not None:
+            identity = inspect(db_obj).identity
+            if identity is not None:
+                self._invalidate_cache(db, [identity[0] if len(identity) == 1 else identity])
         return db_obj
 
     def remove(self, db: Session, *, obj_id: int) -> Optional[ModelType]:
         obj = self.get(db, obj_id)
         db.delete(obj)
+        self._invalidate_cache(db, [obj_id])
         return obj
+
+    def create_multi(
+        self,
+        db: Session,
+        *,
+        objs_in: Sequence[Union[CreateSchemaType, Dict[str, Any]]],
+        batch_size: int = 1000,
+    ) -> List[Any]:
+        """Insert rows in batches without building ORM objects and return their primary keys.
+
+        Rows aren't added to the session, objects already loaded in it aren't refreshed.
+        """
+        rows = [self._encode(obj_in) for obj_in in objs_in]
+        primary_keys: List[Any] = [None] * len(rows)
+        for batch in _batches(rows, batch_size):
+            indexes, values = zip(*batch)
+            for i, primary_key in zip(indexes, self._insert(db, insert(self._table), values)):
+                primary_keys[i] = primary_key
+        return primary_keys
+
+    def update_multi(
+        self,
+        db: Session,
+        *,
+        objs_in: Sequence[Dict[str, Any]],
+        batch_size: int = 1000,
+    ) -> List[Any]:
+        """Update rows by primary key in batches and return their primary keys.
+
+        Each row must contain primary key values, and is updated with the rest of its values.
+        """
+        rows = [self._encode(obj_in) for obj_in in objs_in]
+        for batch in _batches(rows, batch_size):
+            values = [row for _, row in batch]
+            update_fields = [key for key in values[0] if key not in self._primary_key]
+            if not update_fields:
+                continue
+            stmt = (
+                update(self._table)
+                .where(*[self._table.c[key] == bindparam(f"pk_{key}") for key in self._primary_key])
+                .values({key: bindparam(f"v_{key}") for key in update_fields})
+            )
+            db.execute(
+                stmt,
+                [
+                    {
+                        f"{'pk' if key in self._primary_key else 'v'}_{key}": value
+                        for key, value in row.items()
+                    }
+                    for row in values
+                ],
+            )
+        primary_keys = [self._get_primary_key(row) for row in rows]
+        self._invalidate_cache(db, primary_keys)
+        return primary_keys
+
+    def upsert_multi(
+        self,
+        db: Session,
+        *,
+        objs_in: Sequence[Union[CreateSchemaType, Dict[str, Any]]],
+        index_elements: Optional[Sequence[str]] = None,
+        update_fields: Optional[Sequence[str]] = None,
+        batch_size: int = 1000,
+    ) -> List[Any]:
+        """Insert rows or update them on conflict (`INSERT ... ON CONFLICT`) in batches.
+
+        **Parameters**
+
+        * `index_elements`: Columns of the unique constraint; primary key by default
+        * `update_fields`: Columns to update on conflict; all inserted columns by default
+        """
+        index_elements = [self._column_keys.get(key, key) for key in index_elements or ()]
+        index_elements = index_elements or list(self._primary_key)
+        update_fields = [self._column_keys.get(key, key) for key in update_fields or ()]
+        dialect_insert = _DIALECT_INSERTS.get(db.get_bind().dialect.name)
+        if dialect_insert is None:
+            raise ValueError(f"Upsert isn't supported by {db.get_bind().dialect.name}")
+        rows = [self._encode(obj_in) for obj_in in objs_in]
+        # PostgreSQL can't update a row twice in one statement
+        conflict_keys: Set[Tuple[Any, ...]] = set()
+        for row in rows:
+            conflict_key = tuple(row.get(key) for key in index_elements)
+            if conflict_key in conflict_keys and None not in conflict_key:
+                raise ValueError(f"Rows with the same {', '.join(index_elements)}: {conflict_key}")
+            conflict_keys.add(conflict_key)
+        primary_keys: List[Any] = [None] * len(rows)
+        for batch in _batches(rows, batch_size):
+            indexes, values = zip(*batch)
+            stmt = dialect_insert(self._table)
+            set_ = {
+                key: stmt.excluded[key]
+                for key in (update_fields or values[0])
+                if key not in index_elements
+            }
+            if set_:
+                # Unlike ORM updates, ON CONFLICT DO UPDATE doesn't apply `onupdate` defaults
+                for key, value in self._get_onupdate_values().items():
+                    set_.setdefault(key, value)
+                stmt = stmt.on_conflict_do_update(index_elements=index_elements, set_=set_)
+            else:
+                stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+            if set_ and _supports_returning(db):
+                batch_primary_keys = self._insert(db, stmt, values, index_elements)
+            else:
+                db.execute(stmt, list(values))
+                batch_primary_keys = self._get_primary_keys_by(db, index_elements, values)
+            for i, primary_key in zip(indexes, batch_primary_keys):
+                primary_keys[i] = primary_key
+        self._invalidate_cache(db, primary_keys)
+        return primary_keys
+
+    def _get_cache_key(self, obj_id: Any) -> str:
+        return f"{self._table.name}:{obj_id}"
+
+    def _merge_cached(self, db: Session, values: Dict[str, Any]) -> ModelType:
+        obj = inspect(self.model).class_manager.new_instance()
+        for attr, value in values.items():
+            set_committed_value(obj, attr, value)
+        make_transient_to_detached(obj)
+        return db.merge(obj, load=False)
+
+    def _invalidate_cache(self, db: Session, obj_ids: Sequence[Any]) -> None:
+        if self.cache is None:
+            return
+        for obj_id in obj_ids:
+            if obj_id is not None:
+                invalidate_after_commit(db, self.cache, self._get_cache_key(obj_id))
+
+    def _encode(self, obj_in: Union[BaseModel, Dict[str, Any]]) -> Dict[str, Any]:
+        """Table values by column key."""
+        return {
+            self._column_keys.get(key, key): value
+            for key, value in encode_obj_in(obj_in, self._json_attributes).items()
+        }
+
+    def _get_primary_key(self, row: Any) -> Any:
+        if len(self._primary_key) == 1:
+            return row[self._primary_key[0]]
+        return tuple(row[key] for key in self._primary_key)
+
+    def _insert(
+        self,
+        db: Session,
+        stmt: Insert,
+        values: Sequence[Dict[str, Any]],
+        index_elements: Optional[Sequence[str]] = None,
+    ) -> List[Any]:
+        """Execute insert and return primary keys of `values`.
+
+        RETURNING rows don't come back in the order of `values`, they are mapped back by
+        `index_elements` (primary key by default), or by all inserted values if `values`
+        don't have them (e.g. primary keys generated by the database).
+        """
+        dialect = db.get_bind().dialect
+        key_elements = list(index_elements or self._primary_key)
+        has_keys = all(key in values[0] for key in key_elements)
+        if has_keys and set(key_elements) == set(self._primary_key):
+            db.execute(stmt, list(values))
+            return [self._get_primary_key(row) for row in values]
+        if not _supports_returning(db):
+            # No RETURNING support and primary keys are generated by the database
+            return [
+                self._get_primary_key(
+                    dict(zip(self._primary_key, db.execute(stmt, row).inserted_primary_key))
+                )
+                for row in values
+            ]
+        match_keys = key_elements if has_keys else list(values[0])
+        columns = [self._table.c[key] for key in dict.fromkeys([*self._primary_key, *match_keys])]
+        if dialect.insert_executemany_returning:
+            result_rows = [
+                row._mapping for row in db.execute(stmt.returning(*columns), list(values))
+            ]
+        else:
+            result_rows = []
+            batch_size = max(_MAX_BIND_PARAMETERS // len(values[0]), 1)
+            for start in range(0, len(values), batch_size):
+                end = start + batch_size
+                result = db.execute(stmt.values(list(values[start:end])).returning(*columns))
+                result_rows.extend(row._mapping for row in result)
+        return [
+            self._get_primary_key(row) if row is not None else None
+            for row in _match_rows(values, result_rows, match_keys)
+        ]
+
+    def _get_onupdate_values(self) -> Dict[str, Any]:
+        values: Dict[str, Any] = {}
+        for column in self._table.c:
+            default = column.onupdate
+            if default is None or default.is_sequence:
+                continue
+            if not default.is_callable:
+                values[column.key] = default.arg
+                continue
+            try:
+                values[column.key] = default.arg(_NoExecutionContext())
+            except _ExecutionContextRequired as error:
+                raise ValueError(
+                    f"Upsert can't apply onupdate of {column.key}, it uses the execution context"
+                ) from error
+        return values
+
+    def _get_primary_keys_by(
+        self, db: Session, index_elements: Sequence[str], values: Sequence[Dict[str, Any]]
+    ) -> List[Any]:
+        if set(index_elements) == set(self._primary_key):
+            return [self._get_primary_key(row) for row in values]
+        index_columns = [self._table.c[key] for key in index_elements]
+        primary_key_columns = [self._table.c[key] for key in self._primary_key]
+        result = db.execute(
+            select(*primary_key_columns, *index_columns).where(
+                tuple_(*index_columns).in_(
+                    [tuple(row[key] for key in index_elements) for row in values]
+                )
+            )
+        )
+        primary_keys = {
+            tuple(row._mapping[key] for key in index_elements): self._get_primary_key(row._mapping)
+            for row in result
+        }
+        return [primary_keys.get(tuple(row[key] for key in index_elements)) for row in values]
+
+
+def get_writable_attributes(model: Type[Base]) -> FrozenSet[str]:
+    return frozenset(inspect(model).attrs.keys())
+
+
+def get_json_attributes(model: Type[Base]) -> FrozenSet[str]:
+    return frozenset(
+        attr.key
+        for attr in inspect(model).column_attrs
+        if isinstance(attr.columns[0].type, sqltypes.JSON)
+    )
+
+
+def encode_obj_in(
+    obj_in: Union[BaseModel, Dict[str, Any]], json_attributes: FrozenSet[str]
+) -> Dict[str, Any]:
+    """Convert schema to model constructor arguments.
+
+    Values keep their Python types, which SQLAlchemy column types expect (e.g. datetime).
+    Only values of JSON columns go through `jsonable_encoder`, as they must be serializable.
+    """
+    if isinstance(obj_in, dict):
+        return obj_in
+    values = obj_in.dict(by_alias=True)
+    if json_attributes:
+        for key in json_attributes.intersection(values):
+            values[key] = jsonable_encoder(values[key])
+    return values
+
+
+def set_attributes(
+    db_obj: Base,
+    obj_in: Union[BaseModel, Dict[str, Any]],
+    writable_attributes: FrozenSet[str],
+) -> None:
+    update_data = obj_in if isinstance(obj_in, dict) else obj_in.dict(exclude_unset=True)
+    for field, value in update_data.items():
+        if field in writable_attributes:
+            try:
+                setattr(db_obj, field, value)
+            except AttributeError:
+                pass
+
+
+class _ExecutionContextRequired(Exception):
+    pass
+
+
+class _NoExecutionContext:
+    """Context of column defaults evaluated outside of statement execution."""
+
+    def __getattr__(self, name: str) -> Any:
+        raise _ExecutionContextRequired(name)
+
+
+# Limit of asyncpg and pg8000 on parameters of one statement
+_MAX_BIND_PARAMETERS = 32767
+
+_DIALECT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def _match_rows(
+    values: Sequence[Dict[str, Any]], result_rows: Sequence[Mapping[str, Any]], keys: List[str]
+) -> List[Optional[Mapping[str, Any]]]:
+    """Result row of each of `values`, the one with the same values of `keys`.
+
+    Values without such row (e.g. converted by the database) get the rows left in their order.
+    """
+    hashable_keys = [
+        key
+        for key in keys
+        if all(isinstance(row[key], Hashable) for row in [*values, *result_rows])
+    ]
+    candidates: Dict[Tuple[Any, ...], List[Mapping[str, Any]]] = {}
+    for row in result_rows:
+        candidates.setdefault(tuple(row[key] for key in hashable_keys), []).append(row)
+    matched: List[Optional[Mapping[str, Any]]] = []
+    used: Set[int] = set()
+    for value in values:
+        same = candidates.get(tuple(value[key] for key in hashable_keys), [])
+        row = next((row for row in same if all(row[key] == value[key] for key in keys)), None)
+        if row is not None:
+            same.remove(row)
+            used.add(id(row))
+        matched.append(row)
+    left = iter([row for row in result_rows if id(row) not in used])
+    return [row if row is not None else next(left, None) for row in matched]
+
+
+def _supports_returning(db: Session) -> bool:
+    dialect = db.get_bind().dialect
+    return bool(dialect.insert_executemany_returning or dialect.full_returning)
+
+
+def _batches(
+    rows: Sequence[Dict[str, Any]], batch_size: int
+) -> Iterator[List[Tuple[int, Dict[str, Any]]]]:
+    """Split rows into batches of rows with the same keys, as required by executemany.
+
+    Rows are yielded with their index in the original sequence.
+    """
+    indexed_rows = sorted(enumerate(rows), key=lambda indexed_row: sorted(indexed_row[1]))
+    for _, group in groupby(indexed_rows, key=lambda indexed_row: sorted(indexed_row[1])):
+        same_keys_rows = list(group)
+        for start in range(0, len(same_keys_rows), batch_size):
+            end = start + batch_size
+            yield same_keys_rows[start:end]
@@ -0,0 +1,153 @@
+"""CRUD Object Cache
+
+Read-through cache for `CRUDBase.get`. Column values of loaded objects are cached,
+and cache hits are merged into the session without a database round trip.
+Cached entries are invalidated after commit of the session which updated or removed them.
+
+Only committed values are cached:
+- sessions with uncommitted writes (ORM flushes, `insert` / `update` / `delete` statements,
+  pending objects or invalidations) do not fill the cache
+- backends count invalidations in `generation`; a value read before an invalidation
+  is not stored after it (`set` with the generation read before the database)
+
+Backends implement `CacheBackend`; `LRUCache` is an in-process cache with TTL and size limit.
+"""
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+_PENDING_INVALIDATIONS_KEY = "crud_cache_pending_invalidations"
+_UNCOMMITTED_WRITES_KEY = "crud_cache_uncommitted_writes"
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+
+class CacheBackend(ABC):
+    stats: CacheStats
+    generation: int  # Incremented by every delete and clear
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: Any, generation: Optional[int] = None) -> None:
+        """Store value; skipped if entries were invalidated since `generation`."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        pass
+
+
+class LRUCache(CacheBackend):
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = 60.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self.generation = 0
+        self._entries: OrderedDict[str, Tuple[Optional[float], Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, generation: Optional[int] = None) -> None:
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+
+def has_uncommitted_writes(db: Session) -> bool:
+    return bool(
+        db.info.get(_UNCOMMITTED_WRITES_KEY)
+        or db.info.get(_PENDING_INVALIDATIONS_KEY)
+        or db.new
+        or db.dirty
+        or db.deleted
+    )
+
+
+def invalidate_after_commit(db: Session, cache: CacheBackend, key: str) -> None:
+    """Delete cache entry when session commits; entry stays cached if session rolls back."""
+    pending: Optional[List[Tuple[CacheBackend, str]]] = db.info.get(_PENDING_INVALIDATIONS_KEY)
+    if pending is None:
+        pending = db.info[_PENDING_INVALIDATIONS_KEY] = []
+        event.listen(db, "after_commit", _invalidate_pending)
+        event.listen(db, "after_rollback", _discard_pending)
+    pending.append((cache, key))
+
+
+def _invalidate_pending(db: Session) -> None:
+    pending = db.info[_PENDING_INVALIDATIONS_KEY]
+    for cache, key in pending:
+        cache.delete(key)
+    pending.clear()
+
+
+def _discard_pending(db: Session) -> None:
+    db.info[_PENDING_INVALIDATIONS_KEY].clear()
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_statement_writes(orm_execute_state: Any) -> None:
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info[_UNCOMMITTED_WRITES_KEY] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flushed_writes(db: Session, flush_context: Any) -> None:  # pylint: disable=W0613
+    db.info[_UNCOMMITTED_WRITES_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _reset_writes(db: Session) -> None:
+    db.info.pop(_UNCOMMITTED_WRITES_KEY, None)
@@ -0,0 +1,79 @@
+"""Keyset (Cursor) Pagination
+
+Cursor is an opaque, URL safe token with values of ordering columns of the last row on a page.
+Next page is queried with `WHERE (columns) > (cursor values)`, so its cost doesn't depend
+on how deep the page is, unlike `OFFSET`.
+"""
+import base64
+import binascii
+import datetime
+import json
+import uuid
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import Column
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+_PARSERS: Dict[type, Callable[[Any], Any]] = {
+    datetime.datetime: datetime.datetime.fromisoformat,
+    datetime.date: datetime.date.fromisoformat,
+    datetime.time: datetime.time.fromisoformat,
+    uuid.UUID: uuid.UUID,
+    Decimal: Decimal,
+}
+
+# Types of JSON values accepted for columns of each Python type
+_JSON_TYPES: Dict[type, Tuple[type, ...]] = {
+    bool: (bool,),
+    int: (int,),
+    float: (int, float),
+    str: (str,),
+}
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    data = json.dumps(jsonable_encoder(list(values)), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(data)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}") from exc
+    if not isinstance(values, list):
+        raise InvalidCursorError(f"Invalid cursor: {cursor}")
+    return values
+
+
+def parse_cursor_values(cursor: str, columns: Sequence[Column]) -> List[Any]:
+    """Decode cursor and convert JSON values back to Python types of the columns."""
+    values = decode_cursor(cursor)
+    if len(values) != len(columns):
+        raise InvalidCursorError(f"Invalid cursor: {cursor}")
+    try:
+        return [_parse_value(column, value) for column, value in zip(columns, values)]
+    except (TypeError, ValueError, ArithmeticError) as exc:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}") from exc
+
+
+def _parse_value(column: Column, value: Any) -> Any:
+    if value is None:
+        return None
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    parser = _PARSERS.get(python_type)
+    if parser is not None:
+        return parser(value)
+    if python_type in _JSON_TYPES and type(value) not in _JSON_TYPES[python_type]:
+        raise TypeError(f"Expected {python_type.__name__}, got {value!r}")
+    return value
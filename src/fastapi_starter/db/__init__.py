@@ -1,2 +1,2 @@
 from .base_class import Base
-from .connectors import get_db
+from .connectors import get_async_db, get_db, get_read_db
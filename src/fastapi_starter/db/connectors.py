@@ -1,23 +1,127 @@
 from functools import lru_cache
-from typing import Generator
+from typing import AsyncGenerator, Generator, List, Optional, Tuple
 
 from sqlalchemy import create_engine
-from sqlalchemy.engine import Engine
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker
 
 from ..core.config import get_settings
+from ..tracing import instrument_engine as instrument_tracing
+from .pool_stats import (
+    InstrumentedAsyncAdaptedQueuePool,
+    InstrumentedQueuePool,
+    register_pool_stats,
+)
+from .replicas import ReplicaRouter
+from .statements import get_statement_timeout_connect_args, instrument_statements
 
+# Sync driver name -> async driver used when SQLALCHEMY_ASYNC_DATABASE_URI is not set
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
 
-@lru_cache
-def _create_engine() -> Engine:
+
+def _get_async_database_uri() -> str:
+    settings = get_settings()
+    if settings.SQLALCHEMY_ASYNC_DATABASE_URI:
+        return settings.SQLALCHEMY_ASYNC_DATABASE_URI
+    url = make_url(settings.SQLALCHEMY_DATABASE_URI)
+    drivername = ASYNC_DRIVERS.get(url.drivername)
+    if drivername is None:
+        raise ValueError(
+            f"Can't derive async driver for '{url.drivername}', "
+            "set SQLALCHEMY_ASYNC_DATABASE_URI explicitly"
+        )
+    return str(url.set(drivername=drivername))
+
+
+def split_pool_budget(
+    pool_size: int, max_overflow: int, budget: Optional[int], workers: int, engines: int = 1
+) -> Tuple[int, int]:
+    """Cap pool size and overflow of each engine, so engines of all workers fit into the budget.
+
+    Raises ValueError if the budget doesn't allow a connection per engine of each worker.
+    """
+    if budget is None:
+        return pool_size, max_overflow
+    pools = max(workers, 1) * engines
+    per_pool = budget // pools
+    if per_pool < 1:
+        raise ValueError(f"Connection budget {budget} is less than {pools} connection pools")
+    pool_size = min(pool_size, per_pool)
+    max_overflow = min(max_overflow, per_pool - pool_size)
+    return pool_size, max_overflow
+
+
+def _get_primary_engines() -> int:
+    """Engines of the primary database, which split its connection budget."""
+    return 2 if get_settings().SQLALCHEMY_ASYNC_ENGINE else 1
+
+
+def _get_pool_limits(engines: int = 1) -> Tuple[int, int]:
     settings = get_settings()
-    return create_engine(
-        settings.SQLALCHEMY_DATABASE_URI,
+    return split_pool_budget(
         pool_size=settings.SQLALCHEMY_POOL_SIZE,
         max_overflow=settings.SQLALCHEMY_MAX_OVERFLOW,
+        budget=settings.SQLALCHEMY_POOL_BUDGET,
+        workers=settings.WORKERS,
+        engines=engines,
+    )
+
+
+def _instrument_engine(engine: Engine, name: str) -> None:
+    settings = get_settings()
+    register_pool_stats(name, engine)
+    if settings.SQLALCHEMY_SLOW_QUERY_MS is not None:
+        instrument_statements(engine, slow_query_ms=settings.SQLALCHEMY_SLOW_QUERY_MS)
+    if settings.TRACING_EXPORTER:
+        instrument_tracing(engine)
+
+
+def _build_engine(database_uri: str, name: str, engines: int = 1) -> Engine:
+    settings = get_settings()
+    pool_size, max_overflow = _get_pool_limits(engines)
+    engine = create_engine(
+        database_uri,
+        poolclass=InstrumentedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
         pool_pre_ping=True,
         future=True,
         echo=settings.SQLALCHEMY_ECHO,
+        connect_args=get_statement_timeout_connect_args(
+            database_uri, settings.SQLALCHEMY_STATEMENT_TIMEOUT_MS
+        ),
+    )
+    _instrument_engine(engine, name)
+    return engine
+
+
+@lru_cache
+def _create_engine() -> Engine:
+    return _build_engine(
+        get_settings().SQLALCHEMY_DATABASE_URI, name="primary", engines=_get_primary_engines()
+    )
+
+
+@lru_cache
+def _create_replica_engines() -> Tuple[Engine, ...]:
+    return tuple(
+        _build_engine(uri, name=f"replica-{i}")
+        for i, uri in enumerate(get_settings().SQLALCHEMY_REPLICA_URIS)
+    )
+
+
+@lru_cache
+def _create_replica_router() -> ReplicaRouter:
+    return ReplicaRouter(
+        primary=_create_engine(),
+        replicas=_create_replica_engines(),
+        selection=get_settings().SQLALCHEMY_REPLICA_SELECTION,
     )
 
 
@@ -32,6 +136,78 @@ def _create_session_factory() -> sessionmaker:
     )
 
 
+@lru_cache
+def _create_async_engine() -> AsyncEngine:
+    settings = get_settings()
+    if not settings.SQLALCHEMY_ASYNC_ENGINE:
+        raise ValueError("Async engine is disabled, set SQLALCHEMY_ASYNC_ENGINE")
+    pool_size, max_overflow = _get_pool_limits(_get_primary_engines())
+    database_uri = _get_async_database_uri()
+    engine = create_async_engine(
+        database_uri,
+        poolclass=InstrumentedAsyncAdaptedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_pre_ping=True,
+        echo=settings.SQLALCHEMY_ECHO,
+        connect_args=get_statement_timeout_connect_args(
+            database_uri, settings.SQLALCHEMY_STATEMENT_TIMEOUT_MS
+        ),
+    )
+    _instrument_engine(engine.sync_engine, "async")
+    return engine
+
+
+@lru_cache
+def _create_async_session_factory() -> sessionmaker:
+    engine = _create_async_engine()
+    return sessionmaker(
+        bind=engine,
+        class_=AsyncSession,
+        autocommit=False,
+        autoflush=False,
+        # Expired attributes can't be lazy loaded outside of the greenlet context
+        expire_on_commit=False,
+        future=True,
+    )
+
+
+def _get_created_engines() -> List[Engine]:
+    engines: List[Engine] = []
+    if _create_engine.cache_info().currsize:
+        engines.append(_create_engine())
+    if _create_replica_engines.cache_info().currsize:
+        engines.extend(_create_replica_engines())
+    return engines
+
+
+def dispose_engines(close: bool = True) -> None:
+    """Dispose connection pools of already created engines.
+
+    After a fork, call with `close=False` - pooled connections are shared with the parent
+    process, so they are only dereferenced and new ones are opened on the next checkout.
+    """
+    engines = _get_created_engines()
+    if not close and _create_async_engine.cache_info().currsize:
+        engines.append(_create_async_engine().sync_engine)
+    for engine in engines:
+        engine.dispose(close=close)
+
+
+def reset_engines_after_fork() -> None:
+    dispose_engines(close=False)
+
+
+async def dispose_async_engine() -> None:
+    if _create_async_engine.cache_info().currsize:
+        await _create_async_engine().dispose()
+
+
+async def shutdown_engines() -> None:
+    dispose_engines()
+    await dispose_async_engine()
+
+
 def get_db() -> Generator[Session, None, None]:
     session_factory = _create_session_factory()
     db = session_factory()
@@ -40,3 +216,26 @@ def get_db() -> Generator[Session, None, None]:
     finally:
         db.rollback()
         db.close()
+
+
+def get_read_db() -> Generator[Session, None, None]:
+    """Session for read-only work, bound to a replica if any is configured and available."""
+    connection = _create_replica_router().connect()
+    session_factory = _create_session_factory()
+    db = session_factory(bind=connection)
+    try:
+        yield db
+    finally:
+        db.rollback()
+        db.close()
+        connection.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    session_factory = _create_async_session_factory()
+    db = session_factory()
+    try:
+        yield db
+    finally:
+        await db.rollback()
+        await db.close()
@@ -0,0 +1,139 @@
+"""Connection Pool Statistics
+
+Collects per worker statistics of SQLAlchemy connection pools from pool events:
+- time spent waiting for a connection checkout
+- checked out, idle and overflow connections
+- pre-ping failures and other invalidated connections
+- age of pooled connections
+
+Checkout wait time and checked out connections count are also bound to the
+structlog context, so log entries emitted after a checkout carry
+`db_checkout_wait_ms` and `db_pool_checked_out`.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DisconnectionError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+from structlog.contextvars import bind_contextvars
+
+POOL_STATS: Dict[str, PoolStats] = {}
+
+_CHECKOUT_WAIT_KEY = "checkout_wait_seconds"
+
+
+class _CheckoutTimerMixin:
+    def _do_get(self) -> Any:
+        start = time.perf_counter()
+        record = super()._do_get()  # type: ignore
+        record.info[_CHECKOUT_WAIT_KEY] = time.perf_counter() - start
+        return record
+
+
+class InstrumentedQueuePool(_CheckoutTimerMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(_CheckoutTimerMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+class PoolStats:
+    def __init__(self, name: str, engine: Engine):
+        self.name = name
+        self._engine = engine
+        self._lock = threading.Lock()
+        self._connected_at: Dict[int, float] = {}
+        self.checkouts = 0
+        self.checkout_wait_seconds_total = 0.0
+        self.checkout_wait_seconds_max = 0.0
+        self.connections_opened = 0
+        self.pre_ping_failures = 0
+        self.invalidations = 0
+
+        # Listeners are carried over to the new pool when the engine is disposed
+        event.listen(engine.pool, "connect", self._on_connect)
+        event.listen(engine.pool, "checkout", self._on_checkout)
+        event.listen(engine.pool, "invalidate", self._on_invalidate)
+        event.listen(engine.pool, "close", self._on_close)
+        # dispose(close=False) after fork dereferences the pool without close events
+        event.listen(engine, "engine_disposed", self._on_engine_disposed)
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            connected_at = list(self._connected_at.values())
+            stats = {
+                "name": self.name,
+                "size": _call_pool(self._engine.pool, "size"),
+                "checked_out": _call_pool(self._engine.pool, "checkedout"),
+                "checked_in": _call_pool(self._engine.pool, "checkedin"),
+                "overflow": max(_call_pool(self._engine.pool, "overflow"), 0),
+                "checkouts": self.checkouts,
+                "checkout_wait_seconds_total": self.checkout_wait_seconds_total,
+                "checkout_wait_seconds_max": self.checkout_wait_seconds_max,
+                "connections_opened": self.connections_opened,
+                "pre_ping_failures": self.pre_ping_failures,
+                "invalidations": self.invalidations,
+                "connection_age_seconds_max": now - min(connected_at) if connected_at else 0.0,
+            }
+        return stats
+
+    def reset(self) -> None:
+        """Forget connections of the previous pool, e.g. inherited from the parent process."""
+        with self._lock:
+            self._connected_at.clear()
+
+    def _on_engine_disposed(self, _: Any) -> None:
+        self.reset()
+
+    def _on_connect(self, _: Any, connection_record: Any) -> None:
+        connected_at = time.monotonic()
+        with self._lock:
+            self.connections_opened += 1
+            self._connected_at[id(connection_record)] = connected_at
+
+    def _on_checkout(self, _: Any, connection_record: Any, __: Any) -> None:
+        wait = connection_record.info.pop(_CHECKOUT_WAIT_KEY, 0.0)
+        with self._lock:
+            self.checkouts += 1
+            self.checkout_wait_seconds_total += wait
+            self.checkout_wait_seconds_max = max(self.checkout_wait_seconds_max, wait)
+        bind_contextvars(
+            db_checkout_wait_ms=round(wait * 1000, 3),
+            db_pool_checked_out=_call_pool(self._engine.pool, "checkedout"),
+        )
+
+    def _on_invalidate(
+        self, _: Any, connection_record: Any, exception: Optional[BaseException]
+    ) -> None:
+        with self._lock:
+            self.invalidations += 1
+            if isinstance(exception, DisconnectionError):
+                self.pre_ping_failures += 1
+            self._connected_at.pop(id(connection_record), None)
+
+    def _on_close(self, _: Any, connection_record: Any) -> None:
+        with self._lock:
+            self._connected_at.pop(id(connection_record), None)
+
+
+def register_pool_stats(name: str, engine: Engine) -> PoolStats:
+    pool_stats = PoolStats(name, engine)
+    POOL_STATS[name] = pool_stats
+    return pool_stats
+
+
+def get_pool_stats() -> List[Dict[str, Any]]:
+    return [pool_stats.snapshot() for pool_stats in POOL_STATS.values()]
+
+
+def _call_pool(pool: Pool, method: str) -> int:
+    """Pool sizing methods are available only on QueuePool and its subclasses."""
+    pool_method = getattr(pool, method, None)
+    return pool_method() if pool_method else 0
@@ -0,0 +1,60 @@
+"""Read Replica Routing
+
+Routes read-only sessions to a pool of replica engines.
+Replica is selected with round robin or least connections strategy.
+Replica which can't be connected to (e.g. pool pre-ping and reconnect failed)
+is skipped, and the primary engine is used when no replica is available.
+"""
+import itertools
+from typing import Callable, Dict, List, Sequence
+
+import structlog
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+
+logger: structlog.stdlib.BoundLogger = structlog.get_logger()
+
+
+class ReplicaRouter:
+    def __init__(self, primary: Engine, replicas: Sequence[Engine], selection: str = "round_robin"):
+        if selection not in SELECTION_STRATEGIES:
+            raise ValueError(
+                f"Unknown replica selection '{selection}', "
+                f"expected one of: {', '.join(SELECTION_STRATEGIES)}"
+            )
+        self.primary = primary
+        self.replicas = list(replicas)
+        self._select = SELECTION_STRATEGIES[selection]
+        self._counter = itertools.count()
+
+    def candidates(self) -> List[Engine]:
+        """Replica engines ordered by preference."""
+        if not self.replicas:
+            return []
+        return self._select(self)
+
+    def connect(self) -> Connection:
+        for engine in self.candidates():
+            try:
+                return engine.connect()
+            except DBAPIError as exc:
+                logger.warning("replica_unavailable", replica=repr(engine.url), error=str(exc))
+        return self.primary.connect()
+
+    def _round_robin(self) -> List[Engine]:
+        start = next(self._counter) % len(self.replicas)
+        return self.replicas[start:] + self.replicas[:start]
+
+    def _least_connections(self) -> List[Engine]:
+        return sorted(self.replicas, key=_checked_out_connections)
+
+
+def _checked_out_connections(engine: Engine) -> int:
+    checkedout = getattr(engine.pool, "checkedout", None)
+    return checkedout() if checkedout else 0
+
+
+SELECTION_STRATEGIES: Dict[str, Callable[[ReplicaRouter], List[Engine]]] = {
+    "round_robin": ReplicaRouter._round_robin,
+    "least_connections": ReplicaRouter._least_connections,
+}
@@ -0,0 +1,67 @@
+"""SQL Statement Instrumentation
+
+Times every statement executed on an engine with cursor execution events,
+and logs statements which took longer than the threshold as `slow_query`.
+Log entries carry request context (request_id etc.) bound by the logging middleware.
+
+Server-side statement timeout is set with driver connect arguments,
+so a runaway query is cancelled by the database instead of holding a pooled connection.
+"""
+import time
+from typing import Any, Dict, Optional
+
+import structlog
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine, make_url
+
+logger: structlog.stdlib.BoundLogger = structlog.get_logger()
+
+_START_TIMES_KEY = "statement_start_times"
+
+
+def instrument_statements(engine: Engine, slow_query_ms: float) -> None:
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+    def _after_cursor_execute(
+        conn: Connection,
+        _: Any,
+        statement: str,
+        __: Any,
+        ___: Any,
+        executemany: bool,
+    ) -> None:
+        duration_ms = (time.perf_counter() - conn.info[_START_TIMES_KEY].pop()) * 1000
+        if duration_ms >= slow_query_ms:
+            logger.warning(
+                "slow_query",
+                duration_ms=round(duration_ms, 3),
+                statement=statement,
+                executemany=executemany,
+            )
+
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def get_statement_timeout_connect_args(
+    database_uri: str, statement_timeout_ms: Optional[int]
+) -> Dict[str, Any]:
+    if statement_timeout_ms is None:
+        return {}
+    driver = make_url(database_uri).get_driver_name()
+    if driver == "psycopg2":
+        return {"options": f"-c statement_timeout={statement_timeout_ms}"}
+    if driver == "asyncpg":
+        return {"server_settings": {"statement_timeout": str(statement_timeout_ms)}}
+    logger.warning("statement_timeout_not_supported", driver=driver)
+    return {}
+
+
+def _before_cursor_execute(conn: Connection, *_: Any) -> None:
+    conn.info.setdefault(_START_TIMES_KEY, []).append(time.perf_counter())
+
+
+def _handle_error(context: Any) -> None:
+    start_times = context.connection.info.get(_START_TIMES_KEY) if context.connection else None
+    if start_times:
+        start_times.pop()
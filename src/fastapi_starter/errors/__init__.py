@@ -1 +1,7 @@
-from .handlers import log_http_error, log_unhandled_exception, log_validation_error
+from .dedup import ERROR_LOG_DEDUPLICATOR, ErrorLogDeduplicator
+from .handlers import (
+    invalid_cursor_error,
+    log_http_error,
+    log_unhandled_exception,
+    log_validation_error,
+)
@@ -0,0 +1,94 @@
+"""Error Log Deduplication
+
+During an error storm, identical errors are logged once per time window:
+the first occurrence is logged right away, the following ones are only counted.
+The next occurrence after the window is logged with `repeated=<count>` -
+number of occurrences suppressed since the previous log entry.
+If the error does not occur again, the count is logged as `error_log_suppressed`
+when its window ends (by a timer thread, or by the next `check`), or when the app shuts down.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Tuple
+
+import structlog
+
+logger: structlog.stdlib.BoundLogger = structlog.get_logger()
+
+
+class ErrorLogDeduplicator:
+    def __init__(self, window: float = 10.0, max_keys: int = 1000):
+        self.window = window
+        self.max_keys = max_keys
+        # key -> [start of current window, occurrences suppressed in it], by window start
+        self._entries: "OrderedDict[Hashable, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    def configure(self, window: float, max_keys: int) -> None:
+        self.flush()
+        self.window = window
+        self.max_keys = max_keys
+
+    def check(self, key: Hashable) -> Optional[int]:
+        """None if the error should not be logged, otherwise number of suppressed repeats."""
+        if self.window <= 0:
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < self.window:
+                entry[1] += 1
+                self._schedule_flush(entry[0] + self.window - now)
+                return None
+            repeated = int(entry[1]) if entry is not None else 0
+            self._entries[key] = [now, 0]
+            self._entries.move_to_end(key)
+            ended = self._pop_ended(now)
+            if len(self._entries) > self.max_keys:
+                ended.append(self._entries.popitem(last=False))
+        _log_suppressed_entries(ended)
+        return repeated
+
+    def flush_ended(self) -> None:
+        """Log counts of windows which ended."""
+        with self._lock:
+            self._timer = None
+            ended = self._pop_ended(time.monotonic())
+            for start, suppressed in self._entries.values():
+                if suppressed:
+                    self._schedule_flush(start + self.window - time.monotonic())
+                    break
+        _log_suppressed_entries(ended)
+
+    def flush(self) -> None:
+        with self._lock:
+            entries, self._entries = self._entries, OrderedDict()
+        _log_suppressed_entries(list(entries.items()))
+
+    def _pop_ended(self, now: float) -> List[Tuple[Hashable, List[float]]]:
+        ended = []
+        while self._entries:
+            start, _ = next(iter(self._entries.values()))
+            if now - start < self.window:
+                break
+            ended.append(self._entries.popitem(last=False))
+        return ended
+
+    def _schedule_flush(self, delay: float) -> None:
+        # Timer thread does not survive fork
+        if self._timer is not None and self._timer.is_alive():
+            return
+        self._timer = threading.Timer(max(delay, 0.0), self.flush_ended)
+        self._timer.daemon = True
+        self._timer.start()
+
+
+def _log_suppressed_entries(entries: List[Tuple[Hashable, List[float]]]) -> None:
+    for key, (_, suppressed) in entries:
+        if suppressed:
+            logger.warning("error_log_suppressed", error=key, repeated=int(suppressed))
+
+
+ERROR_LOG_DEDUPLICATOR = ErrorLogDeduplicator()
@@ -1,3 +1,6 @@
+import logging
+from typing import Tuple
+
 import structlog
 from fastapi import Request
 from fastapi.exception_handlers import (
@@ -8,23 +11,68 @@ from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException
 from starlette.responses import JSONResponse
 
+from ..crud.pagination import InvalidCursorError
+from ..metrics import HTTP_ERRORS, REGISTRY
+from ..middleware.routes import get_route_template
+from .dedup import ERROR_LOG_DEDUPLICATOR
+
 logger: structlog.stdlib.BoundLogger = structlog.get_logger()
 
 
 async def log_http_error(request: Request, exc: HTTPException) -> JSONResponse:
-    log = logger.bind(status_code=exc.status_code, detail=exc.detail)
-    if exc.status_code in [401, 403, 404]:
-        log.info("http_error")
-    else:
-        log.error("http_error")
+    if REGISTRY.enabled:
+        HTTP_ERRORS.labels("http_error", exc.status_code).inc()
+    level = logging.INFO if exc.status_code in [401, 403, 404] else logging.ERROR
+    if logger.isEnabledFor(level):
+        route = get_route_template(request.scope)
+        repeated = ERROR_LOG_DEDUPLICATOR.check(
+            ("http_error", exc.status_code, str(exc.detail), route)
+        )
+        if repeated is not None:
+            log = logger.bind(status_code=exc.status_code, detail=exc.detail)
+            if repeated:
+                log = log.bind(repeated=repeated)
+            log.log(level, "http_error")
     return await http_exception_handler(request, exc)
 
 
+async def invalid_cursor_error(request: Request, exc: InvalidCursorError) -> JSONResponse:
+    """Cursor which decodes, but doesn't match keyset columns of the queried model."""
+    return await log_http_error(request, HTTPException(status_code=400, detail="Invalid cursor"))
+
+
 async def log_validation_error(request: Request, exc: RequestValidationError) -> JSONResponse:
-    logger.info("request_validation_error", status_code=422, detail=exc.json())
+    if REGISTRY.enabled:
+        HTTP_ERRORS.labels("request_validation_error", 422).inc()
+    if logger.isEnabledFor(logging.INFO):
+        route = get_route_template(request.scope)
+        errors = tuple((error["loc"], error["type"]) for error in exc.errors())
+        repeated = ERROR_LOG_DEDUPLICATOR.check(("request_validation_error", errors, route))
+        if repeated is not None:
+            # Serialized only when logged
+            log = logger.bind(repeated=repeated) if repeated else logger
+            log.info("request_validation_error", status_code=422, detail=exc.json())
     return await request_validation_exception_handler(request, exc)
 
 
-async def log_unhandled_exception(_: Request, exc: RequestValidationError) -> None:
-    logger.exception("unhandled_exception", status_code=500, exc_info=exc)
+async def log_unhandled_exception(request: Request, exc: RequestValidationError) -> None:
+    if REGISTRY.enabled:
+        HTTP_ERRORS.labels("unhandled_exception", 500).inc()
+    route = get_route_template(request.scope)
+    repeated = ERROR_LOG_DEDUPLICATOR.check(
+        ("unhandled_exception", type(exc).__name__, _raised_at(exc), route)
+    )
+    if repeated is not None:
+        log = logger.bind(repeated=repeated) if repeated else logger
+        log.exception("unhandled_exception", status_code=500, exc_info=exc)
     raise exc from exc
+
+
+def _raised_at(exc: BaseException) -> Tuple[str, int]:
+    """File name and line number where the exception was raised."""
+    tb = exc.__traceback__
+    if tb is None:
+        return "", 0
+    while tb.tb_next is not None:
+        tb = tb.tb_next
+    return tb.tb_frame.f_code.co_filename, tb.tb_lineno
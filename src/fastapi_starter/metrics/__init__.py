@@ -0,0 +1,3 @@
+from .collectors import HTTP_ERRORS, collect_pool_stats  # noqa
+from .endpoint import metrics  # noqa
+from .registry import REGISTRY, Counter, Gauge, Histogram, MetricsRegistry  # noqa
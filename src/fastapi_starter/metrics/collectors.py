@@ -0,0 +1,99 @@
+"""Application Metrics
+
+HTTP request, error, response cache, request coalescing, rate limit
+and database connection pool metrics.
+
+Pool statistics are kept per process by `db.pool_stats`; they are copied to metrics
+by `collect_pool_stats` - on scrape, and at most once per `POOL_STATS_INTERVAL`
+after requests, so workers which do not serve the scrape are up to date too.
+"""
+import threading
+import time
+
+from ..db.pool_stats import get_pool_stats
+from .registry import Counter, Gauge, Histogram
+
+POOL_STATS_INTERVAL = 1.0
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "Total HTTP requests by route template and status code.",
+    ["method", "route", "status_code"],
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request duration in seconds by route template.",
+    ["method", "route"],
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests being processed.",
+)
+HTTP_ERRORS = Counter(
+    "http_errors_total",
+    "Errors handled by application exception handlers.",
+    ["error", "status_code"],
+)
+HTTP_RESPONSE_CACHE_REQUESTS = Counter(
+    "http_response_cache_requests_total",
+    "Requests to cached routes by route template and result (hit, miss, stale).",
+    ["route", "result"],
+)
+HTTP_COALESCED_REQUESTS = Counter(
+    "http_coalesced_requests_total",
+    "Requests served with the response of an identical concurrent request, by route template.",
+    ["route"],
+)
+HTTP_RATE_LIMITED_REQUESTS = Counter(
+    "http_rate_limited_requests_total",
+    "Requests rejected by rate limit, by route template.",
+    ["route"],
+)
+
+DB_POOL_SIZE = Gauge("db_pool_size", "Connection pool size.", ["pool"])
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections", "Connections checked out from pool.", ["pool"]
+)
+DB_POOL_CHECKED_IN = Gauge("db_pool_checked_in_connections", "Idle connections in pool.", ["pool"])
+DB_POOL_OVERFLOW = Gauge("db_pool_overflow_connections", "Overflow connections.", ["pool"])
+DB_POOL_CHECKOUTS = Counter("db_pool_checkouts_total", "Connection checkouts.", ["pool"])
+DB_POOL_CHECKOUT_WAIT = Counter(
+    "db_pool_checkout_wait_seconds_total", "Time spent waiting for connection checkout.", ["pool"]
+)
+DB_POOL_CHECKOUT_WAIT_MAX = Gauge(
+    "db_pool_checkout_wait_seconds_max",
+    "Longest wait for connection checkout.",
+    ["pool"],
+    aggregate="max",
+)
+DB_POOL_CONNECTIONS_OPENED = Counter(
+    "db_pool_connections_opened_total", "Database connections opened.", ["pool"]
+)
+DB_POOL_PRE_PING_FAILURES = Counter(
+    "db_pool_pre_ping_failures_total", "Stale connections detected by pre-ping.", ["pool"]
+)
+DB_POOL_INVALIDATIONS = Counter("db_pool_invalidations_total", "Invalidated connections.", ["pool"])
+
+_pool_stats_lock = threading.Lock()
+_pool_stats_collected_at = 0.0
+
+
+def collect_pool_stats(force: bool = False) -> None:
+    global _pool_stats_collected_at  # pylint: disable=global-statement
+    now = time.monotonic()
+    if not force and now - _pool_stats_collected_at < POOL_STATS_INTERVAL:
+        return
+    with _pool_stats_lock:
+        _pool_stats_collected_at = now
+        for stats in get_pool_stats():
+            pool = stats["name"]
+            DB_POOL_SIZE.labels(pool).set(stats["size"])
+            DB_POOL_CHECKED_OUT.labels(pool).set(stats["checked_out"])
+            DB_POOL_CHECKED_IN.labels(pool).set(stats["checked_in"])
+            DB_POOL_OVERFLOW.labels(pool).set(stats["overflow"])
+            DB_POOL_CHECKOUT_WAIT_MAX.labels(pool).set(stats["checkout_wait_seconds_max"])
+            DB_POOL_CHECKOUTS.labels(pool).set_total(stats["checkouts"])
+            DB_POOL_CHECKOUT_WAIT.labels(pool).set_total(stats["checkout_wait_seconds_total"])
+            DB_POOL_CONNECTIONS_OPENED.labels(pool).set_total(stats["connections_opened"])
+            DB_POOL_PRE_PING_FAILURES.labels(pool).set_total(stats["pre_ping_failures"])
+            DB_POOL_INVALIDATIONS.labels(pool).set_total(stats["invalidations"])
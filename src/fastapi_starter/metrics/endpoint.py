@@ -0,0 +1,11 @@
+from starlette.requests import Request
+from starlette.responses import Response
+
+from .collectors import collect_pool_stats
+from .registry import CONTENT_TYPE_LATEST, REGISTRY
+
+
+def metrics(_: Request) -> Response:
+    """Serve metrics aggregated from all worker processes."""
+    collect_pool_stats(force=True)
+    return Response(REGISTRY.collect(), media_type=CONTENT_TYPE_LATEST)
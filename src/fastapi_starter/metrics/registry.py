@@ -0,0 +1,329 @@
+"""Metrics Registry
+
+Counters, gauges and histograms in Prometheus text exposition format,
+aggregated across worker processes.
+
+Each process writes its values to memory-mapped files in the metrics directory:
+- `counter_<pid>.db` - counters and histograms, summed over all processes, including exited
+- `gauge_<pid>.db` - gauges, summed (or max) over live processes;
+  removed with `mark_process_dead` when a worker exits
+
+Any worker can serve the scrape by reading all files in the directory.
+The directory is shared by all workers (e.g. in /dev/shm) and should be emptied before
+the first worker starts. If it is not configured, a temporary directory is used,
+which is only suitable for a single process.
+
+`enabled` is set by `configure`; code outside of metrics middleware records
+app metrics only if it is set, i.e. if the metrics endpoint is enabled.
+"""
+from __future__ import annotations
+
+import glob
+import json
+import math
+import os
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .storage import MmapValues, read_values
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+_COUNTER = "counter"
+_GAUGE = "gauge"
+
+LabelValues = Tuple[str, ...]
+
+
+class MetricsRegistry:
+    def __init__(self, directory: Optional[str] = None):
+        self._directory = directory
+        self.enabled = False
+        self._metrics: Dict[str, Metric] = {}
+        self._values: Dict[str, MmapValues] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self) -> str:
+        if self._directory is None:
+            self._directory = tempfile.mkdtemp(prefix="fastapi_starter_metrics_")
+        return self._directory
+
+    def configure(self, directory: Optional[str]) -> None:
+        """Write metrics to `directory`; values written before are not moved."""
+        with self._lock:
+            self._close()
+            self._directory = directory
+            self.enabled = True
+            if directory is not None:
+                os.makedirs(directory, exist_ok=True)
+
+    def register(self, metric: Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Duplicate metric: {metric.name}")
+        self._metrics[metric.name] = metric
+
+    def values(self, kind: str) -> MmapValues:
+        values = self._values.get(kind)
+        if values is None:
+            with self._lock:
+                values = self._values.get(kind)
+                if values is None:
+                    path = os.path.join(self.directory, f"{kind}_{os.getpid()}.db")
+                    values = self._values[kind] = MmapValues(path)
+        return values
+
+    def mark_process_dead(self, pid: int) -> None:
+        """Remove gauges of exited worker process; its counters are kept."""
+        path = os.path.join(self.directory, f"{_GAUGE}_{pid}.db")
+        if os.path.exists(path):
+            os.remove(path)
+
+    def reset_after_fork(self) -> None:
+        # Child process must write to files of its own pid
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def collect(self) -> str:
+        """Aggregate values from all processes in Prometheus text format."""
+        samples = self._aggregate()
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {_escape_help(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.expose(samples.get(metric.name, {})))
+        return "\n".join(lines) + "\n"
+
+    def _aggregate(self) -> Dict[str, Dict[Tuple[str, LabelValues], float]]:
+        samples: Dict[str, Dict[Tuple[str, LabelValues], float]] = defaultdict(dict)
+        for path in glob.glob(os.path.join(self.directory, "*.db")):
+            try:
+                values = list(read_values(path))
+            except FileNotFoundError:  # Removed by mark_process_dead
+                continue
+            for key, value in values:
+                metric_name, sample_name, label_values = json.loads(key)
+                metric = self._metrics.get(metric_name)
+                if metric is None:
+                    continue
+                sample_key = (sample_name, tuple(label_values))
+                current = samples[metric_name].get(sample_key)
+                samples[metric_name][sample_key] = (
+                    value if current is None else metric.merge(current, value)
+                )
+        return samples
+
+    def _close(self) -> None:
+        for values in self._values.values():
+            values.close()
+        self._values = {}
+
+
+class Metric(ABC):
+    type: str
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: Optional[MetricsRegistry] = None,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._registry = registry or REGISTRY
+        self._children: Dict[LabelValues, Any] = {}
+        self._registry.register(self)
+
+    def labels(self, *labelvalues: Any) -> Any:
+        child = self._children.get(labelvalues)
+        if child is None:
+            if len(labelvalues) != len(self.labelnames):
+                raise ValueError(f"Expected labels {self.labelnames}, got {labelvalues}")
+            child = self._children[labelvalues] = self._create_child(
+                tuple(str(value) for value in labelvalues)
+            )
+        return child
+
+    def merge(self, current: float, value: float) -> float:
+        return current + value
+
+    def expose(self, samples: Dict[Tuple[str, LabelValues], float]) -> Iterable[str]:
+        for (sample_name, label_values), value in sorted(samples.items()):
+            yield _sample_line(sample_name, self.labelnames, label_values, value)
+
+    def _key(self, sample_name: str, label_values: LabelValues) -> str:
+        return json.dumps([self.name, sample_name, label_values])
+
+    @abstractmethod
+    def _create_child(self, label_values: LabelValues) -> Any:
+        pass
+
+
+class Counter(Metric):
+    type = _COUNTER
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def _create_child(self, label_values: LabelValues) -> _CounterChild:
+        return _CounterChild(self._registry, self._key(self.name, label_values))
+
+
+class Gauge(Metric):
+    type = _GAUGE
+
+    def __init__(self, *args: Any, aggregate: str = "sum", **kwargs: Any):
+        if aggregate not in ("sum", "max"):
+            raise ValueError(f"Unsupported aggregate: {aggregate}")
+        self.aggregate = aggregate
+        super().__init__(*args, **kwargs)
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def merge(self, current: float, value: float) -> float:
+        return max(current, value) if self.aggregate == "max" else current + value
+
+    def _create_child(self, label_values: LabelValues) -> _GaugeChild:
+        return _GaugeChild(self._registry, self._key(self.name, label_values))
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, *args: Any, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs: Any):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(*args, **kwargs)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def expose(self, samples: Dict[Tuple[str, LabelValues], float]) -> Iterable[str]:
+        bucket_name, sum_name, count_name = (
+            f"{self.name}{s}" for s in ("_bucket", "_sum", "_count")
+        )
+        label_sets = sorted({labels for (name, labels) in samples if name == count_name})
+        labelnames = self.labelnames + ("le",)
+        for label_values in label_sets:
+            cumulative = 0.0
+            for le in _bucket_labels(self.buckets):
+                cumulative += samples.get((bucket_name, label_values + (le,)), 0.0)
+                yield _sample_line(bucket_name, labelnames, label_values + (le,), cumulative)
+            for name in (sum_name, count_name):
+                yield _sample_line(
+                    name, self.labelnames, label_values, samples[(name, label_values)]
+                )
+
+    def _create_child(self, label_values: LabelValues) -> _HistogramChild:
+        return _HistogramChild(
+            self._registry,
+            self.buckets,
+            [
+                self._key(f"{self.name}_bucket", label_values + (le,))
+                for le in _bucket_labels(self.buckets)
+            ],
+            self._key(f"{self.name}_sum", label_values),
+            self._key(f"{self.name}_count", label_values),
+        )
+
+
+class _CounterChild:
+    def __init__(self, registry: MetricsRegistry, key: str):
+        self._registry = registry
+        self._key = key
+
+    def inc(self, amount: float = 1.0) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only be incremented by non-negative amounts")
+        self._registry.values(_COUNTER).inc(self._key, amount)
+
+    def set_total(self, value: float) -> None:
+        """Set cumulative value of this process, for counters mirrored from another source."""
+        self._registry.values(_COUNTER).set(self._key, value)
+
+
+class _GaugeChild:
+    def __init__(self, registry: MetricsRegistry, key: str):
+        self._registry = registry
+        self._key = key
+
+    def set(self, value: float) -> None:
+        self._registry.values(_GAUGE).set(self._key, value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._registry.values(_GAUGE).inc(self._key, amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._registry.values(_GAUGE).inc(self._key, -amount)
+
+
+class _HistogramChild:
+    def __init__(
+        self,
+        registry: MetricsRegistry,
+        buckets: Tuple[float, ...],
+        bucket_keys: List[str],
+        sum_key: str,
+        count_key: str,
+    ):
+        self._registry = registry
+        self._buckets = buckets
+        self._bucket_keys = bucket_keys
+        self._sum_key = sum_key
+        self._count_key = count_key
+
+    def observe(self, value: float) -> None:
+        values = self._registry.values(_COUNTER)
+        index = len(self._buckets)
+        for i, bound in enumerate(self._buckets):
+            if value <= bound:
+                index = i
+                break
+        # Per bucket counts are stored; cumulative counts are computed on scrape
+        values.inc(self._bucket_keys[index], 1.0)
+        values.inc(self._sum_key, value)
+        values.inc(self._count_key, 1.0)
+
+
+def _bucket_labels(buckets: Tuple[float, ...]) -> List[str]:
+    return [_format_value(bound) for bound in buckets] + ["+Inf"]
+
+
+def _sample_line(
+    name: str, labelnames: Tuple[str, ...], label_values: LabelValues, value: float
+) -> str:
+    if not labelnames:
+        return f"{name} {_format_value(value)}"
+    labels = ",".join(
+        f'{labelname}="{_escape_label_value(label_value)}"'
+        for labelname, label_value in zip(labelnames, label_values)
+    )
+    return f"{name}{{{labels}}} {_format_value(value)}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value))
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _escape_help(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n")
+
+
+REGISTRY = MetricsRegistry()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=REGISTRY.reset_after_fork)
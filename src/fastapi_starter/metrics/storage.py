@@ -0,0 +1,112 @@
+"""Memory-Mapped Metric Values
+
+Every process writes its metric values to its own memory-mapped file, so updating a metric
+is a write to shared memory without locks between processes or syscalls.
+Any process can read all files in the directory and aggregate them into one scrape.
+
+File layout:
+- 8 byte header with number of used bytes
+- entries of 4 byte key length, UTF-8 key padded to 8 bytes and 8 byte float value
+"""
+import mmap
+import os
+import struct
+import threading
+from typing import Dict, Iterator, Tuple, Union
+
+_HEADER = struct.Struct("<Q")
+_KEY_LENGTH = struct.Struct("<I")
+_VALUE = struct.Struct("<d")
+
+INITIAL_SIZE = 64 * 1024
+
+
+class MmapValues:
+    """Float values by key in a memory-mapped file; written by one process only."""
+
+    def __init__(self, path: str, initial_size: int = INITIAL_SIZE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._offsets: Dict[str, int] = {}
+        self._file = open(path, "a+b")  # pylint: disable=consider-using-with
+        size = max(os.fstat(self._file.fileno()).st_size, initial_size)
+        self._file.truncate(size)
+        self._mmap = mmap.mmap(self._file.fileno(), size)
+        self._used = _HEADER.unpack_from(self._mmap, 0)[0] or _HEADER.size
+        for key, _, offset in _read_entries(self._mmap, self._used):
+            self._offsets[key] = offset
+
+    def get(self, key: str) -> float:
+        with self._lock:
+            return _VALUE.unpack_from(self._mmap, self._offset(key))[0]  # type: ignore
+
+    def set(self, key: str, value: float) -> None:
+        with self._lock:
+            _VALUE.pack_into(self._mmap, self._offset(key), value)
+
+    def inc(self, key: str, amount: float) -> None:
+        with self._lock:
+            offset = self._offset(key)
+            value = _VALUE.unpack_from(self._mmap, offset)[0]
+            _VALUE.pack_into(self._mmap, offset, value + amount)
+
+    def close(self) -> None:
+        with self._lock:
+            self._mmap.close()
+            self._file.close()
+
+    def _offset(self, key: str) -> int:
+        offset = self._offsets.get(key)
+        if offset is None:
+            offset = self._offsets[key] = self._add_entry(key)
+        return offset
+
+    def _add_entry(self, key: str) -> int:
+        encoded = key.encode("utf-8")
+        padded_length = _KEY_LENGTH.size + len(encoded)
+        padded_length += -padded_length % 8
+        entry_size = padded_length + _VALUE.size
+        while self._used + entry_size > len(self._mmap):
+            self._grow()
+        start = self._used
+        key_start = start + _KEY_LENGTH.size
+        key_end = key_start + len(encoded)
+        _KEY_LENGTH.pack_into(self._mmap, start, len(encoded))
+        self._mmap[key_start:key_end] = encoded
+        offset = start + padded_length
+        _VALUE.pack_into(self._mmap, offset, 0.0)
+        self._used += entry_size
+        # Header is updated last, so readers never see a partially written entry
+        _HEADER.pack_into(self._mmap, 0, self._used)
+        return offset
+
+    def _grow(self) -> None:
+        size = len(self._mmap) * 2
+        self._mmap.close()
+        self._file.truncate(size)
+        self._mmap = mmap.mmap(self._file.fileno(), size)
+
+
+def read_values(path: str) -> Iterator[Tuple[str, float]]:
+    """Read all values from file written by `MmapValues` in any process."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < _HEADER.size:
+        return
+    used = min(_HEADER.unpack_from(data, 0)[0], len(data))
+    for key, value, _ in _read_entries(data, used):
+        yield key, value
+
+
+def _read_entries(data: Union[bytes, mmap.mmap], used: int) -> Iterator[Tuple[str, float, int]]:
+    position = _HEADER.size
+    while position + _KEY_LENGTH.size <= used:
+        key_length = _KEY_LENGTH.unpack_from(data, position)[0]
+        key_start = position + _KEY_LENGTH.size
+        key_end = key_start + key_length
+        key = data[key_start:key_end].decode("utf-8")
+        padded_length = _KEY_LENGTH.size + key_length
+        padded_length += -padded_length % 8
+        offset = position + padded_length
+        yield key, _VALUE.unpack_from(data, offset)[0], offset
+        position = offset + _VALUE.size
@@ -1 +1,17 @@
-from .logging import LoggingMiddleware, StructlogLoggingMiddlewareFactory  # noqa
+from .compression import CompressionMiddleware  # noqa
+from .etag import ETagMiddleware  # noqa
+from .log_queue import OverflowPolicy, stop_log_queue  # noqa
+from .logging import (  # noqa
+    LoggingMiddleware,
+    LogRenderer,
+    StructlogLoggingMiddlewareFactory,
+)
+from .metrics import MetricsMiddleware  # noqa
+from .profiling import ProfilerMode, ProfilingMiddleware  # noqa
+from .rate_limit import (  # noqa
+    ApiKeyValidator,
+    RateLimit,
+    RateLimitKey,
+    RateLimitMiddleware,
+    TokenBuckets,
+)
@@ -0,0 +1,258 @@
+"""Compression Middleware
+
+Compresses response bodies with the encoding preferred by the server among those accepted
+by the client (`Accept-Encoding`, with q-values):
+- br - requires `brotli` package
+- zstd - requires `zstandard` package
+- gzip
+
+Responses are not compressed when they:
+- are smaller than `minimum_size` bytes
+- have a content type which is already compressed (images, archives...) or must not be
+  delayed (server-sent events)
+- already have a `Content-Encoding`
+
+Strong ETag of a compressed response is made weak, as the compressed body is not
+byte-for-byte the one the ETag was computed for.
+
+Streaming responses are compressed chunk by chunk and every chunk is flushed, so the client
+receives data as soon as the app sends it. Only the first `minimum_size` bytes are buffered,
+to find out if the response is large enough to be compressed.
+"""
+import zlib
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Sequence
+
+import structlog
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+logger: structlog.stdlib.BoundLogger = structlog.get_logger()
+
+DEFAULT_EXCLUDED_CONTENT_TYPES = (
+    "image/",
+    "video/",
+    "audio/",
+    "font/woff",
+    "application/gzip",
+    "application/x-gzip",
+    "application/zip",
+    "application/zstd",
+    "application/octet-stream",
+    "text/event-stream",
+)
+
+
+class Compressor(ABC):
+    @abstractmethod
+    def compress(self, data: bytes) -> bytes:
+        pass
+
+    @abstractmethod
+    def flush(self) -> bytes:
+        """Compressed data of everything passed so far, without ending the stream."""
+        pass
+
+    @abstractmethod
+    def finish(self) -> bytes:
+        pass
+
+
+class GzipCompressor(Compressor):
+    def __init__(self, level: int = 6):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliCompressor(Compressor):
+    def __init__(self, quality: int = 4):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return bytes(self._compressor.process(data))
+
+    def flush(self) -> bytes:
+        return bytes(self._compressor.flush())
+
+    def finish(self) -> bytes:
+        return bytes(self._compressor.finish())
+
+
+class ZstdCompressor(Compressor):
+    def __init__(self, level: int = 3):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return bytes(self._compressor.compress(data))
+
+    def flush(self) -> bytes:
+        return bytes(self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK))
+
+    def finish(self) -> bytes:
+        return bytes(self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH))
+
+
+COMPRESSORS = {"br": BrotliCompressor, "zstd": ZstdCompressor, "gzip": GzipCompressor}
+_AVAILABLE = {"br": brotli is not None, "zstd": zstandard is not None, "gzip": True}
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        encodings: Sequence[str] = ("br", "zstd", "gzip"),
+        minimum_size: int = 500,
+        excluded_content_types: Sequence[str] = DEFAULT_EXCLUDED_CONTENT_TYPES,
+    ):
+        for encoding in encodings:
+            if encoding not in COMPRESSORS:
+                raise ValueError(f"Unsupported encoding: {encoding}")
+        unavailable = [encoding for encoding in encodings if not _AVAILABLE[encoding]]
+        if unavailable:
+            logger.warning("compression_encodings_unavailable", encodings=unavailable)
+        self.app = app
+        # In order of preference
+        self.encodings = [encoding for encoding in encodings if _AVAILABLE[encoding]]
+        self.minimum_size = minimum_size
+        self.excluded_content_types = tuple(t.lower() for t in excluded_content_types)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(self, self._negotiate(Headers(scope=scope)), send)
+        await self.app(scope, receive, responder.send)
+
+    def _negotiate(self, headers: Headers) -> Optional[str]:
+        accepted = parse_accept_encoding(headers.get("accept-encoding", ""))
+        wildcard = accepted.get("*", 0.0)
+        for encoding in self.encodings:
+            if accepted.get(encoding, wildcard) > 0:
+                return encoding
+        return None
+
+    def is_compressible(self, headers: Headers) -> bool:
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "").lower()
+        return not content_type.startswith(self.excluded_content_types)
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: Optional[str], send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self.start_message: Optional[Message] = None
+        self.passthrough = False
+        self.compressor: Optional[Compressor] = None
+        self.buffered: List[bytes] = []
+        self.buffered_size = 0
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            await self._start(message)
+        elif message["type"] == "http.response.body" and not self.passthrough:
+            await self._body(message)
+        else:
+            await self._send(message)
+
+    async def _start(self, message: Message) -> None:
+        headers = MutableHeaders(raw=message["headers"])
+        if message["status"] == 304:
+            headers.add_vary_header("Accept-Encoding")
+        if message["status"] in (204, 304) or not self.middleware.is_compressible(headers):
+            self.passthrough = True
+            await self._send(message)
+            return
+        # Representation depends on Accept-Encoding, even if this one is not compressed
+        headers.add_vary_header("Accept-Encoding")
+        content_length = headers.get("content-length")
+        too_small = (
+            content_length is not None and int(content_length) < self.middleware.minimum_size
+        )
+        if self.encoding is None or too_small:
+            self.passthrough = True
+            await self._send(message)
+            return
+        self.start_message = message
+
+    async def _body(self, message: Message) -> None:
+        body: bytes = message.get("body", b"")
+        more_body: bool = message.get("more_body", False)
+        if self.compressor is not None:
+            data = self.compressor.compress(body)
+            data += self.compressor.flush() if more_body else self.compressor.finish()
+            await self._send({"type": "http.response.body", "body": data, "more_body": more_body})
+            return
+
+        self.buffered.append(body)
+        self.buffered_size += len(body)
+        if self.buffered_size < self.middleware.minimum_size:
+            if more_body:
+                return
+            await self._send_uncompressed()
+            return
+        await self._start_compressed(more_body)
+
+    async def _send_uncompressed(self) -> None:
+        assert self.start_message is not None  # nosec: B101
+        await self._send(self.start_message)
+        await self._send({"type": "http.response.body", "body": b"".join(self.buffered)})
+
+    async def _start_compressed(self, more_body: bool) -> None:
+        assert self.start_message is not None and self.encoding is not None  # nosec: B101
+        compressor = self.compressor = COMPRESSORS[self.encoding]()
+        data = compressor.compress(b"".join(self.buffered))
+        data += compressor.flush() if more_body else compressor.finish()
+        self.buffered = []
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        headers["content-encoding"] = self.encoding
+        etag = headers.get("etag")
+        if etag is not None and not etag.startswith("W/"):
+            # Compressed body is a different representation; it is equivalent, but not identical
+            headers["etag"] = f"W/{etag}"
+        if more_body:
+            del headers["content-length"]
+        else:
+            headers["content-length"] = str(len(data))
+        await self._send(self.start_message)
+        await self._send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+
+def parse_accept_encoding(value: str) -> Dict[str, float]:
+    """Encodings with their q-values; invalid q-value is treated as 0."""
+    accepted: Dict[str, float] = {}
+    for item in value.split(","):
+        encoding, _, params = item.partition(";")
+        encoding = encoding.strip().lower()
+        if not encoding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, param_value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(param_value)
+                except ValueError:
+                    q = 0.0
+        accepted[encoding] = q
+    return accepted
@@ -0,0 +1,90 @@
+"""ETag Middleware
+
+Adds ETag to GET and HEAD responses and answers `If-None-Match` with 304 Not Modified,
+without sending the body.
+
+- ETag set by the handler (e.g. `updated_date_etag`) is used as is; the response is
+  compared as soon as its headers are sent, so its body is dropped
+- otherwise a strong ETag is computed from the body - only for 200 responses sent in one
+  piece; streaming responses are passed through without ETag
+
+The body is still rendered by the app when the ETag is computed from it; handlers which know
+the validator up front can skip serialization with `check_not_modified`.
+"""
+import hashlib
+from typing import List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..responses.conditional import NOT_MODIFIED_HEADERS, etag_matches
+
+
+class ETagMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+        responder = _ETagResponder(Headers(scope=scope).get("if-none-match"), send)
+        await self.app(scope, receive, responder.send)
+
+
+class _ETagResponder:
+    def __init__(self, if_none_match: Optional[str], send: Send):
+        self.if_none_match = if_none_match
+        self._send = send
+        self.start_message: Optional[Message] = None
+        self.passthrough = False
+        self.not_modified = False
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            await self._start(message)
+        elif message["type"] != "http.response.body" or self.passthrough:
+            await self._send(message)
+        elif not self.not_modified:
+            await self._body(message)
+
+    async def _start(self, message: Message) -> None:
+        headers = Headers(raw=message["headers"])
+        etag = headers.get("etag")
+        if message["status"] != 200:
+            self.passthrough = True
+            await self._send(message)
+        elif etag is not None:
+            # Validator supplied by the handler
+            if etag_matches(self.if_none_match, etag):
+                self.not_modified = True
+                await self._send_not_modified(message)
+            else:
+                self.passthrough = True
+                await self._send(message)
+        else:
+            self.start_message = message
+
+    async def _body(self, message: Message) -> None:
+        assert self.start_message is not None  # nosec: B101
+        self.passthrough = True
+        if message.get("more_body", False):
+            await self._send(self.start_message)
+            await self._send(message)
+            return
+        etag = f'"{hashlib.blake2b(message.get("body", b""), digest_size=16).hexdigest()}"'
+        MutableHeaders(raw=self.start_message["headers"])["etag"] = etag
+        if etag_matches(self.if_none_match, etag):
+            await self._send_not_modified(self.start_message)
+            return
+        await self._send(self.start_message)
+        await self._send(message)
+
+    async def _send_not_modified(self, message: Message) -> None:
+        headers: List[Tuple[bytes, bytes]] = [
+            (name, value)
+            for name, value in message["headers"]
+            if name.decode("latin-1").lower() in NOT_MODIFIED_HEADERS
+        ]
+        await self._send({"type": "http.response.start", "status": 304, "headers": headers})
+        await self._send({"type": "http.response.body", "body": b""})
@@ -0,0 +1,175 @@
+"""Background Log Writer
+
+Log records are put on a bounded in-memory queue and written to the output stream
+by a background thread, so a slow stdout (e.g. container log driver under pressure)
+does not block the event loop.
+
+When the queue is full, the overflow policy decides what happens to a new record:
+- block - wait until the writer frees up space in the queue
+- drop_oldest - discard the oldest queued record to make room for the new one
+- drop - discard the new record
+
+Discarded records are counted and reported by the writer as `log_records_dropped` event,
+rendered by the structlog processor chain, every `report_interval` seconds while records
+are being written, and when the writer stops.
+The writer flushes the queue on application shutdown and on interpreter exit,
+and is restarted in child processes after fork.
+"""
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from enum import Enum
+from logging.handlers import QueueHandler, QueueListener
+from typing import List, Optional, TextIO
+
+import structlog
+
+DROPPED_REPORT_INTERVAL = 60.0  # Seconds
+
+
+class OverflowPolicy(Enum):
+    BLOCK = "block"
+    DROP_OLDEST = "drop_oldest"
+    DROP = "drop"
+
+
+class BoundedQueueHandler(QueueHandler):
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]", overflow: OverflowPolicy):
+        super().__init__(log_queue)
+        self.overflow = overflow
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def reset(self, log_queue: "queue.Queue[logging.LogRecord]") -> None:
+        self.queue = log_queue
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.overflow is OverflowPolicy.BLOCK:
+            self.queue.put(record)
+            return
+        while True:
+            try:
+                self.queue.put_nowait(record)
+                return
+            except queue.Full:
+                if self.overflow is OverflowPolicy.DROP:
+                    self._count_dropped()
+                    return
+            try:
+                self.queue.get_nowait()
+                self._count_dropped()
+            except queue.Empty:
+                pass
+
+    def take_dropped(self) -> int:
+        """Number of records dropped since the last call."""
+        with self._dropped_lock:
+            dropped, self.dropped = self.dropped, 0
+        return dropped
+
+    def _count_dropped(self) -> None:
+        with self._dropped_lock:
+            self.dropped += 1
+
+
+class _BlockingQueueListener(QueueListener):
+    def __init__(
+        self,
+        log_queue: "queue.Queue[logging.LogRecord]",
+        handler: logging.Handler,
+        queue_handler: BoundedQueueHandler,
+        report_interval: float,
+    ):
+        super().__init__(log_queue, handler)
+        self.queue_handler = queue_handler
+        self.report_interval = report_interval
+        self._reported_at = time.monotonic()
+
+    def handle(self, record: logging.LogRecord) -> None:
+        super().handle(record)
+        if time.monotonic() - self._reported_at >= self.report_interval:
+            self.report_dropped()
+
+    def report_dropped(self) -> None:
+        self._reported_at = time.monotonic()
+        dropped = self.queue_handler.take_dropped()
+        if dropped:
+            _log_dropped(dropped, list(self.handlers))
+
+    def enqueue_sentinel(self) -> None:
+        # Default put_nowait raises if the queue is full; records ahead of sentinel must be written
+        self.queue.put(self._sentinel)  # type: ignore
+
+
+_handler: Optional[BoundedQueueHandler] = None
+_listener: Optional[_BlockingQueueListener] = None
+_lock = threading.Lock()
+
+
+def start_log_queue(
+    stream: TextIO,
+    max_size: int,
+    overflow: OverflowPolicy = OverflowPolicy.BLOCK,
+    report_interval: float = DROPPED_REPORT_INTERVAL,
+) -> BoundedQueueHandler:
+    """Start background writer to `stream`; returns handler to add to a logger."""
+    global _handler, _listener  # pylint: disable=global-statement
+    stop_log_queue()
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(max_size)
+    with _lock:
+        _handler = BoundedQueueHandler(log_queue, overflow)
+        _listener = _BlockingQueueListener(
+            log_queue, logging.StreamHandler(stream), _handler, report_interval
+        )
+        _listener.start()
+        return _handler
+
+
+def stop_log_queue() -> None:
+    """Write all queued records and stop background writer."""
+    global _handler, _listener  # pylint: disable=global-statement
+    with _lock:
+        if _listener is None or _handler is None:
+            return
+        _listener.stop()
+        _listener.report_dropped()
+        _handler = None
+        _listener = None
+
+
+def _log_dropped(dropped: int, handlers: List[logging.Handler]) -> None:
+    # Rendered like any other event (e.g. as JSON), but written by the writer's own handlers;
+    # the queue may be full or the writer stopped
+    target = logging.Logger(__name__)
+    target.propagate = False
+    for handler in handlers:
+        target.addHandler(handler)
+    log: structlog.stdlib.BoundLogger = structlog.wrap_logger(
+        target, wrapper_class=structlog.stdlib.BoundLogger
+    )
+    log.warning("log_records_dropped", dropped=dropped)
+
+
+def _restart_after_fork() -> None:
+    global _lock  # pylint: disable=global-statement
+    # Writer thread does not survive fork, and queue or lock may be left locked by it
+    _lock = threading.Lock()
+    if _listener is None or _handler is None:
+        return
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(_handler.queue.maxsize)
+    _handler.reset(log_queue)
+    _listener.queue = log_queue
+    _listener._thread = None  # pylint: disable=protected-access
+    _listener.start()
+
+
+atexit.register(stop_log_queue)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
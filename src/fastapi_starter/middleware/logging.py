@@ -10,6 +10,20 @@ asgi-correlation-id library is used for request_id handling with default configu
 If X-Request-ID is not present in request header, new unique request_id is generated.
 X-Request-ID is returned in response headers.
 
+Logging middleware is a pure ASGI middleware - it binds request context
+straight from the ASGI scope, without wrapping request and response objects.
+
+Log output is written synchronously to stdout by default. With `queue_size` set,
+records are written by a background thread from a bounded queue - see `log_queue` module.
+
+In production (not dev) mode, log entries are rendered either as sorted key=value pairs,
+or as JSON with `LogRenderer.JSON` - serialized with orjson if installed, stdlib json otherwise.
+
+After the response is sent, logging middleware emits an `access` log entry with
+status_code, duration_ms, request_bytes, response_bytes and route template.
+Access log entries are sampled - with separate sample rates for successful (< 400)
+and error responses - and are not emitted for excluded paths, e.g. healthcheck endpoint.
+
 Supported loggers:
 - structlog via StructlogLoggingMiddlewareFactory
 
@@ -22,24 +36,44 @@ Globally binded keys to every log entry:
 """
 from __future__ import annotations
 
+import json
 import logging
+import random
 import sys
+import time
 from abc import ABC, abstractmethod
 from enum import Enum
-from typing import Type
+from functools import lru_cache
+from typing import Any, Callable, Optional, Sequence, Tuple, Type
 
 import structlog
 from asgi_correlation_id import CorrelationIdMiddleware
 from asgi_correlation_id.context import correlation_id
-from fastapi import FastAPI, Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from fastapi import FastAPI
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from structlog.contextvars import bind_contextvars, clear_contextvars, merge_contextvars
+from structlog.types import Processor
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+from .log_queue import OverflowPolicy, start_log_queue
+from .routes import get_route_template
+
+logger: structlog.stdlib.BoundLogger = structlog.get_logger()
 
 
 class SupportedLoggers(Enum):
     STRUCTLOG = "structlog"
 
 
+class LogRenderer(Enum):
+    KEY_VALUE = "key_value"
+    JSON = "json"
+
+
 class LoggingMiddleware:
     def __init__(
         self,
@@ -49,6 +83,12 @@ class LoggingMiddleware:
         timestamp_fmt: str = "iso",
         timestamp_utc: bool = False,
         dev: bool = True,
+        queue_size: Optional[int] = None,
+        queue_overflow: OverflowPolicy = OverflowPolicy.BLOCK,
+        renderer: LogRenderer = LogRenderer.KEY_VALUE,
+        access_log_sample_rate: float = 1.0,
+        access_log_error_sample_rate: float = 1.0,
+        access_log_exclude_paths: Sequence[str] = (),
     ):
         self._app = app
         self._factory = factory
@@ -56,6 +96,12 @@ class LoggingMiddleware:
         self._timestamp_fmt = timestamp_fmt
         self._timestamp_utc = timestamp_utc
         self._dev = dev
+        self._queue_size = queue_size
+        self._queue_overflow = queue_overflow
+        self._renderer = renderer
+        self._access_log_sample_rate = access_log_sample_rate
+        self._access_log_error_sample_rate = access_log_error_sample_rate
+        self._access_log_exclude_paths = access_log_exclude_paths
 
         self._configure_logging()
         self._add_logging_middleware()
@@ -68,11 +114,19 @@ class LoggingMiddleware:
             timestamp_fmt=self._timestamp_fmt,
             timestamp_utc=self._timestamp_utc,
             dev=self._dev,
+            queue_size=self._queue_size,
+            queue_overflow=self._queue_overflow,
+            renderer=self._renderer,
         )
 
     def _add_logging_middleware(self) -> None:
         logging_middeware = self._factory.create_logging_middeware()
-        self._app.add_middleware(logging_middeware)
+        self._app.add_middleware(
+            logging_middeware,
+            sample_rate=self._access_log_sample_rate,
+            error_sample_rate=self._access_log_error_sample_rate,
+            exclude_paths=self._access_log_exclude_paths,
+        )
 
     def _add_request_id_middleware(self) -> None:
         self._app.add_middleware(CorrelationIdMiddleware)
@@ -96,13 +150,28 @@ class BaseLoggingConfigurator(ABC):
         timestamp_fmt: str,
         timestamp_utc: bool,
         dev: bool,
+        queue_size: Optional[int] = None,
+        queue_overflow: OverflowPolicy = OverflowPolicy.BLOCK,
+        renderer: LogRenderer = LogRenderer.KEY_VALUE,
     ) -> None:
         pass
 
 
-class BaseLoggingMiddleware(ABC, BaseHTTPMiddleware):
+class BaseLoggingMiddleware(ABC):
+    def __init__(
+        self,
+        app: ASGIApp,
+        sample_rate: float = 1.0,
+        error_sample_rate: float = 1.0,
+        exclude_paths: Sequence[str] = (),
+    ):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.error_sample_rate = error_sample_rate
+        self.exclude_paths = frozenset(exclude_paths)
+
     @abstractmethod
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         pass
 
 
@@ -121,25 +190,20 @@ class StructlogLoggingConfigurator(BaseLoggingConfigurator):
         timestamp_fmt: str,
         timestamp_utc: bool,
         dev: bool,
+        queue_size: Optional[int] = None,
+        queue_overflow: OverflowPolicy = OverflowPolicy.BLOCK,
+        renderer: LogRenderer = LogRenderer.KEY_VALUE,
     ) -> None:
-        processors = [
-            merge_contextvars,
-            structlog.stdlib.filter_by_level,
-            structlog.stdlib.add_logger_name,
-            structlog.stdlib.add_log_level,
-            structlog.processors.TimeStamper(fmt=timestamp_fmt, utc=timestamp_utc),
-            structlog.processors.StackInfoRenderer(),
-            structlog.processors.format_exc_info,
-            structlog.processors.UnicodeDecoder(),
-        ]
-        if dev:
-            processors.append(structlog.processors.ExceptionPrettyPrinter())
-            processors.append(structlog.dev.ConsoleRenderer())
+        processors = get_structlog_processors(timestamp_fmt, timestamp_utc, dev, renderer)
+        handler: logging.Handler
+        # basicConfig does nothing if root logger already has handlers
+        if queue_size and not logging.root.handlers:
+            handler = start_log_queue(sys.stdout, max_size=queue_size, overflow=queue_overflow)
         else:
-            processors.append(structlog.processors.KeyValueRenderer(sort_keys=True))
-        logging.basicConfig(format="%(message)s", stream=sys.stdout, level=log_level)
+            handler = logging.StreamHandler(sys.stdout)
+        logging.basicConfig(format="%(message)s", handlers=[handler], level=log_level)
         structlog.configure(
-            processors=processors,  # type: ignore
+            processors=list(processors),
             context_class=dict,
             logger_factory=structlog.stdlib.LoggerFactory(),
             wrapper_class=structlog.stdlib.BoundLogger,
@@ -147,15 +211,88 @@ class StructlogLoggingConfigurator(BaseLoggingConfigurator):
         )
 
 
+@lru_cache
+def get_structlog_processors(
+    timestamp_fmt: str, timestamp_utc: bool, dev: bool, renderer: LogRenderer
+) -> Tuple[Processor, ...]:
+    """Processor chain is built once per configuration and reused on reconfiguration."""
+    processors: Tuple[Processor, ...] = (
+        merge_contextvars,
+        structlog.stdlib.filter_by_level,
+        structlog.stdlib.add_logger_name,
+        structlog.stdlib.add_log_level,
+        structlog.processors.TimeStamper(fmt=timestamp_fmt, utc=timestamp_utc),
+        structlog.processors.StackInfoRenderer(),
+        structlog.processors.format_exc_info,
+        structlog.processors.UnicodeDecoder(),
+    )
+    if dev:
+        return processors + (
+            structlog.processors.ExceptionPrettyPrinter(),
+            structlog.dev.ConsoleRenderer(),
+        )
+    if renderer is LogRenderer.JSON:
+        return processors + (structlog.processors.JSONRenderer(serializer=get_json_serializer()),)
+    return processors + (structlog.processors.KeyValueRenderer(sort_keys=True),)
+
+
+def get_json_serializer() -> Callable[..., str]:
+    return _orjson_dumps if orjson is not None else json.dumps
+
+
+def _orjson_dumps(obj: Any, default: Optional[Callable[[Any], Any]] = None, **_: Any) -> str:
+    # stdlib logging handlers expect str, orjson returns bytes
+    return orjson.dumps(obj, default=default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
 class StructlogLoggingMiddleware(BaseLoggingMiddleware):
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        client = scope.get("client")
         clear_contextvars()
         bind_contextvars(
-            method=request.method,
-            path=request.url.path,
-            remote_addr=request.client and request.client.host,
+            method=scope["method"],
+            path=scope.get("root_path", "") + scope["path"],
+            remote_addr=client[0] if client else None,
             request_id=correlation_id.get(),
-            scheme=request.url.scheme,
+            scheme=scope.get("scheme", "http"),
         )
-        response = await call_next(request)
-        return response
+        if scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.monotonic_ns()
+        status_code = 500
+        request_bytes = 0
+        response_bytes = 0
+
+        async def receive_counted() -> Message:
+            nonlocal request_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                request_bytes += len(message.get("body", b""))
+            return message
+
+        async def send_counted(message: Message) -> None:
+            nonlocal status_code, response_bytes
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_counted, send_counted)
+        finally:
+            sample_rate = self.sample_rate if status_code < 400 else self.error_sample_rate
+            if sample_rate >= 1.0 or random.random() < sample_rate:
+                logger.info(
+                    "access",
+                    status_code=status_code,
+                    duration_ms=(time.monotonic_ns() - start) / 1_000_000,
+                    request_bytes=request_bytes,
+                    response_bytes=response_bytes,
+                    route=get_route_template(scope),
+                )
@@ -0,0 +1,293 @@
+"""Profiling Middleware
+
+Profiles a single request on demand, to find out why an endpoint is slow in production.
+
+A request is profiled when:
+- its profiling header (X-Profile by default) matches the configured secret, or
+- it is picked by sampling rule - sample rate, optionally limited to path prefixes
+
+Profilers:
+- sampling - stacks of all threads are sampled while request is processed, so sync endpoints
+  running in threadpool are included; written as speedscope JSON (https://www.speedscope.app)
+- deterministic - cProfile of event loop thread; written as pstats file
+
+Profile is written to the configured directory, or returned inline instead of the response
+body for header-triggered requests when no directory is configured.
+Concurrent requests handled while profiling are part of the profile as well.
+Only one request at a time is profiled by cProfile, other requests are not profiled meanwhile.
+
+When a request is not profiled, only the request headers are scanned for the profiling header.
+"""
+from __future__ import annotations
+
+import cProfile
+import hmac
+import io
+import json
+import marshal  # nosec: B403
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from enum import Enum
+from types import FrameType
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import structlog
+from asgi_correlation_id.context import correlation_id
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger: structlog.stdlib.BoundLogger = structlog.get_logger()
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+Frame = Tuple[str, str, int]
+
+# cProfile profiles of overlapping requests would conflict
+_deterministic_lock = threading.Lock()
+
+
+class ProfilerMode(Enum):
+    SAMPLING = "sampling"
+    DETERMINISTIC = "deterministic"
+
+
+class ProfilingMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        secret: Optional[str] = None,
+        header: str = "X-Profile",
+        sample_rate: float = 0.0,
+        paths: Sequence[str] = (),
+        mode: ProfilerMode = ProfilerMode.SAMPLING,
+        directory: Optional[str] = None,
+        interval: float = 0.001,
+    ):
+        if sample_rate > 0 and directory is None:
+            raise ValueError("Sampled profiles can only be written to a directory")
+        self.app = app
+        self.secret = secret.encode() if secret else None
+        self.header = header.lower().encode("latin-1")
+        self.sample_rate = sample_rate
+        self.paths = tuple(paths)
+        self.mode = mode
+        self.directory = directory
+        self.interval = interval
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        requested = self._is_requested(scope)
+        if not requested and not self._is_sampled(scope):
+            await self.app(scope, receive, send)
+            return
+        if self.mode is not ProfilerMode.DETERMINISTIC:
+            await self._profile(scope, receive, send, requested)
+            return
+        if not _deterministic_lock.acquire(blocking=False):
+            logger.info("request_not_profiled", reason="another request is being profiled")
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self._profile(scope, receive, send, requested)
+        finally:
+            _deterministic_lock.release()
+
+    async def _profile(self, scope: Scope, receive: Receive, send: Send, requested: bool) -> None:
+        profiler = self._create_profiler()
+        inline = requested and self.directory is None
+        response: List[Message] = []
+
+        async def send_buffered(message: Message) -> None:
+            response.append(message)
+
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_buffered if inline else send)
+        finally:
+            profiler.stop()
+            if not inline:
+                await run_in_threadpool(self._write, scope, profiler)
+        if inline:
+            await self._send_inline(profiler, response, send)
+
+    def _is_requested(self, scope: Scope) -> bool:
+        if self.secret is None:
+            return False
+        for name, value in scope["headers"]:
+            if name == self.header:
+                return hmac.compare_digest(value, self.secret)
+        return False
+
+    def _is_sampled(self, scope: Scope) -> bool:
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return False
+        return not self.paths or scope["path"].startswith(self.paths)
+
+    def _create_profiler(self) -> Profiler:
+        if self.mode is ProfilerMode.DETERMINISTIC:
+            return DeterministicProfiler()
+        return SamplingProfiler(interval=self.interval)
+
+    def _write(self, scope: Scope, profiler: Profiler) -> None:
+        assert self.directory is not None  # nosec: B101
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}_{correlation_id.get() or os.getpid()}"
+        path = os.path.join(self.directory, name + profiler.extension)
+        with open(path, "wb") as f:
+            f.write(profiler.dump(title=f"{scope['method']} {scope['path']}"))
+        logger.info("request_profiled", profile=path, duration_ms=profiler.duration * 1000)
+
+    async def _send_inline(self, profiler: Profiler, response: List[Message], send: Send) -> None:
+        start = next((m for m in response if m["type"] == "http.response.start"), None)
+        body = profiler.report()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", profiler.report_media_type.encode("latin-1")),
+                    (b"content-length", str(len(body)).encode("latin-1")),
+                    (b"x-profiled-status", str(start["status"] if start else 500).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+class Profiler(ABC):
+    extension: str
+    report_media_type: str
+
+    def __init__(self) -> None:
+        self.duration = 0.0
+        self._start = 0.0
+
+    def start(self) -> None:
+        self._start = time.perf_counter()
+
+    def stop(self) -> None:
+        self.duration = time.perf_counter() - self._start
+
+    @abstractmethod
+    def dump(self, title: str) -> bytes:
+        """Profile in file format."""
+        pass
+
+    @abstractmethod
+    def report(self) -> bytes:
+        """Profile returned inline instead of response body."""
+        pass
+
+
+class DeterministicProfiler(Profiler):
+    extension = ".prof"
+    report_media_type = "text/plain; charset=utf-8"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._profile = cProfile.Profile()
+
+    def start(self) -> None:
+        super().start()
+        self._profile.enable()
+
+    def stop(self) -> None:
+        self._profile.disable()
+        super().stop()
+
+    def dump(self, title: str) -> bytes:
+        # Same format as pstats.Stats.dump_stats, readable by pstats and snakeviz
+        self._profile.create_stats()
+        return marshal.dumps(self._profile.stats)  # type: ignore
+
+    def report(self) -> bytes:
+        report = io.StringIO()
+        pstats.Stats(self._profile, stream=report).sort_stats("cumulative").print_stats(50)
+        return report.getvalue().encode()
+
+
+class SamplingProfiler(Profiler):
+    extension = ".speedscope.json"
+    report_media_type = "application/json"
+
+    def __init__(self, interval: float = 0.001):
+        super().__init__()
+        self.interval = interval
+        self._samples: Dict[int, List[Tuple[float, Tuple[Frame, ...]]]] = {}
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self) -> None:
+        super().start()
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+        super().stop()
+
+    def _run(self) -> None:
+        own_thread_id = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            now = time.perf_counter() - self._start
+            for (
+                thread_id,
+                frame,
+            ) in sys._current_frames().items():  # pylint: disable=protected-access
+                if thread_id != own_thread_id:
+                    self._samples.setdefault(thread_id, []).append((now, _stack(frame)))
+
+    def dump(self, title: str) -> bytes:
+        frames: Dict[Frame, int] = {}
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        profiles = []
+        for thread_id, samples in self._samples.items():
+            stacks = [[frames.setdefault(f, len(frames)) for f in stack] for _, stack in samples]
+            # Sample stands for time elapsed since previous one
+            times = [0.0] + [sampled_at for sampled_at, _ in samples]
+            weights = [end - start for start, end in zip(times, times[1:])]
+            profiles.append(
+                {
+                    "type": "sampled",
+                    "name": thread_names.get(thread_id, str(thread_id)),
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": self.duration,
+                    "samples": stacks,
+                    "weights": weights,
+                }
+            )
+        return json.dumps(
+            {
+                "$schema": SPEEDSCOPE_SCHEMA,
+                "name": title,
+                "exporter": "fastapi_starter",
+                "shared": {
+                    "frames": [
+                        {"name": name, "file": file, "line": line} for (file, name, line) in frames
+                    ]
+                },
+                "profiles": profiles,
+            }
+        ).encode()
+
+    def report(self) -> bytes:
+        return self.dump(title="request")
+
+
+def _stack(frame: Optional[FrameType]) -> Tuple[Frame, ...]:
+    stack: List[Frame] = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append((code.co_filename, code.co_name, code.co_firstlineno))
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
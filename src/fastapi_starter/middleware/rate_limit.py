@@ -0,0 +1,283 @@
+"""Rate Limit Middleware
+
+Limits requests per client with token buckets; rejected requests get 429 Too Many Requests
+with `Retry-After`. Limits are given as `<requests>/<second|minute|hour|day>`, e.g. `100/minute`
+allows bursts of 100 requests and refills 100 tokens per minute.
+
+Clients are identified by:
+- `RateLimitKey.IP` - client address (`remote_addr`; set from X-Forwarded-For by the server
+  behind a trusted proxy)
+- `RateLimitKey.API_KEY` - API key header and client address, client address if the header
+  is not set; API keys accepted by `api_key_validator` get one bucket from all addresses,
+  others are limited by client address
+- a function of the ASGI scope; requests it returns None for are not limited
+
+All routes share one bucket per client, except routes with own limit (by route template)
+which have own bucket per client.
+
+Buckets are kept by `TokenBuckets` in a memory-mapped file (e.g. in /dev/shm) shared by all
+worker processes, so limits hold no matter which worker serves the request. Each bucket is
+a single timestamp (GCRA: time when the bucket will be full again) in a slot of a hash table.
+Python can't compare-and-swap in shared memory, so a bucket is updated under `fcntl` lock of
+its slots - an uncontended lock is a single system call and does not block other slots.
+The middleware does not wait for the lock on the event loop, it retries after a short sleep.
+A key is looked up in `PROBES` consecutive slots; when all are taken by other keys, the bucket
+which is fullest is replaced, so the table only forgets clients which are close to full anyway.
+"""
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from enum import Enum
+from functools import lru_cache
+from typing import (
+    Any,
+    Callable,
+    Iterator,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from ..metrics import REGISTRY
+from ..metrics.collectors import HTTP_RATE_LIMITED_REQUESTS
+from .metrics import UNMATCHED_ROUTE
+from .routes import match_route_template
+
+PROBES = 4
+
+_LOCK_RETRY_INTERVAL = 0.001
+
+_SLOT = struct.Struct("<16sd8x")  # Key hash, time when bucket is full
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+_LIMIT_PATTERN = re.compile(r"^\s*(\d+)\s*/\s*(second|minute|hour|day)s?\s*$")
+
+
+class RateLimitKey(Enum):
+    IP = "ip"
+    API_KEY = "api_key"
+
+
+class RateLimit(NamedTuple):
+    rate: float  # Tokens per second
+    burst: int
+
+    @classmethod
+    def parse(cls, limit: str) -> "RateLimit":
+        match = _LIMIT_PATTERN.match(limit.lower())
+        if match is None or int(match.group(1)) == 0:
+            raise ValueError(f"Invalid rate limit {limit!r}, expected e.g. '100/minute'")
+        requests = int(match.group(1))
+        return cls(requests / _PERIODS[match.group(2)], requests)
+
+
+KeyFunction = Callable[[Scope], Optional[str]]
+ApiKeyValidator = Callable[[str], bool]
+
+
+class TokenBuckets:
+    def __init__(self, path: Optional[str] = None, slots: int = 65536):
+        """Buckets in file at `path`; in anonymous memory of each process if not set."""
+        if slots < PROBES:
+            raise ValueError(f"At least {PROBES} slots are required")
+        self.path = path
+        self.slots = slots
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._fd = -1
+        self._mmap: Optional[mmap.mmap] = None
+
+    def acquire(self, key: str, limit: RateLimit, now: Optional[float] = None) -> float:
+        """Take a token; 0 if taken, otherwise seconds until a token is available.
+
+        Waits for the lock of the bucket, async code should use `try_acquire`.
+        """
+        wait = self._acquire(key, limit, now, blocking=True)
+        assert wait is not None  # nosec: B101
+        return wait
+
+    def try_acquire(
+        self, key: str, limit: RateLimit, now: Optional[float] = None
+    ) -> Optional[float]:
+        """Like `acquire`, but None if the bucket is locked by another process."""
+        return self._acquire(key, limit, now, blocking=False)
+
+    def _acquire(
+        self, key: str, limit: RateLimit, now: Optional[float], blocking: bool
+    ) -> Optional[float]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        start = int.from_bytes(digest[:8], "little") % (self.slots - PROBES + 1)
+        now = time.time() if now is None else now
+        interval = 1.0 / limit.rate
+        data = self._open()
+        with self._locked(start, blocking) as locked:
+            if not locked:
+                return None
+            index, full_at = self._find(data, digest, start)
+            new_full_at = max(full_at, now) + interval
+            wait = new_full_at - now - limit.burst * interval
+            if wait > 0:
+                return wait
+            _SLOT.pack_into(data, index * _SLOT.size, digest, new_full_at)
+            return 0.0
+
+    def close(self) -> None:
+        with self._lock:
+            if self._mmap is not None and self._pid == os.getpid():
+                self._mmap.close()
+                if self._fd >= 0:
+                    os.close(self._fd)
+            self._mmap = None
+            self._pid = None
+
+    def _find(self, data: mmap.mmap, digest: bytes, start: int) -> Tuple[int, float]:
+        replaced, replaced_full_at = start, math.inf
+        for index in range(start, start + PROBES):
+            slot_digest, full_at = _SLOT.unpack_from(data, index * _SLOT.size)
+            if slot_digest == digest:
+                return index, full_at
+            if full_at < replaced_full_at:
+                replaced, replaced_full_at = index, full_at
+        return replaced, 0.0
+
+    @contextmanager
+    def _locked(self, start: int, blocking: bool = True) -> Iterator[bool]:
+        if not self._lock.acquire(blocking):
+            yield False
+            return
+        try:
+            if self._fd < 0:
+                yield True
+                return
+            try:
+                fcntl.lockf(
+                    self._fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB), PROBES, start
+                )
+            except OSError:
+                if blocking:
+                    raise
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, PROBES, start)
+        finally:
+            self._lock.release()
+
+    def _open(self) -> mmap.mmap:
+        if self._mmap is not None and self._pid == os.getpid():
+            return self._mmap
+        with self._lock:
+            if self._mmap is None or self._pid != os.getpid():
+                size = self.slots * _SLOT.size
+                if self.path is None:
+                    self._fd = -1
+                    self._mmap = mmap.mmap(-1, size)
+                else:
+                    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                    self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+                    if os.fstat(self._fd).st_size < size:
+                        os.ftruncate(self._fd, size)
+                    self._mmap = mmap.mmap(self._fd, size)
+                self._pid = os.getpid()
+        return self._mmap
+
+
+class RateLimitMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        limit: Union[RateLimit, str, None] = None,
+        route_limits: Optional[Mapping[str, Union[RateLimit, str]]] = None,
+        key: Union[RateLimitKey, KeyFunction] = RateLimitKey.IP,
+        api_key_header: str = "X-API-Key",
+        api_key_validator: Optional[ApiKeyValidator] = None,
+        exclude_paths: Sequence[str] = (),
+        buckets: Optional[TokenBuckets] = None,
+    ):
+        self.app = app
+        self.limit = _as_rate_limit(limit) if limit is not None else None
+        self.route_limits = {
+            route: _as_rate_limit(route_limit)
+            for route, route_limit in (route_limits or {}).items()
+        }
+        self.api_key_header = api_key_header
+        self.api_key_validator = api_key_validator
+        key_functions = {RateLimitKey.IP: client_address, RateLimitKey.API_KEY: self._api_key}
+        self.key: KeyFunction = key if callable(key) else key_functions[key]
+        self.exclude_paths = tuple(exclude_paths)
+        self.buckets = buckets or TokenBuckets()
+        self._router: Any = None
+        self.resolve_route = lru_cache(maxsize=1024)(self._resolve_route)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.exclude_paths):
+            await self.app(scope, receive, send)
+            return
+        route = self._route(scope)
+        limit = self.route_limits.get(route, self.limit) if route is not None else self.limit
+        client = self.key(scope) if limit is not None else None
+        if limit is None or client is None:
+            await self.app(scope, receive, send)
+            return
+        bucket = f"{route}\n{client}" if route in self.route_limits else f"\n{client}"
+        wait = self.buckets.try_acquire(bucket, limit)
+        while wait is None:
+            await anyio.sleep(_LOCK_RETRY_INTERVAL)
+            wait = self.buckets.try_acquire(bucket, limit)
+        if not wait:
+            await self.app(scope, receive, send)
+            return
+        if REGISTRY.enabled:
+            HTTP_RATE_LIMITED_REQUESTS.labels(route or UNMATCHED_ROUTE).inc()
+        response = JSONResponse(
+            {"detail": "Too Many Requests"},
+            status_code=429,
+            headers={"Retry-After": str(math.ceil(wait))},
+        )
+        await response(scope, receive, send)
+
+    def _route(self, scope: Scope) -> Optional[str]:
+        if not self.route_limits:
+            return None
+        # Rate limit is checked before routing; routes are matched by path only
+        if self._router is None:
+            self._router = scope.get("app")
+        return self.resolve_route(scope["path"])
+
+    def _resolve_route(self, path: str) -> Optional[str]:
+        return match_route_template(self._router, path)
+
+    def _api_key(self, scope: Scope) -> Optional[str]:
+        api_key = Headers(scope=scope).get(self.api_key_header)
+        address = client_address(scope)
+        if not api_key:
+            return address
+        if self.api_key_validator is None:
+            # Not authenticated, must not exhaust the bucket of the key from other addresses
+            return f"{address or ''}\nkey:{api_key}"
+        return f"key:{api_key}" if self.api_key_validator(api_key) else address
+
+
+def client_address(scope: Scope) -> Optional[str]:
+    client = scope.get("client")
+    return f"ip:{client[0]}" if client else None
+
+
+def _as_rate_limit(limit: Union[RateLimit, str]) -> RateLimit:
+    return RateLimit.parse(limit) if isinstance(limit, str) else limit
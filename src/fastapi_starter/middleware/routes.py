@@ -0,0 +1,55 @@
+"""Route Templates
+
+Looks up path template (e.g. `/api/v1/heroes/{hero_id}`) of the route which handled a request,
+so middleware can log and group requests by route instead of by concrete path.
+
+Router sets matched `endpoint` in the ASGI scope; templates are mapped by endpoint
+once per application and rebuilt when an unknown endpoint is seen (e.g. route added later).
+Routes inside mounted applications are not resolved.
+
+Middleware which runs before routing resolves the template from the path with
+`match_route_template` instead; routes are matched by path only.
+"""
+from typing import Any, Callable, Dict, Optional
+from weakref import WeakKeyDictionary
+
+from starlette.routing import Match
+from starlette.types import Scope
+
+_ROUTE_TEMPLATES: "WeakKeyDictionary[Any, Dict[Callable[..., Any], Optional[str]]]" = (
+    WeakKeyDictionary()
+)
+
+
+def get_route_template(scope: Scope) -> Optional[str]:
+    """Path template of matched route; None if no route matched yet."""
+    app = scope.get("app")
+    endpoint = scope.get("endpoint")
+    if app is None or endpoint is None:
+        return None
+    templates = _ROUTE_TEMPLATES.get(app)
+    if templates is None or endpoint not in templates:
+        templates = _ROUTE_TEMPLATES[app] = _map_route_templates(app)
+        # Do not rebuild on every request for endpoints which are not routes of the app
+        templates.setdefault(endpoint, None)
+    return templates[endpoint]
+
+
+def _map_route_templates(app: Any) -> Dict[Callable[..., Any], Optional[str]]:
+    templates: Dict[Callable[..., Any], Optional[str]] = {}
+    for route in getattr(app, "routes", []):
+        endpoint = getattr(route, "endpoint", None)
+        path = getattr(route, "path", None)
+        if endpoint is not None and path is not None:
+            templates.setdefault(endpoint, path)
+    return templates
+
+
+def match_route_template(app: Any, path: str) -> Optional[str]:
+    """Path template of the first route of `app` matching `path`; None if none matches."""
+    scope = {"type": "http", "path": path, "method": "GET"}
+    for route in getattr(app, "routes", []):
+        match, _ = route.matches(scope)
+        if match is not Match.NONE:
+            return getattr(route, "path", None)
+    return None
@@ -0,0 +1,19 @@
+from .cache import (  # noqa
+    RESPONSE_CACHE,
+    CachePolicy,
+    ResponseCache,
+    cache_response,
+    enable_response_cache,
+)
+from .coalescing import coalesce_requests, enable_request_coalescing  # noqa
+from .conditional import check_not_modified, etag_matches, updated_date_etag  # noqa
+from .json import (  # noqa
+    DirectSerializationRoute,
+    FastJSONResponse,
+    JSONSerializer,
+    enable_direct_serialization,
+    get_json_response_class,
+)
+from .shared_cache import SharedMemoryCache  # noqa
+from .single_flight import SingleFlight  # noqa
+from .streaming import csv_response, ndjson_response  # noqa
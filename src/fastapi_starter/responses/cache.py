@@ -0,0 +1,334 @@
+"""Response Cache
+
+Caches responses of idempotent GET routes, declared per route:
+
+    @router.get("/heroes/", response_model=List[Hero])
+    @cache_response(ttl=30, vary_query=["skip", "limit"], vary_headers=["accept-language"])
+    def read_heroes(...):
+
+The cache key is the path, query parameters in `vary_query` (all if not set) and request
+headers in `vary_headers`. On a hit the route is not called at all - dependencies are not
+resolved either, so routes which depend on the user must vary by the header identifying them
+(e.g. `authorization`) or not be cached. Routes are switched to the cache by
+`enable_response_cache`, after they are added and after `enable_direct_serialization`.
+
+Tiers:
+- in-process `LRUCache`
+- optional `SharedMemoryCache` (e.g. in /dev/shm), so a response computed by one worker
+  is served by all of them
+
+Only one caller recomputes an expired entry: concurrent requests of a process wait for it,
+other workers wait for the recompute lock of the entry in shared memory, up to `lock_timeout`.
+Meanwhile, the expired entry is served stale for up to another `ttl`.
+Only 200 responses without Set-Cookie or `Cache-Control: no-store / private` are cached;
+`X-Cache` response header tells HIT, MISS or STALE.
+"""
+import os
+import time
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+from urllib.parse import parse_qsl, urlencode
+
+import anyio
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..crud.cache import LRUCache
+from ..metrics import REGISTRY
+from ..metrics.collectors import HTTP_RESPONSE_CACHE_REQUESTS
+from .shared_cache import SharedMemoryCache
+from .single_flight import SingleFlight
+
+HIT = "HIT"
+MISS = "MISS"
+STALE = "STALE"
+
+_CACHE_POLICY = "_response_cache_policy"
+_LOCK_POLL_INTERVAL = 0.01
+_UNCACHEABLE_DIRECTIVES = ("no-store", "private")
+
+Endpoint = Callable[..., Any]
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    ttl: float
+    vary_headers: Tuple[str, ...] = ()
+    vary_query: Optional[Tuple[str, ...]] = None
+
+    def cache_key(self, scope: Scope) -> str:
+        query = parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True)
+        if self.vary_query is not None:
+            query = [(name, value) for name, value in query if name in self.vary_query]
+        headers = Headers(scope=scope)
+        # Header values and paths can't contain a newline
+        return "\n".join(
+            [
+                scope.get("root_path", "") + scope["path"],
+                urlencode(sorted(query)),
+                *(headers.get(name, "") for name in self.vary_headers),
+            ]
+        )
+
+
+@dataclass
+class CachedResponse:
+    status: int
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+
+    def encode(self) -> bytes:
+        headers = b"\r\n".join(name + b":" + value for name, value in self.headers)
+        return b"%d\r\n%d\r\n%b%b" % (self.status, len(headers), headers, self.body)
+
+    async def send(self, send: Send, headers: Sequence[Tuple[bytes, bytes]] = ()) -> None:
+        """Send response with additional headers."""
+        replaced = {b"content-length"} | {name for name, _ in headers}
+        raw_headers = [
+            (name, value) for name, value in self.headers if name.lower() not in replaced
+        ]
+        raw_headers.append((b"content-length", str(len(self.body)).encode("latin-1")))
+        raw_headers.extend(headers)
+        await send({"type": "http.response.start", "status": self.status, "headers": raw_headers})
+        await send({"type": "http.response.body", "body": self.body})
+
+    @classmethod
+    def decode(cls, data: bytes) -> "CachedResponse":
+        status, headers_length, rest = data.split(b"\r\n", 2)
+        split = int(headers_length)
+        headers, body = rest[:split], rest[split:]
+        return cls(
+            int(status),
+            [tuple(h.split(b":", 1)) for h in headers.split(b"\r\n") if h],  # type: ignore
+            body,
+        )
+
+
+class _Entry(NamedTuple):
+    expires_at: float
+    stale_until: float
+    response: CachedResponse
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        max_size: int = 1024,
+        shared: Optional[SharedMemoryCache] = None,
+        lock_timeout: float = 5.0,
+    ):
+        self.local = LRUCache(max_size=max_size, ttl=None)
+        self.shared = shared
+        self.lock_timeout = lock_timeout
+        self._flights: SingleFlight[Tuple[CachedResponse, str, bool]] = SingleFlight()
+
+    def configure(
+        self,
+        max_size: int = 1024,
+        shared_dir: Optional[str] = None,
+        slots: int = 1024,
+        slot_size: int = 64 * 1024,
+        lock_timeout: float = 5.0,
+    ) -> None:
+        if self.shared is not None:
+            self.shared.close()
+        self.local = LRUCache(max_size=max_size, ttl=None)
+        self.shared = (
+            SharedMemoryCache(os.path.join(shared_dir, "responses.cache"), slots, slot_size)
+            if shared_dir
+            else None
+        )
+        self.lock_timeout = lock_timeout
+
+    def get(self, key: str) -> Optional[_Entry]:
+        """Fresh or stale entry; None if not cached."""
+        now = time.time()
+        entry: Optional[_Entry] = self.local.get(key)
+        if entry is not None and entry.expires_at > now:
+            return entry
+        if self.shared is not None:
+            shared = self.shared.get(key)
+            if shared is not None and (entry is None or shared.expires_at > entry.expires_at):
+                response = CachedResponse.decode(shared.value)
+                entry = _Entry(shared.expires_at, shared.stale_until, response)
+                self.local.set(key, entry)
+        if entry is None or entry.stale_until <= now:
+            return None
+        return entry
+
+    def set(self, key: str, response: CachedResponse, ttl: float) -> None:
+        now = time.time()
+        entry = _Entry(now + ttl, now + 2 * ttl, response)
+        self.local.set(key, entry)
+        if self.shared is not None:
+            # Too large responses, or ones whose slot is being written, are cached per process only
+            self.shared.set(key, entry.expires_at, entry.stale_until, response.encode())
+
+    def clear(self) -> None:
+        """Clear in-process tier."""
+        self.local.clear()
+
+    async def get_or_compute(
+        self,
+        key: str,
+        ttl: float,
+        compute: Callable[[], Awaitable[Tuple[CachedResponse, bool]]],
+    ) -> Tuple[CachedResponse, str]:
+        """Cached response, or response computed by `compute`, which tells if it is cacheable.
+
+        Returns the response and HIT, MISS or STALE.
+        """
+        entry = self.get(key)
+        if entry is not None and entry.expires_at > time.time():
+            return entry.response, HIT
+        if entry is not None and key in self._flights:
+            # Recomputed by another request of this process
+            return entry.response, STALE
+        (response, status, cacheable), shared = await self._flights.do(
+            key, lambda: self._compute(key, ttl, entry, compute)
+        )
+        if not shared:
+            return response, status
+        if cacheable:
+            return response, STALE if status == STALE else HIT
+        response, _ = await compute()
+        return response, MISS
+
+    async def _compute(
+        self,
+        key: str,
+        ttl: float,
+        entry: Optional[_Entry],
+        compute: Callable[[], Awaitable[Tuple[CachedResponse, bool]]],
+    ) -> Tuple[CachedResponse, str, bool]:
+        shared = self.shared
+        locked = shared is not None and shared.try_lock(key)
+        if shared is not None and not locked:
+            # Recomputed by another worker
+            if entry is not None:
+                return entry.response, STALE, True
+            deadline = time.monotonic() + self.lock_timeout
+            while not locked and time.monotonic() < deadline:
+                await anyio.sleep(_LOCK_POLL_INTERVAL)
+                entry = self.get(key)
+                if entry is not None and entry.expires_at > time.time():
+                    return entry.response, HIT, True
+                locked = shared.try_lock(key)
+        try:
+            response, cacheable = await compute()
+            if cacheable:
+                self.set(key, response, ttl)
+            return response, MISS, cacheable
+        finally:
+            if locked:
+                assert shared is not None  # nosec: B101
+                shared.unlock(key)
+
+
+RESPONSE_CACHE = ResponseCache()
+
+
+def cache_response(
+    ttl: float,
+    vary_headers: Sequence[str] = (),
+    vary_query: Optional[Sequence[str]] = None,
+) -> Callable[[Endpoint], Endpoint]:
+    """Declare route endpoint cacheable for `ttl` seconds."""
+    policy = CachePolicy(
+        ttl,
+        tuple(name.lower() for name in vary_headers),
+        tuple(vary_query) if vary_query is not None else None,
+    )
+
+    def decorator(endpoint: Endpoint) -> Endpoint:
+        setattr(endpoint, _CACHE_POLICY, policy)
+        return endpoint
+
+    return decorator
+
+
+def get_cache_policy(endpoint: Endpoint) -> Optional[CachePolicy]:
+    return getattr(endpoint, _CACHE_POLICY, None)
+
+
+def enable_response_cache(app: FastAPI, cache: ResponseCache = RESPONSE_CACHE) -> None:
+    """Switch routes added so far with `cache_response` to the cache."""
+    for route in app.routes:
+        if not isinstance(route, APIRoute) or isinstance(route.app, CachedRouteApp):
+            continue
+        policy = get_cache_policy(route.endpoint)
+        if policy is not None:
+            route.app = CachedRouteApp(route.app, route.path, policy, cache)
+
+
+class CachedRouteApp:
+    def __init__(self, app: ASGIApp, route: str, policy: CachePolicy, cache: ResponseCache):
+        self.app = app
+        self.route = route
+        self.policy = policy
+        self.cache = cache
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        async def compute() -> Tuple[CachedResponse, bool]:
+            recorder = ResponseRecorder()
+            await self.app(scope, receive, recorder.send)
+            return recorder.response, recorder.cacheable
+
+        response, status = await self.cache.get_or_compute(
+            self.policy.cache_key(scope), self.policy.ttl, compute
+        )
+        if REGISTRY.enabled:
+            HTTP_RESPONSE_CACHE_REQUESTS.labels(self.route, status.lower()).inc()
+        await response.send(send, [(b"x-cache", status.encode("latin-1"))])
+
+
+class ResponseRecorder:
+    """Buffers whole response, streaming responses too."""
+
+    def __init__(self) -> None:
+        self.start_message: Message = {"status": 500, "headers": []}
+        self.body: List[bytes] = []
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start_message = message
+        elif message["type"] == "http.response.body":
+            self.body.append(message.get("body", b""))
+
+    @property
+    def response(self) -> CachedResponse:
+        return CachedResponse(
+            self.start_message["status"],
+            list(self.start_message.get("headers", [])),
+            b"".join(self.body),
+        )
+
+    @property
+    def shareable(self) -> bool:
+        """Response can be sent to other clients."""
+        return "set-cookie" not in Headers(raw=self.start_message.get("headers", []))
+
+    @property
+    def cacheable(self) -> bool:
+        headers = Headers(raw=self.start_message.get("headers", []))
+        cache_control = headers.get("cache-control", "").lower()
+        return (
+            self.start_message["status"] == 200
+            and self.shareable
+            and not any(directive in cache_control for directive in _UNCACHEABLE_DIRECTIVES)
+        )
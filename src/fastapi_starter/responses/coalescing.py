@@ -0,0 +1,92 @@
+"""Request Coalescing
+
+Identical concurrent requests of a route are handled once per worker, and the response is
+sent to all of them - e.g. when a popular resource expires from caches. Declared per route:
+
+    @router.get("/heroes/{hero_id}", response_model=Hero)
+    @coalesce_requests()
+    def read_hero(hero_id: int, db: Session = Depends(get_db)):
+
+Requests are identical if they have the same path, query string and `vary_headers`, which
+default to the headers identifying the client (`Authorization`, `Cookie`), so responses are not
+shared between clients. Routes are switched to coalescing by `enable_request_coalescing`,
+after they are added and before `enable_response_cache`.
+
+Responses are buffered, streaming responses too; responses with Set-Cookie are not shared -
+waiting requests are handled on their own. Errors are shared. Requests served with the
+response of another request are counted by `http_coalesced_requests_total`.
+"""
+from typing import Any, Callable, Optional, Sequence, Tuple
+
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from ..metrics import REGISTRY
+from ..metrics.collectors import HTTP_COALESCED_REQUESTS
+from .cache import CachedResponse, ResponseRecorder
+from .single_flight import SingleFlight
+
+DEFAULT_VARY_HEADERS = ("authorization", "cookie")
+
+_COALESCE_VARY_HEADERS = "_coalesce_vary_headers"
+
+Endpoint = Callable[..., Any]
+
+
+def coalesce_requests(
+    vary_headers: Sequence[str] = DEFAULT_VARY_HEADERS,
+) -> Callable[[Endpoint], Endpoint]:
+    """Declare route endpoint safe to share responses between identical concurrent requests."""
+    headers = tuple(name.lower() for name in vary_headers)
+
+    def decorator(endpoint: Endpoint) -> Endpoint:
+        setattr(endpoint, _COALESCE_VARY_HEADERS, headers)
+        return endpoint
+
+    return decorator
+
+
+def enable_request_coalescing(app: FastAPI) -> None:
+    """Switch routes added so far with `coalesce_requests` to coalescing."""
+    for route in app.routes:
+        if not isinstance(route, APIRoute) or isinstance(route.app, CoalescedRouteApp):
+            continue
+        vary_headers = getattr(route.endpoint, _COALESCE_VARY_HEADERS, None)
+        if vary_headers is not None:
+            route.app = CoalescedRouteApp(route.app, route.path, vary_headers)
+
+
+class CoalescedRouteApp:
+    def __init__(self, app: ASGIApp, route: str, vary_headers: Sequence[str]):
+        self.app = app
+        self.route = route
+        self.vary_headers = vary_headers
+        self.flights: SingleFlight[Tuple[CachedResponse, bool]] = SingleFlight()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        async def handle() -> Tuple[CachedResponse, bool]:
+            recorder = ResponseRecorder()
+            await self.app(scope, receive, recorder.send)
+            return recorder.response, recorder.shareable
+
+        (response, shareable), shared = await self.flights.do(self.request_key(scope), handle)
+        if shared and not shareable:
+            response, _ = await handle()
+        elif shared and REGISTRY.enabled:
+            HTTP_COALESCED_REQUESTS.labels(self.route).inc()
+        await response.send(send)
+
+    def request_key(self, scope: Scope) -> Tuple[Optional[str], ...]:
+        headers = Headers(scope=scope)
+        return (
+            scope["method"],
+            scope.get("root_path", "") + scope["path"],
+            scope.get("query_string", b"").decode("latin-1"),
+            *(headers.get(name) for name in self.vary_headers),
+        )
@@ -0,0 +1,81 @@
+"""Conditional Responses
+
+Helpers for ETag validators and `If-None-Match` requests.
+
+When the handler knows the validator before serializing the response (e.g. from
+`CreatedUpdatedDateMixin.updated_date`), it can answer with 304 right away:
+
+    @router.get("/heroes/{hero_id}", response_model=Hero)
+    def read_hero(hero_id: int, request: Request, response: Response, db=Depends(get_db)):
+        hero = crud.hero.get(db, hero_id)
+        not_modified = check_not_modified(request, response, updated_date_etag(hero))
+        if not_modified is not None:
+            return not_modified  # Response model is not validated nor serialized
+        return hero
+
+Other GET responses get an ETag computed from the body by `ETagMiddleware`.
+"""
+import datetime
+import hashlib
+from typing import Any, Optional
+
+from sqlalchemy import inspect
+from starlette.requests import Request
+from starlette.responses import Response
+
+# Headers which a 304 response must repeat from the 200 response it stands for
+NOT_MODIFIED_HEADERS = ("cache-control", "content-location", "date", "etag", "expires", "vary")
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of `If-None-Match` header value with an entity tag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque_tag = _opaque_tag(etag)
+    return any(_opaque_tag(tag) == opaque_tag for tag in if_none_match.split(","))
+
+
+def check_not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """Set ETag on the response; 304 response if the client has the current version."""
+    response.headers["etag"] = etag
+    if request.method in ("GET", "HEAD") and etag_matches(
+        request.headers.get("if-none-match"), etag
+    ):
+        headers = {
+            name: value for name, value in response.headers.items() if name in NOT_MODIFIED_HEADERS
+        }
+        return Response(status_code=304, headers=headers)
+    return None
+
+
+def updated_date_etag(obj: Any) -> str:
+    """Weak ETag from last modification date of objects with `CreatedUpdatedDateMixin`.
+
+    For a list of objects, a hash of primary keys and modification dates of all objects
+    is used, so adding, deleting or replacing an object changes the ETag as well.
+    """
+    if not isinstance(obj, (list, tuple)):
+        return f'W/"{_modified_date(obj).isoformat()}"'
+    digest = hashlib.blake2b(digest_size=16)
+    for o in obj:
+        digest.update(f"{_primary_key(o)!r}\n{_modified_date(o).isoformat()}\n".encode())
+    return f'W/"{digest.hexdigest()}"'
+
+
+def _modified_date(obj: Any) -> datetime.datetime:
+    # updated_date is set by every update, and is NULL until the first one
+    return obj.updated_date or obj.created_date
+
+
+def _primary_key(obj: Any) -> Any:
+    state = inspect(obj, raiseerr=False)
+    if state is not None and state.identity is not None:
+        return state.identity
+    return getattr(obj, "id", None)
+
+
+def _opaque_tag(etag: str) -> str:
+    etag = etag.strip()
+    return etag[2:] if etag.startswith("W/") else etag
@@ -0,0 +1,235 @@
+"""JSON Responses
+
+FastAPI converts endpoint results with `jsonable_encoder` and renders them with stdlib json.
+Both can be sped up:
+- `FastJSONResponse` renders with orjson when installed, stdlib json otherwise;
+  set as default response class with `JSON_SERIALIZER=orjson`
+- direct serialization - `response_model` output is validated as usual, then serialized
+  straight to JSON, without the `jsonable_encoder` pass; enabled for all routes with
+  `enable_direct_serialization` (`JSON_DIRECT_SERIALIZATION=true`), or per router with
+  `APIRouter(route_class=DirectSerializationRoute)`
+
+Content which already is an instance (or a list of instances) of exactly the response model
+class is not validated again, as it can't contain fields which should be filtered out.
+Direct serialization is not used for routes with `response_model_include`/`exclude`,
+without `response_model`, or with a non-JSON response class.
+Custom `json_encoders` of response models are not applied, values which are not JSON types
+are encoded with `pydantic_encoder` (e.g. Decimal as float, like `jsonable_encoder`).
+"""
+import asyncio
+import dataclasses
+import functools
+import json
+from enum import Enum
+from typing import Any, Callable, Coroutine, Optional, Type
+
+from fastapi import FastAPI
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.routing import APIRoute, get_request_handler
+from pydantic import BaseModel, ValidationError  # pylint: disable=no-name-in-module
+from pydantic.error_wrappers import ErrorWrapper
+from pydantic.fields import SHAPE_LIST, SHAPE_SINGLETON
+from pydantic.json import pydantic_encoder
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import request_response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+_DIRECT_SERIALIZATION = "_direct_serialization"
+
+
+class JSONSerializer(Enum):
+    STDLIB = "json"
+    ORJSON = "orjson"
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        if orjson is None:  # pragma: no cover
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+class _SerializedJSONResponse(JSONResponse):
+    """Content is JSON text serialized by the endpoint wrapper."""
+
+    def render(self, content: str) -> bytes:
+        return content.encode("utf-8")
+
+
+def get_json_response_class(serializer: JSONSerializer) -> Type[JSONResponse]:
+    return FastJSONResponse if serializer is JSONSerializer.ORJSON else JSONResponse
+
+
+class DirectSerializationRoute(APIRoute):
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        return get_direct_request_handler(self) or super().get_route_handler()
+
+
+def enable_direct_serialization(app: FastAPI) -> None:
+    """Switch routes added so far to direct serialization."""
+    for route in app.routes:
+        if isinstance(route, APIRoute) and not isinstance(route, DirectSerializationRoute):
+            handler = get_direct_request_handler(route)
+            if handler is not None:
+                route.app = request_response(handler)
+
+
+def get_direct_request_handler(
+    route: APIRoute,
+) -> Optional[Callable[[Request], Coroutine[Any, Any, Response]]]:
+    """Request handler with direct serialization; None if the route does not support it."""
+    field = route.secure_cloned_response_field
+    response_class = route.response_class
+    if isinstance(response_class, DefaultPlaceholder):
+        response_class = response_class.value
+    if (
+        field is None
+        or route.response_model_include is not None
+        or route.response_model_exclude is not None
+        or not issubclass(response_class, JSONResponse)
+    ):
+        return None
+    call = route.dependant.call
+    if getattr(call, _DIRECT_SERIALIZATION, False):  # Enabled twice
+        call = call.__wrapped__  # type: ignore
+    assert call is not None  # nosec: B101
+    default = _model_encoder(
+        by_alias=route.response_model_by_alias,
+        exclude_unset=route.response_model_exclude_unset,
+        exclude_defaults=route.response_model_exclude_defaults,
+        exclude_none=route.response_model_exclude_none,
+    )
+    # Same output as the response class would render
+    use_orjson = issubclass(response_class, FastJSONResponse) and orjson is not None
+    dumps = _orjson_dumps if use_orjson else _json_dumps
+
+    is_validated = _validated_check(route)
+
+    def serialize(content: Any) -> Any:
+        if isinstance(content, Response):
+            return content
+        if is_validated(content):
+            return dumps(content, default)
+        content = _prepare_response_content(
+            content,
+            exclude_unset=route.response_model_exclude_unset,
+            exclude_defaults=route.response_model_exclude_defaults,
+            exclude_none=route.response_model_exclude_none,
+        )
+        value, errors = field.validate(content, {}, loc=("response",))  # type: ignore
+        if isinstance(errors, ErrorWrapper):
+            errors = [errors]
+        if errors:
+            raise ValidationError(errors, field.type_)  # type: ignore
+        # Returned as str, which is passed through jsonable_encoder unchanged
+        return dumps(value, default)
+
+    wrapper: Callable[..., Any]
+    if asyncio.iscoroutinefunction(call):
+
+        @functools.wraps(call)
+        async def wrapper(**values: Any) -> Any:
+            return serialize(await call(**values))  # type: ignore
+
+    else:
+
+        @functools.wraps(call)
+        def wrapper(**values: Any) -> Any:
+            return serialize(call(**values))  # type: ignore
+
+    setattr(wrapper, _DIRECT_SERIALIZATION, True)
+    route.dependant.call = wrapper
+    return get_request_handler(
+        dependant=route.dependant,
+        body_field=route.body_field,
+        status_code=route.status_code,
+        response_class=_SerializedJSONResponse,
+        response_field=None,
+        dependency_overrides_provider=route.dependency_overrides_provider,
+    )
+
+
+def _validated_check(route: APIRoute) -> Callable[[Any], bool]:
+    """Whether content is already an instance (or list of instances) of the response model.
+
+    Such content can't carry extra fields, so it is serialized without validating it again.
+    """
+    field = route.response_field
+    model = field.type_ if field is not None else None
+    if not (isinstance(model, type) and issubclass(model, BaseModel)):
+        return lambda _: False
+    if field.shape == SHAPE_SINGLETON:  # type: ignore
+        return lambda content: type(content) is model
+    if field.shape == SHAPE_LIST:  # type: ignore
+        return lambda content: isinstance(content, list) and all(
+            type(item) is model for item in content
+        )
+    return lambda _: False
+
+
+def _model_encoder(**options: Any) -> Callable[[Any], Any]:
+    def default(obj: Any) -> Any:
+        if isinstance(obj, BaseModel):
+            data = obj.dict(**options)
+            return data["__root__"] if "__root__" in data else data
+        return pydantic_encoder(obj)
+
+    return default
+
+
+def _orjson_dumps(value: Any, default: Callable[[Any], Any]) -> str:
+    return orjson.dumps(value, default=default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+def _json_dumps(value: Any, default: Callable[[Any], Any]) -> str:
+    return json.dumps(
+        value, default=default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    )
+
+
+def _prepare_response_content(
+    res: Any,
+    *,
+    exclude_unset: bool,
+    exclude_defaults: bool = False,
+    exclude_none: bool = False,
+) -> Any:
+    # Copy of private fastapi.routing._prepare_response_content (FastAPI 0.78.0)
+    if isinstance(res, BaseModel):
+        if getattr(res.__config__, "read_with_orm_mode", None):
+            # Let from_orm extract the data, e.g. lazy relationships
+            return res
+        return res.dict(
+            by_alias=True,
+            exclude_unset=exclude_unset,
+            exclude_defaults=exclude_defaults,
+            exclude_none=exclude_none,
+        )
+    if isinstance(res, list):
+        return [
+            _prepare_response_content(
+                item,
+                exclude_unset=exclude_unset,
+                exclude_defaults=exclude_defaults,
+                exclude_none=exclude_none,
+            )
+            for item in res
+        ]
+    if isinstance(res, dict):
+        return {
+            k: _prepare_response_content(
+                v,
+                exclude_unset=exclude_unset,
+                exclude_defaults=exclude_defaults,
+                exclude_none=exclude_none,
+            )
+            for k, v in res.items()
+        }
+    if dataclasses.is_dataclass(res):
+        return dataclasses.asdict(res)
+    return res
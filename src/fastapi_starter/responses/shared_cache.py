@@ -0,0 +1,152 @@
+"""Shared Memory Cache
+
+Fixed-size cache in a memory-mapped file (e.g. in /dev/shm), shared by all worker processes.
+
+The file is a table of `slots` slots of `slot_size` bytes; a key is stored in the slot
+given by its hash, replacing whatever was there (like a CPU cache), so values larger than
+a slot are not cached. Slot layout:
+- 8 byte sequence number - odd while the slot is being written
+- 16 byte key hash, 8 byte expiry and 8 byte stale-until time (wall clock), 4 byte length
+- value
+
+Readers do not lock: they copy the slot and treat it as a miss if the sequence number
+changed meanwhile. Writers of a slot are serialized with a `fcntl` lock on byte `index`
+of the file; a writer does not wait for it, the value is just not shared if the slot is busy.
+The recompute lock of a slot is byte `slots + index`
+(fcntl locks may extend past the end of the file and do not need to be created).
+fcntl locks are held per process, so within a process callers coordinate themselves;
+a recompute lock taken more than once by a process (keys of the same slot) is counted,
+and only released by the last `unlock`.
+"""
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+from typing import Dict, NamedTuple, Optional, Tuple
+
+_SEQUENCE = struct.Struct("<Q")
+_HEADER = struct.Struct("<Q16sddI4x")
+
+
+class SharedEntry(NamedTuple):
+    expires_at: float
+    stale_until: float
+    value: bytes
+
+
+class SharedMemoryCache:
+    def __init__(self, path: str, slots: int = 1024, slot_size: int = 64 * 1024):
+        if slot_size <= _HEADER.size:
+            raise ValueError(f"Slot size must be larger than {_HEADER.size} bytes")
+        self.path = path
+        self.slots = slots
+        self.slot_size = slot_size
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._fd = -1
+        self._mmap: Optional[mmap.mmap] = None
+        self._held: Dict[int, int] = {}  # Slot index -> holders of its recompute lock
+
+    @property
+    def max_value_size(self) -> int:
+        return self.slot_size - _HEADER.size
+
+    def get(self, key: str) -> Optional[SharedEntry]:
+        digest, index = self._locate(key)
+        data = self._open()
+        start = index * self.slot_size
+        sequence = _SEQUENCE.unpack_from(data, start)[0]
+        if sequence % 2:  # Being written
+            return None
+        _, slot_digest, expires_at, stale_until, length = _HEADER.unpack_from(data, start)
+        if slot_digest != digest or length > self.max_value_size:
+            return None
+        value_start = start + _HEADER.size
+        value_end = value_start + length
+        value = data[value_start:value_end]
+        if _SEQUENCE.unpack_from(data, start)[0] != sequence:  # Overwritten while copying
+            return None
+        return SharedEntry(expires_at, stale_until, value)
+
+    def set(self, key: str, expires_at: float, stale_until: float, value: bytes) -> bool:
+        """False if value is too large to be shared, or the slot is being written."""
+        if len(value) > self.max_value_size:
+            return False
+        digest, index = self._locate(key)
+        data = self._open()
+        start = index * self.slot_size
+        value_start = start + _HEADER.size
+        value_end = value_start + len(value)
+        # Called on the event loop, does not wait for other writers
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            try:
+                fcntl.lockf(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, index)
+            except OSError:
+                return False
+            try:
+                sequence = _SEQUENCE.unpack_from(data, start)[0] | 1
+                _SEQUENCE.pack_into(data, start, sequence)
+                data[value_start:value_end] = value
+                _HEADER.pack_into(
+                    data, start, sequence, digest, expires_at, stale_until, len(value)
+                )
+                _SEQUENCE.pack_into(data, start, sequence + 1)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, index)
+        finally:
+            self._lock.release()
+        return True
+
+    def try_lock(self, key: str) -> bool:
+        """Take recompute lock of the key's slot without waiting; False if another worker has it."""
+        _, index = self._locate(key)
+        self._open()
+        with self._lock:
+            if index not in self._held:
+                try:
+                    fcntl.lockf(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, self.slots + index)
+                except OSError:
+                    return False
+            self._held[index] = self._held.get(index, 0) + 1
+        return True
+
+    def unlock(self, key: str) -> None:
+        _, index = self._locate(key)
+        with self._lock:
+            self._held[index] -= 1
+            if not self._held[index]:
+                del self._held[index]
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, self.slots + index)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._mmap is not None and self._pid == os.getpid():
+                self._mmap.close()
+                os.close(self._fd)
+            self._mmap = None
+            self._pid = None
+
+    def _locate(self, key: str) -> Tuple[bytes, int]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        return digest, int.from_bytes(digest[:8], "little") % self.slots
+
+    def _open(self) -> mmap.mmap:
+        # Opened lazily in each process, a forked worker must not use locks of its parent
+        if self._mmap is not None and self._pid == os.getpid():
+            return self._mmap
+        with self._lock:
+            if self._mmap is None or self._pid != os.getpid():
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+                size = self.slots * self.slot_size
+                if os.fstat(fd).st_size < size:
+                    os.ftruncate(fd, size)
+                self._fd = fd
+                self._mmap = mmap.mmap(fd, size)
+                self._held = {}
+                self._pid = os.getpid()
+        return self._mmap
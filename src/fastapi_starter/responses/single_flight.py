@@ -0,0 +1,68 @@
+"""Single Flight
+
+Runs one call per key at a time; concurrent callers with the same key wait for it
+and share its result (or exception), instead of repeating the same work:
+
+    heroes = SingleFlight()
+    hero, shared = await heroes.do(hero_id, lambda: async_crud_hero.get(db, hero_id))
+
+The result is shared as is, so it must not be modified by callers. Calls are coalesced
+within one event loop (i.e. one worker) only. If the running call is cancelled,
+waiting callers run their own call.
+"""
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+import anyio
+
+T = TypeVar("T")
+
+
+class _Call(Generic[T]):
+    def __init__(self) -> None:
+        self.done = anyio.Event()
+        self.finished = False
+        self.result: Optional[T] = None
+        self.error: Optional[Exception] = None
+
+
+class SingleFlight(Generic[T]):
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, _Call[T]] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """Result of `fn`, or of the running call with the same key; True if shared."""
+        call = self._calls.get(key)
+        while call is not None:
+            await call.done.wait()
+            if call.error is not None:
+                raise call.error
+            if call.finished:
+                return call.result, True  # type: ignore
+            # Cancelled, unless another waiter started a new call already
+            call = self._calls.get(key)
+        call = self._calls[key] = _Call()
+        try:
+            call.result = await fn()
+            call.finished = True
+            return call.result, False
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            del self._calls[key]
+            call.done.set()
@@ -0,0 +1,138 @@
+"""Streaming Responses
+
+Serialize rows (e.g. from `CRUDBase.stream_all`) to NDJSON or CSV in chunks,
+so large exports use constant memory and the first chunk is sent right away.
+
+Rows are converted with a Pydantic schema; ORM objects require `orm_mode` in schema config.
+Sync row iterators are iterated in a threadpool - once per chunk, not once per row.
+"""
+import collections.abc
+import csv
+import io
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Type,
+    Union,
+)
+
+from pydantic import BaseModel  # pylint: disable=no-name-in-module
+from starlette.responses import StreamingResponse
+
+Rows = Union[Iterable[Any], AsyncIterable[Any]]
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+CSV_MEDIA_TYPE = "text/csv"
+
+
+def ndjson_response(
+    rows: Rows,
+    schema: Type[BaseModel],
+    *,
+    chunk_size: int = 100,
+    status_code: int = 200,
+) -> StreamingResponse:
+    def serialize(chunk: List[Any]) -> str:
+        return "".join(_to_model(schema, row).json() + "\n" for row in chunk)
+
+    return StreamingResponse(
+        _serialize_chunks(rows, serialize, chunk_size),
+        status_code=status_code,
+        media_type=NDJSON_MEDIA_TYPE,
+    )
+
+
+def csv_response(
+    rows: Rows,
+    schema: Type[BaseModel],
+    *,
+    chunk_size: int = 100,
+    status_code: int = 200,
+    filename: Optional[str] = None,
+) -> StreamingResponse:
+    fieldnames = [field.alias for field in schema.__fields__.values()]
+
+    def serialize(chunk: List[Any]) -> str:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+        writer.writerows(_to_model(schema, row).dict(by_alias=True) for row in chunk)
+        return buffer.getvalue()
+
+    header = io.StringIO()
+    csv.writer(header).writerow(fieldnames)
+    headers = {}
+    if filename:
+        headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return StreamingResponse(
+        _prepend(header.getvalue(), _serialize_chunks(rows, serialize, chunk_size)),
+        status_code=status_code,
+        media_type=CSV_MEDIA_TYPE,
+        headers=headers,
+    )
+
+
+def _to_model(schema: Type[BaseModel], row: Any) -> BaseModel:
+    if isinstance(row, schema):
+        return row
+    if isinstance(row, dict):
+        return schema.parse_obj(row)
+    return schema.from_orm(row)
+
+
+def _serialize_chunks(
+    rows: Rows, serialize: Callable[[List[Any]], str], chunk_size: int
+) -> Union[Iterator[str], AsyncIterator[str]]:
+    if isinstance(rows, collections.abc.AsyncIterable):
+        return _aserialize_chunks(rows, serialize, chunk_size)
+    return _iserialize_chunks(rows, serialize, chunk_size)
+
+
+def _iserialize_chunks(
+    rows: Iterable[Any], serialize: Callable[[List[Any]], str], chunk_size: int
+) -> Iterator[str]:
+    chunk: List[Any] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield serialize(chunk)
+            chunk = []
+    if chunk:
+        yield serialize(chunk)
+
+
+async def _aserialize_chunks(
+    rows: AsyncIterable[Any], serialize: Callable[[List[Any]], str], chunk_size: int
+) -> AsyncIterator[str]:
+    chunk: List[Any] = []
+    async for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield serialize(chunk)
+            chunk = []
+    if chunk:
+        yield serialize(chunk)
+
+
+def _prepend(
+    first: str, chunks: Union[Iterator[str], AsyncIterator[str]]
+) -> Union[Iterator[str], AsyncIterator[str]]:
+    if isinstance(chunks, collections.abc.AsyncIterator):
+        return _aprepend(first, chunks)
+    return _iprepend(first, chunks)
+
+
+def _iprepend(first: str, chunks: Iterator[str]) -> Iterator[str]:
+    yield first
+    yield from chunks
+
+
+async def _aprepend(first: str, chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+    yield first
+    async for chunk in chunks:
+        yield chunk
@@ -1 +1,2 @@
-from .health import Health, Readiness, ReadinessChecks
+from .health import Health, PoolStats, Readiness, ReadinessChecks, WorkerPoolStats
+from .pagination import KeysetPagination, Page
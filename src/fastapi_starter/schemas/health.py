@@ -1,3 +1,5 @@
+from typing import List
+
 from pydantic import BaseModel  # pylint: disable=no-name-in-module
 
 
@@ -12,3 +14,23 @@ class ReadinessChecks(BaseModel):
 class Readiness(BaseModel):
     ready: bool
     checks: ReadinessChecks
+
+
+class PoolStats(BaseModel):
+    name: str
+    size: int
+    checked_out: int
+    checked_in: int
+    overflow: int
+    checkouts: int
+    checkout_wait_seconds_total: float
+    checkout_wait_seconds_max: float
+    connections_opened: int
+    pre_ping_failures: int
+    invalidations: int
+    connection_age_seconds_max: float
+
+
+class WorkerPoolStats(BaseModel):
+    pid: int
+    pools: List[PoolStats]
@@ -0,0 +1,16 @@
+from typing import Generic, List, Optional, TypeVar
+
+from pydantic import BaseModel  # pylint: disable=no-name-in-module
+from pydantic.generics import GenericModel
+
+ItemType = TypeVar("ItemType")
+
+
+class KeysetPagination(BaseModel):
+    cursor: Optional[str] = None
+    limit: int
+
+
+class Page(GenericModel, Generic[ItemType]):
+    items: List[ItemType]
+    next_cursor: Optional[str] = None
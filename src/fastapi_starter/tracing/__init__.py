@@ -0,0 +1,14 @@
+from .exporters import (  # noqa
+    FileSpanExporter,
+    InMemorySpanExporter,
+    OTLPSpanExporter,
+    SpanExporter,
+    create_span_exporter,
+)
+from .instrumentation import (  # noqa
+    TracingMiddleware,
+    instrument_app,
+    instrument_engine,
+)
+from .sampling import SamplingFeedbackMiddleware, TracesSampler  # noqa
+from .spans import TRACER, Span, Tracer, get_current_span, start_span  # noqa
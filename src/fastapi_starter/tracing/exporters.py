@@ -0,0 +1,165 @@
+"""Span Exporters
+
+- `InMemorySpanExporter` - keeps finished spans in a list, for tests
+- `FileSpanExporter` - appends spans to a file as JSON lines
+- `OTLPSpanExporter` - sends spans as OTLP/HTTP JSON to a collector, e.g. local OpenTelemetry
+  Collector or Jaeger on http://localhost:4318/v1/traces; spans are sent from a background
+  thread, and dropped if the collector cannot keep up
+"""
+from __future__ import annotations
+
+import json
+import queue
+import threading
+import urllib.request
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+import structlog
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .spans import Span
+
+logger: structlog.stdlib.BoundLogger = structlog.get_logger()
+
+
+class SpanExporter(ABC):
+    @abstractmethod
+    def export(self, spans: List[Span]) -> None:
+        pass
+
+    def shutdown(self) -> None:
+        pass
+
+
+class InMemorySpanExporter(SpanExporter):
+    def __init__(self) -> None:
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        with self._lock:
+            self.spans.extend(spans)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.spans.clear()
+
+
+class FileSpanExporter(SpanExporter):
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        lines = "".join(json.dumps(span.to_dict(), default=str) + "\n" for span in spans)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+class OTLPSpanExporter(SpanExporter):
+    def __init__(
+        self,
+        endpoint: str = "http://localhost:4318/v1/traces",
+        service_name: str = "fastapi-starter",
+        timeout: float = 5.0,
+        max_queue_size: int = 1000,
+    ):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout = timeout
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[List[Dict[str, Any]]]]" = queue.Queue(max_queue_size)
+        self._thread = threading.Thread(target=self._run, name="otlp-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, spans: List[Span]) -> None:
+        try:
+            self._queue.put_nowait([encode_otlp_span(span) for span in spans])
+        except queue.Full:
+            self.dropped += len(spans)
+
+    def shutdown(self) -> None:
+        try:
+            self._queue.put(None, timeout=self.timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout=self.timeout)
+
+    def _run(self) -> None:
+        while True:
+            spans = self._queue.get()
+            if spans is None:
+                return
+            # Send everything queued so far in one request
+            while len(spans) < 512:
+                try:
+                    more = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if more is None:
+                    self._send(spans)
+                    return
+                spans.extend(more)
+            self._send(spans)
+
+    def _send(self, spans: List[Dict[str, Any]]) -> None:
+        body = json.dumps(
+            {
+                "resourceSpans": [
+                    {
+                        "resource": {
+                            "attributes": [_encode_attribute("service.name", self.service_name)]
+                        },
+                        "scopeSpans": [{"scope": {"name": "fastapi_starter"}, "spans": spans}],
+                    }
+                ]
+            }
+        ).encode()
+        request = urllib.request.Request(
+            self.endpoint,
+            data=body,
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout):  # nosec: B310
+                pass
+        except OSError as e:
+            logger.warning("span_export_failed", endpoint=self.endpoint, error=str(e))
+
+
+def create_span_exporter(name: str, path: str, endpoint: str, service_name: str) -> SpanExporter:
+    if name == "memory":
+        return InMemorySpanExporter()
+    if name == "file":
+        return FileSpanExporter(path)
+    if name == "otlp":
+        return OTLPSpanExporter(endpoint=endpoint, service_name=service_name)
+    raise ValueError(f"Unknown span exporter: {name}")
+
+
+def encode_otlp_span(span: Span) -> Dict[str, Any]:
+    encoded: Dict[str, Any] = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": 2 if span.parent_id is None else 1,  # SERVER for root span, INTERNAL otherwise
+        "startTimeUnixNano": str(span.start_time_ns),
+        "endTimeUnixNano": str(span.end_time_ns or span.start_time_ns),
+        "attributes": [_encode_attribute(k, v) for k, v in span.attributes.items()],
+        "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+    }
+    if span.parent_id:
+        encoded["parentSpanId"] = span.parent_id
+    return encoded
+
+
+def _encode_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
@@ -0,0 +1,226 @@
+"""Tracing Instrumentation
+
+`instrument_app` adds spans for:
+- the whole request (root span), with method, path, route template and status code
+- every middleware in the middleware chain; time spent in a middleware itself is
+  its span duration minus its child span
+- dependency resolution - setup part of each dependency, e.g. `get_db`;
+  teardown of generator dependencies runs after the response and is not traced
+- the endpoint itself
+
+`instrument_engine` adds a span for every SQL statement executed on an engine.
+
+Instrument the app after all middleware and routes were added.
+Dependencies are replaced with wrappers which compare and hash equal to the wrapped
+dependency, so `app.dependency_overrides` and dependency cache keep working.
+"""
+from __future__ import annotations
+
+import inspect
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Set
+
+from fastapi import FastAPI
+from fastapi.dependencies.models import Dependant
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine
+from starlette.middleware import Middleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..middleware.routes import get_route_template
+from .spans import Span, get_current_span, open_span, start_span
+
+_SPANS_KEY = "tracing_spans"
+
+
+class TracingMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with start_span("http.request", method=scope["method"], path=scope["path"]) as span:
+            if span is None:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_with_status(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    span.set_attribute("status_code", message["status"])
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                span.set_attribute("route", get_route_template(scope))
+
+
+class _TracedMiddleware:
+    def __init__(self, app: ASGIApp, middleware_class: Any, **options: Any):
+        self.app = middleware_class(app, **options)
+        self.span_name = f"middleware {middleware_class.__name__}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with start_span(self.span_name):
+            await self.app(scope, receive, send)
+
+
+def instrument_app(app: FastAPI) -> None:
+    app.user_middleware = [
+        Middleware(_TracedMiddleware, middleware_class=m.cls, **m.options)
+        for m in app.user_middleware
+    ]
+    app.add_middleware(TracingMiddleware)
+    traced: Dict[Callable[..., Any], _TracedCall] = {}
+    for route in app.routes:
+        if isinstance(route, APIRoute):
+            _instrument_dependant(route.dependant, traced, set())
+            route.dependant.call = _traced_call(route.dependant.call, f"endpoint {route.name}")
+
+
+def instrument_engine(engine: Engine) -> None:
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def _instrument_dependant(
+    dependant: Dependant, traced: Dict[Callable[..., Any], _TracedCall], seen: Set[int]
+) -> None:
+    if id(dependant) in seen:
+        return
+    seen.add(id(dependant))
+    for sub_dependant in dependant.dependencies:
+        _instrument_dependant(sub_dependant, traced, seen)
+        call = sub_dependant.call
+        if call is None or isinstance(call, _TracedCall):
+            continue
+        if call not in traced:
+            traced[call] = _traced_call(call, f"dependency {_name(call)}")
+        sub_dependant.call = traced[call]
+
+
+def _traced_call(call: Callable[..., Any], span_name: str) -> _TracedCall:
+    dunder_call = getattr(call, "__call__", None)  # Class instances with __call__
+    for cls in (
+        _TracedAsyncGeneratorFunction,
+        _TracedGeneratorFunction,
+        _TracedCoroutineFunction,
+    ):
+        if cls.matches(call) or cls.matches(dunder_call):
+            return cls(call, span_name)
+    return _TracedFunction(call, span_name)
+
+
+def _name(call: Callable[..., Any]) -> str:
+    return getattr(call, "__name__", type(call).__name__)
+
+
+class _TracedCall(ABC):
+    """Wrapper, which FastAPI recognizes as the same kind of callable as the wrapped one."""
+
+    def __init__(self, call: Callable[..., Any], span_name: str):
+        self.call = call
+        self.span_name = span_name
+        self.__signature__ = inspect.signature(call)
+
+    @staticmethod
+    @abstractmethod
+    def matches(call: Any) -> bool:
+        pass
+
+    def __hash__(self) -> int:
+        return hash(self.call)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, _TracedCall):
+            other = other.call
+        return bool(self.call == other)
+
+
+class _TracedFunction(_TracedCall):
+    @staticmethod
+    def matches(call: Any) -> bool:
+        return callable(call)
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        with start_span(self.span_name):
+            return self.call(*args, **kwargs)
+
+
+class _TracedCoroutineFunction(_TracedCall):
+    matches = staticmethod(inspect.iscoroutinefunction)
+
+    async def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        with start_span(self.span_name):
+            return await self.call(*args, **kwargs)
+
+
+class _TracedGeneratorFunction(_TracedCall):
+    matches = staticmethod(inspect.isgeneratorfunction)
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Iterator[Any]:
+        generator = self.call(*args, **kwargs)
+        with start_span(self.span_name):
+            value = next(generator)
+        try:
+            yield value
+        except BaseException as e:  # pylint: disable=broad-except
+            try:
+                generator.throw(e)
+            except StopIteration:
+                return
+            raise RuntimeError("generator didn't stop after throw()") from e
+        yield from generator
+
+
+class _TracedAsyncGeneratorFunction(_TracedCall):
+    matches = staticmethod(inspect.isasyncgenfunction)
+
+    async def __call__(self, *args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        generator = self.call(*args, **kwargs)
+        with start_span(self.span_name):
+            value = await generator.__anext__()
+        try:
+            yield value
+        except BaseException as e:  # pylint: disable=broad-except
+            try:
+                await generator.athrow(e)
+            except StopAsyncIteration:
+                return
+            raise RuntimeError("generator didn't stop after athrow()") from e
+        async for value in generator:
+            yield value
+
+
+def _before_cursor_execute(
+    conn: Connection, _: Any, statement: str, __: Any, ___: Any, executemany: bool
+) -> None:
+    spans: Optional[List[Optional[Span]]] = conn.info.get(_SPANS_KEY)
+    if spans is None:
+        spans = conn.info[_SPANS_KEY] = []
+    # Statements outside of a request (e.g. on startup) are not traced
+    traced = get_current_span() is not None
+    # Span is not made current - it ends in after_cursor_execute, outside of this context
+    spans.append(open_span("sql", statement=statement, executemany=executemany) if traced else None)
+
+
+def _after_cursor_execute(conn: Connection, *_: Any) -> None:
+    span = conn.info[_SPANS_KEY].pop()
+    if span is not None:
+        span.end()
+
+
+def _handle_error(context: Any) -> None:
+    spans = context.connection.info.get(_SPANS_KEY) if context.connection else None
+    if spans:
+        span = spans.pop()
+        if span is not None:
+            span.error = type(context.original_exception).__name__
+            span.end()
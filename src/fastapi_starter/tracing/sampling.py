@@ -0,0 +1,143 @@
+"""Sentry Traces Sampling
+
+`TracesSampler` is passed to `sentry_sdk.init` as `traces_sampler` and decides per request:
+- excluded paths (health checks, metrics) are never traced
+- decision of the upstream service is kept for distributed traces
+- per-route rates override the default rate; routes are path templates,
+  e.g. `/api/v1/heroes/{hero_id}`
+- in adaptive mode, the default rate follows request rate, so each worker sends
+  about `target_per_second` traces regardless of traffic
+- routes which were recently slow or failing are sampled `boost` times more often
+
+Sampling happens before routing, so the route template is resolved from the path here.
+Route latency and errors are fed back by `SamplingFeedbackMiddleware`.
+"""
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, Mapping, Optional, Sequence
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..middleware.routes import get_route_template, match_route_template
+
+# Weight of the latest request in route averages
+_EWMA_ALPHA = 0.1
+
+
+class RouteStats:
+    __slots__ = ("duration", "error_ratio")
+
+    def __init__(self) -> None:
+        self.duration = 0.0
+        self.error_ratio = 0.0
+
+    def observe(self, duration: float, error: bool) -> None:
+        self.duration += _EWMA_ALPHA * (duration - self.duration)
+        self.error_ratio += _EWMA_ALPHA * (float(error) - self.error_ratio)
+
+
+class TracesSampler:
+    def __init__(
+        self,
+        app: Any,
+        default_rate: float = 0.1,
+        route_rates: Optional[Mapping[str, float]] = None,
+        exclude_paths: Sequence[str] = (),
+        target_per_second: Optional[float] = None,
+        slow_threshold: Optional[float] = None,
+        error_threshold: float = 0.05,
+        boost: float = 10.0,
+    ):
+        self.app = app
+        self.default_rate = default_rate
+        self.route_rates = dict(route_rates or {})
+        self.exclude_paths = tuple(exclude_paths)
+        self.target_per_second = target_per_second
+        self.slow_threshold = slow_threshold
+        self.error_threshold = error_threshold
+        self.boost = boost
+        self.stats: Dict[str, RouteStats] = {}
+        self._adaptive_rate = default_rate
+        self._window_start = time.monotonic()
+        self._window_requests = 0
+        self._lock = threading.Lock()
+        self.resolve_route = lru_cache(maxsize=1024)(self._resolve_route)
+
+    def __call__(self, sampling_context: Dict[str, Any]) -> float:
+        scope = sampling_context.get("asgi_scope") or {}
+        path = scope.get("path") if scope.get("type") == "http" else None
+        if path is not None and path.startswith(self.exclude_paths):
+            return 0.0
+        parent_sampled = sampling_context.get("parent_sampled")
+        if parent_sampled is not None:
+            return float(parent_sampled)
+        if path is None:
+            return self.default_rate
+        rate = self._default_rate()
+        route = self.resolve_route(path)
+        if route is None:
+            return rate
+        rate = self.route_rates.get(route, rate)
+        stats = self.stats.get(route)
+        if stats is not None and self._is_degraded(stats):
+            rate *= self.boost
+        return min(rate, 1.0)
+
+    def observe(self, route: str, duration: float, status_code: int) -> None:
+        stats = self.stats.get(route)
+        if stats is None:
+            stats = self.stats.setdefault(route, RouteStats())
+        stats.observe(duration, status_code >= 500)
+
+    def _is_degraded(self, stats: RouteStats) -> bool:
+        if stats.error_ratio >= self.error_threshold:
+            return True
+        return self.slow_threshold is not None and stats.duration >= self.slow_threshold
+
+    def _default_rate(self) -> float:
+        if self.target_per_second is None:
+            return self.default_rate
+        with self._lock:
+            self._window_requests += 1
+            now = time.monotonic()
+            elapsed = now - self._window_start
+            # Request rate is re-estimated every second
+            if elapsed >= 1.0:
+                requests_per_second = self._window_requests / elapsed
+                self._adaptive_rate = min(1.0, self.target_per_second / requests_per_second)
+                self._window_start = now
+                self._window_requests = 0
+            return self._adaptive_rate
+
+    def _resolve_route(self, path: str) -> Optional[str]:
+        return match_route_template(self.app, path)
+
+
+class SamplingFeedbackMiddleware:
+    """Feeds latency and status code of each route to the sampler."""
+
+    def __init__(self, app: ASGIApp, sampler: TracesSampler):
+        self.app = app
+        self.sampler = sampler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = get_route_template(scope)
+            if route is not None:
+                self.sampler.observe(route, time.perf_counter() - start, status_code)
@@ -0,0 +1,163 @@
+"""Tracing Spans
+
+Lightweight spans which show where time goes inside a request.
+
+The current span is kept in a contextvar, so spans started in threadpool
+(sync dependencies and endpoints) nest under the span which was current when
+the thread was started. All spans of a request belong to one trace with a generated trace ID.
+`request_id` of asgi-correlation-id is recorded on the root span, so traces can be found
+by request ID from logs; it comes from the client (X-Request-ID), so it can't be the trace ID.
+
+Finished traces are handed to exporters when the root span ends.
+When no exporter is configured, `start_span` does nothing.
+"""
+from __future__ import annotations
+
+import contextvars
+import random
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import structlog
+from asgi_correlation_id.context import correlation_id
+
+from .exporters import SpanExporter
+
+logger: structlog.stdlib.BoundLogger = structlog.get_logger()
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+@dataclass
+class Span:
+    name: str
+    trace: Trace
+    span_id: str
+    parent_id: Optional[str]
+    start_time_ns: int
+    end_time_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    # Wall clock for start time, monotonic clock for duration
+    _start_perf_ns: int = field(default_factory=time.perf_counter_ns, repr=False)
+
+    @property
+    def trace_id(self) -> str:
+        return self.trace.trace_id
+
+    @property
+    def duration_ns(self) -> int:
+        return (self.end_time_ns or self.start_time_ns) - self.start_time_ns
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def end(self) -> None:
+        self.end_time_ns = self.start_time_ns + time.perf_counter_ns() - self._start_perf_ns
+        if self.parent_id is None:
+            TRACER.export(self.trace.spans)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time_ns": self.start_time_ns,
+            "end_time_ns": self.end_time_ns,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class Trace:
+    def __init__(self) -> None:
+        self.spans: List[Span] = []
+        self.trace_id = _new_id(16)
+        self._request_id_bound = False
+
+    def bind_request_id(self) -> None:
+        # request_id is set by middleware inside the root span, so it is picked up by child spans
+        if not self._request_id_bound:
+            request_id = correlation_id.get()
+            if request_id:
+                self.spans[0].set_attribute("request_id", request_id)
+                self._request_id_bound = True
+
+
+class Tracer:
+    def __init__(self) -> None:
+        self.exporters: List[SpanExporter] = []
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.exporters)
+
+    def configure(self, exporters: Sequence[SpanExporter]) -> None:
+        self.shutdown()
+        self.exporters = list(exporters)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            exporters, self.exporters = self.exporters, []
+        for exporter in exporters:
+            exporter.shutdown()
+
+    def export(self, spans: List[Span]) -> None:
+        for exporter in self.exporters:
+            try:
+                exporter.export(spans)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("span_export_failed", exporter=type(exporter).__name__)
+
+
+TRACER = Tracer()
+
+
+def get_current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def start_span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Start span as child of the current span; new trace is started if there is none."""
+    if not TRACER.enabled:
+        yield None
+        return
+    span = open_span(name, **attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.error = type(e).__name__
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end()
+
+
+def open_span(name: str, **attributes: Any) -> Span:
+    """Start span without making it current; end it with `Span.end`."""
+    parent = _current_span.get()
+    trace = parent.trace if parent else Trace()
+    span = Span(
+        name=name,
+        trace=trace,
+        span_id=_new_id(8),
+        parent_id=parent.span_id if parent else None,
+        start_time_ns=time.time_ns(),
+        attributes=attributes,
+    )
+    trace.spans.append(span)
+    trace.bind_request_id()
+    return span
+
+
+def _new_id(size: int) -> str:
+    return f"{random.getrandbits(size * 8):0{size * 2}x}"
@@ -1,12 +1,78 @@
+import glob
 import os
+from typing import Any
 
 bind = f"{os.getenv('HOST', '127.0.0.1')}:{os.getenv('PORT', '8000')}"
 
 # Server Mechanics
 worker_tmp_dir = "/dev/shm"  # nosec: B108
 
+# Metrics of all workers are aggregated from files in shared memory
+metrics_dir = os.getenv(
+    "METRICS_DIR",
+    os.getenv("PROMETHEUS_MULTIPROC_DIR", os.path.join(worker_tmp_dir, "fastapi_starter_metrics")),
+)
+# Responses cached by one worker are served by all of them
+response_cache_dir = os.getenv(
+    "RESPONSE_CACHE_DIR", os.path.join(worker_tmp_dir, "fastapi_starter_response_cache")
+)
+# Rate limits hold no matter which worker serves the request
+rate_limit_dir = os.getenv(
+    "RATE_LIMIT_DIR", os.path.join(worker_tmp_dir, "fastapi_starter_rate_limit")
+)
+raw_env = [
+    f"METRICS_DIR={metrics_dir}",
+    f"RESPONSE_CACHE_DIR={response_cache_dir}",
+    f"RATE_LIMIT_DIR={rate_limit_dir}",
+]
+
 # Worker Processes
+# Keep in sync with Settings.WORKERS, which splits SQLALCHEMY_POOL_BUDGET between workers
+workers = int(os.getenv("WORKERS", os.getenv("WEB_CONCURRENCY", "1")))
 worker_class = "uvicorn.workers.UvicornWorker"
 worker_connections = 1000
 timeout = 30
 graceful_timeout = 30
+
+
+# Server Hooks
+def on_starting(server: Any) -> None:  # pylint: disable=unused-argument
+    # Values left by previous run would be added to new ones
+    _remove_files(metrics_dir, "counter_*.db", "gauge_*.db")
+    # Responses rendered by previous version of the app
+    _remove_files(response_cache_dir, "responses.cache")
+    # Bucket table layout depends on RATE_LIMIT_SLOTS
+    _remove_files(rate_limit_dir, "buckets")
+
+
+def post_fork(server: Any, worker: Any) -> None:  # pylint: disable=unused-argument
+    from fastapi_starter.db.connectors import (  # pylint: disable=import-outside-toplevel
+        reset_engines_after_fork,
+    )
+
+    reset_engines_after_fork()
+
+
+def worker_exit(server: Any, worker: Any) -> None:  # pylint: disable=unused-argument
+    from fastapi_starter.db.connectors import (  # pylint: disable=import-outside-toplevel
+        dispose_engines,
+    )
+
+    dispose_engines()
+
+
+def child_exit(server: Any, worker: Any) -> None:  # pylint: disable=unused-argument
+    from fastapi_starter.metrics import (  # pylint: disable=import-outside-toplevel
+        REGISTRY,
+    )
+
+    REGISTRY.configure(metrics_dir)
+    REGISTRY.mark_process_dead(worker.pid)
+
+
+def _remove_files(directory: str, *patterns: str) -> None:
+    """Remove files of the app only - directories come from the environment and may be shared."""
+    os.makedirs(directory, exist_ok=True)
+    for pattern in patterns:
+        for path in glob.glob(os.path.join(directory, pattern)):
+            os.remove(path)
@@ -1,7 +1,7 @@
-from typing import Generator
+from typing import Any, Callable, Generator, Optional
 
 import pytest
-from fastapi import FastAPI
+from fastapi import APIRouter, FastAPI
 from fastapi.testclient import TestClient
 from pytest import MonkeyPatch
 from sqlalchemy import create_engine, text
@@ -12,7 +12,8 @@ from sqlalchemy.pool import StaticPool
 
 from fastapi_starter import FastAPIStarterTemplate
 from fastapi_starter.core.config import Settings, get_settings
-from fastapi_starter.db import get_db
+from fastapi_starter.db import get_db, get_read_db
+from fastapi_starter.metrics import REGISTRY
 
 
 @pytest.fixture(name="monkeypatch_session", scope="session")
@@ -75,6 +76,30 @@ def app_fixture(settings: Settings) -> FastAPI:
     return FastAPIStarterTemplate().create_app()
 
 
+@pytest.fixture(name="create_app", scope="session")
+def create_app_fixture(settings: Settings) -> Callable[..., FastAPI]:
+    """Create another app like `app`, with settings overridden and routes of `router`.
+
+    Test routes are added along with default routes, so they are switched to direct
+    serialization, request coalescing and response cache like application routes.
+    """
+
+    def create_app(router: Optional[APIRouter] = None, **overrides: Any) -> FastAPI:
+        class TestTemplate(FastAPIStarterTemplate):
+            def init_settings(self) -> Settings:
+                # Metrics of all apps are kept in the same directory
+                return settings.copy(update={"METRICS_DIR": REGISTRY.directory, **overrides})
+
+            def configure_default_routes(self) -> None:
+                super().configure_default_routes()
+                if router is not None:
+                    self.app.include_router(router)
+
+        return TestTemplate().create_app()
+
+    return create_app
+
+
 @pytest.fixture(name="db", scope="function", autouse=True)
 def db_fixture(
     app: FastAPI, engine: Engine, session_factory: sessionmaker
@@ -96,6 +121,7 @@ def db_fixture(
         return session
 
     app.dependency_overrides[get_db] = _get_db
+    app.dependency_overrides[get_read_db] = _get_db
     yield session
     app.dependency_overrides.clear()
     transaction.rollback()
@@ -0,0 +1,110 @@
+from typing import AsyncGenerator
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from fastapi_starter.crud import AsyncCRUDBase
+from fastapi_starter.db import Base
+
+from .test_crud_base import Hero, HeroCreate, HeroUpdate
+
+
+class AsyncCRUDHero(AsyncCRUDBase[Hero, HeroCreate, HeroUpdate]):
+    pass
+
+
+@pytest.fixture(name="anyio_backend")
+def anyio_backend_fixture() -> str:
+    return "asyncio"
+
+
+@pytest.fixture(name="async_db")
+async def async_db_fixture() -> AsyncGenerator[AsyncSession, None]:
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            Base.metadata.create_all, tables=[Hero.__table__]  # pylint: disable=no-member
+        )
+    session_factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_factory() as session:
+        yield session
+    await engine.dispose()
+
+
+@pytest.fixture(name="crud")
+def crud_fixture() -> AsyncCRUDHero:
+    return AsyncCRUDHero(Hero)
+
+
+@pytest.mark.anyio
+async def test_create(async_db: AsyncSession, crud: AsyncCRUDHero) -> None:
+    hero_create = HeroCreate(name="Deadpond", secret_name="Dive Wilson")
+
+    hero_db = await crud.create(async_db, obj_in=hero_create)
+    await async_db.commit()
+    result = await async_db.execute(select(Hero).where(Hero.id == hero_db.id))
+    actual_hero_db = result.scalars().one()
+
+    assert actual_hero_db.name == "Deadpond"
+    assert actual_hero_db.secret_name == "Dive Wilson"
+
+
+@pytest.mark.anyio
+async def test_update(async_db: AsyncSession, crud: AsyncCRUDHero) -> None:
+    hero_db = Hero(name="Deadpond", secret_name="Dive Wilson")
+    async_db.add(hero_db)
+    await async_db.commit()
+
+    await crud.update(async_db, db_obj=hero_db, obj_in=HeroUpdate(name="Deadpool", age=30))
+    await async_db.commit()
+    actual_hero_db = await crud.get(async_db, obj_id=hero_db.id)
+
+    assert actual_hero_db is not None
+    assert actual_hero_db.name == "Deadpool"
+    assert actual_hero_db.age == 30
+
+
+@pytest.mark.anyio
+async def test_delete(async_db: AsyncSession, crud: AsyncCRUDHero) -> None:
+    hero_db = Hero(name="Deadpond", secret_name="Dive Wilson")
+    async_db.add(hero_db)
+    await async_db.commit()
+
+    await crud.remove(async_db, obj_id=hero_db.id)
+    await async_db.commit()
+    result = await async_db.execute(select(Hero).where(Hero.name == "Deadpond"))
+
+    assert not result.scalars().first()
+
+
+@pytest.mark.anyio
+async def test_get_not_found(async_db: AsyncSession, crud: AsyncCRUDHero) -> None:
+    assert await crud.get(async_db, obj_id=1) is None
+
+
+@pytest.mark.anyio
+async def test_get_multi_and_get_all(async_db: AsyncSession, crud: AsyncCRUDHero) -> None:
+    async_db.add_all(
+        [
+            Hero(name="Deadpond", secret_name="Dive Wilson"),
+            Hero(name="Spider-Boy", secret_name="Pedro Parqueador"),
+            Hero(name="Rusty-Man", secret_name="Tommy Sharp", age=48),
+        ]
+    )
+    await async_db.commit()
+
+    assert len(await crud.get_multi(async_db, skip=1, limit=1)) == 1
+    assert len(await crud.get_all(async_db)) == 3
+
+
+@pytest.mark.anyio
+async def test_stream_all(async_db: AsyncSession, crud: AsyncCRUDHero) -> None:
+    async_db.add_all([Hero(name=f"Hero-{i}", secret_name=f"Secret-{i}") for i in range(5)])
+    await async_db.commit()
+
+    names = [hero.name async for hero in crud.stream_all(async_db, chunk_size=2)]
+
+    assert sorted(names) == [f"Hero-{i}" for i in range(5)]
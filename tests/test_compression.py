@@ -0,0 +1,160 @@
+import zlib
+from typing import Any, AsyncIterator, Callable, Dict, List
+
+import anyio
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from fastapi_starter.middleware import CompressionMiddleware
+from fastapi_starter.middleware.compression import parse_accept_encoding
+
+LARGE = "x" * 1000
+
+
+router = APIRouter()
+
+
+@router.get("/_tests/_test_compression/large")
+def _large() -> Any:
+    return PlainTextResponse(LARGE)
+
+
+@router.get("/_tests/_test_compression/small")
+def _small() -> Any:
+    return PlainTextResponse("small")
+
+
+@router.get("/_tests/_test_compression/image")
+def _image() -> Any:
+    return Response(LARGE.encode(), media_type="image/png")
+
+
+@router.get("/_tests/_test_compression/stream")
+def _stream(chunks: int = 5, size: int = 200) -> Any:
+    async def generate() -> AsyncIterator[str]:
+        for i in range(chunks):
+            yield str(i) * size
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+@pytest.fixture(name="client", scope="module")
+def client_fixture(create_app: Callable[..., FastAPI]) -> TestClient:
+    return TestClient(
+        create_app(router, COMPRESSION_ENCODINGS=["gzip"], COMPRESSION_MINIMUM_SIZE=500)
+    )
+
+
+def test_large_response_compressed(client: TestClient) -> None:
+    r = client.get("/_tests/_test_compression/large", headers={"Accept-Encoding": "gzip"})
+
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.headers["vary"] == "Accept-Encoding"
+    assert int(r.headers["content-length"]) < len(LARGE)
+    assert r.text == LARGE
+
+
+@pytest.mark.parametrize(
+    ("path", "accept_encoding"),
+    [
+        ("/_tests/_test_compression/small", "gzip"),
+        ("/_tests/_test_compression/image", "gzip"),
+        ("/_tests/_test_compression/large", "identity"),
+        ("/_tests/_test_compression/large", "gzip;q=0, br"),
+    ],
+)
+def test_response_not_compressed(client: TestClient, path: str, accept_encoding: str) -> None:
+    r = client.get(path, headers={"Accept-Encoding": accept_encoding})
+
+    assert "content-encoding" not in r.headers
+    assert r.status_code == 200
+
+
+def test_streaming_response_compressed_chunk_by_chunk(create_app: Callable[..., FastAPI]) -> None:
+    sent: List[Dict[str, Any]] = []
+    app = create_app(router, COMPRESSION_ENCODINGS=["gzip"], COMPRESSION_MINIMUM_SIZE=300)
+    request_sent = False
+
+    async def receive() -> Dict[str, Any]:
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # Like a server, wait for disconnect until response is sent
+        await response_complete.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Dict[str, Any]) -> None:
+        sent.append(message)
+        if message["type"] == "http.response.body" and not message.get("more_body", False):
+            response_complete.set()
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/_tests/_test_compression/stream",
+        "root_path": "",
+        "query_string": b"chunks=5&size=200",
+        "headers": [(b"accept-encoding", b"gzip")],
+    }
+
+    async def request() -> None:
+        nonlocal response_complete
+        response_complete = anyio.Event()
+        await app(scope, receive, send)
+
+    response_complete: anyio.Event
+    anyio.run(request)
+
+    headers = dict(sent[0]["headers"])
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+    bodies = [m["body"] for m in sent[1:] if m["type"] == "http.response.body"]
+    # First two chunks buffered until minimum size, then one compressed chunk per app chunk
+    assert len(bodies) == 5
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    # Every chunk can be decompressed as soon as it is received
+    assert decompressor.decompress(bodies[0]) == b"0" * 200 + b"1" * 200
+    assert decompressor.decompress(bodies[1]) == b"2" * 200
+    assert b"".join(decompressor.decompress(b) for b in bodies[2:]) == b"3" * 200 + b"4" * 200
+
+
+def test_small_streaming_response_not_compressed(client: TestClient) -> None:
+    r = client.get(
+        "/_tests/_test_compression/stream?chunks=2&size=10", headers={"Accept-Encoding": "gzip"}
+    )
+
+    assert "content-encoding" not in r.headers
+    assert r.text == "0" * 10 + "1" * 10
+
+
+def test_streaming_response_decompresses(client: TestClient) -> None:
+    r = client.get("/_tests/_test_compression/stream", headers={"Accept-Encoding": "gzip"})
+
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.content == b"".join(str(i).encode() * 200 for i in range(5))
+
+
+def test_preferred_encoding_chosen(create_app: Callable[..., FastAPI]) -> None:
+    pytest.importorskip("brotli")
+    client = TestClient(create_app(router, COMPRESSION_ENCODINGS=["br", "gzip"]))
+
+    r = client.get("/_tests/_test_compression/large", headers={"Accept-Encoding": "gzip, br"})
+
+    assert r.headers["content-encoding"] == "br"
+
+
+def test_unsupported_encoding(app: FastAPI) -> None:
+    with pytest.raises(ValueError):
+        CompressionMiddleware(app, encodings=["deflate"])
+
+
+def test_parse_accept_encoding() -> None:
+    assert parse_accept_encoding("gzip, br;q=0.5, *;q=0, zstd;q=x") == {
+        "gzip": 1.0,
+        "br": 0.5,
+        "*": 0.0,
+        "zstd": 0.0,
+    }
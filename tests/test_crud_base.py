@@ -1,12 +1,21 @@
-from typing import Generator, Optional
+import datetime
+import uuid
+from typing import Any, Dict, Generator, Optional
 
 import pytest
-from pydantic import BaseModel  # pylint: disable=no-name-in-module
-from sqlalchemy import Column, Integer, String, select
+from pydantic import BaseModel, Field  # pylint: disable=no-name-in-module
+from sqlalchemy import JSON, Column, DateTime, Integer, String, event, select
 from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session
 
-from fastapi_starter.crud.base import CRUDBase
+from fastapi_starter.crud.base import (
+    CRUDBase,
+    _match_rows,
+    encode_obj_in,
+    get_json_attributes,
+)
+from fastapi_starter.crud.cache import LRUCache
+from fastapi_starter.crud.pagination import InvalidCursorError, encode_cursor
 from fastapi_starter.db import Base
 
 
@@ -17,6 +26,14 @@ class Hero(Base):
     name: str = Column(String(256), unique=True, index=True, nullable=False)
     secret_name: str = Column(String(256), nullable=False)
     age = Column(Integer, nullable=True)
+    updated_date = Column(DateTime, onupdate=datetime.datetime.utcnow, nullable=True)
+
+
+class Team(Base):
+    __tablename__ = "team"
+
+    id: str = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    name: str = Column(String(256), nullable=False)
 
 
 class HeroCreate(BaseModel):
@@ -38,10 +55,14 @@ class CRUDHero(CRUDBase[Hero, HeroCreate, HeroUpdate]):
 @pytest.fixture(name="create_hero_table", scope="session", autouse=True)
 def create_hero_table_fixture(engine: Engine) -> Generator[None, None, None]:
     with engine.begin() as conn:
-        Base.metadata.create_all(conn, tables=[Hero.__table__])  # pylint: disable=no-member
+        Base.metadata.create_all(
+            conn, tables=[Hero.__table__, Team.__table__]
+        )  # pylint: disable=no-member
     yield
     with engine.begin() as conn:
-        Base.metadata.drop_all(conn, tables=[Hero.__table__])  # pylint: disable=no-member
+        Base.metadata.drop_all(
+            conn, tables=[Hero.__table__, Team.__table__]
+        )  # pylint: disable=no-member
 
 
 @pytest.fixture(name="crud")
@@ -162,3 +183,430 @@ def test_get_multi(db: Session, crud: CRUDHero, skip: int, limit: int, row_count
     rows = crud.get_multi(db, skip=skip, limit=limit)
 
     assert len(rows) == row_count
+
+
+def test_create_multi(db: Session, crud: CRUDHero) -> None:
+    heroes_create = [
+        HeroCreate(name="Deadpond", secret_name="Dive Wilson"),
+        {"name": "Spider-Boy", "secret_name": "Pedro Parqueador"},
+        HeroCreate(name="Rusty-Man", secret_name="Tommy Sharp", age=48),
+    ]
+
+    hero_ids = crud.create_multi(db, objs_in=heroes_create, batch_size=1)
+    db.commit()
+    heroes = {hero.id: hero for hero in crud.get_all(db)}
+
+    assert len(hero_ids) == 3
+    assert [heroes[hero_id].name for hero_id in hero_ids] == ["Deadpond", "Spider-Boy", "Rusty-Man"]
+    assert heroes[hero_ids[2]].age == 48
+
+
+def test_create_multi_with_primary_keys(db: Session, crud: CRUDHero) -> None:
+    hero_ids = crud.create_multi(
+        db,
+        objs_in=[
+            {"id": 10, "name": "Deadpond", "secret_name": "Dive Wilson"},
+            {"id": 20, "name": "Spider-Boy", "secret_name": "Pedro Parqueador"},
+        ],
+    )
+    db.commit()
+
+    assert hero_ids == [10, 20]
+    assert crud.get(db, obj_id=20).name == "Spider-Boy"  # type: ignore
+
+
+def test_create_multi_with_generated_uuid_keys(db: Session) -> None:
+    crud: CRUDBase[Team, Any, Any] = CRUDBase(Team)
+    names = [f"team-{i}" for i in range(10)]
+
+    team_ids = crud.create_multi(db, objs_in=[{"name": name} for name in names])
+    db.commit()
+
+    assert len(set(team_ids)) == 10
+    assert [crud.get(db, team_id).name for team_id in team_ids] == names  # type: ignore
+
+
+def test_returned_rows_matched_by_values() -> None:
+    values = [
+        {"name": "b", "tags": ["x"]},
+        {"name": "converted", "tags": []},
+        {"name": "a", "tags": ["y"]},
+        {"name": "b", "tags": []},
+    ]
+    result_rows = [
+        {"id": 3, "name": "b", "tags": []},
+        {"id": 4, "name": "CONVERTED", "tags": []},
+        {"id": 1, "name": "a", "tags": ["y"]},
+        {"id": 2, "name": "b", "tags": ["x"]},
+    ]
+
+    matched = _match_rows(values, result_rows, ["name", "tags"])
+
+    assert [row["id"] for row in matched] == [2, 4, 1, 3]  # type: ignore
+
+
+def test_update_multi(db: Session, crud: CRUDHero) -> None:
+    hero_ids = crud.create_multi(
+        db,
+        objs_in=[
+            HeroCreate(name="Deadpond", secret_name="Dive Wilson"),
+            HeroCreate(name="Spider-Boy", secret_name="Pedro Parqueador"),
+        ],
+    )
+    db.commit()
+
+    updated_ids = crud.update_multi(
+        db,
+        objs_in=[
+            {"id": hero_ids[0], "name": "Deadpool", "age": 30},
+            {"id": hero_ids[1], "age": 16},
+        ],
+    )
+    db.commit()
+    heroes = {hero.id: hero for hero in crud.get_all(db)}
+
+    assert updated_ids == hero_ids
+    assert heroes[hero_ids[0]].name == "Deadpool"
+    assert heroes[hero_ids[0]].age == 30
+    assert heroes[hero_ids[1]].name == "Spider-Boy"
+    assert heroes[hero_ids[1]].age == 16
+
+
+def test_upsert_multi_by_primary_key(db: Session, crud: CRUDHero) -> None:
+    crud.create_multi(db, objs_in=[{"id": 1, "name": "Deadpond", "secret_name": "Dive Wilson"}])
+    db.commit()
+
+    hero_ids = crud.upsert_multi(
+        db,
+        objs_in=[
+            {"id": 1, "name": "Deadpool", "secret_name": "Dive Wilson"},
+            {"id": 2, "name": "Spider-Boy", "secret_name": "Pedro Parqueador"},
+        ],
+    )
+    db.commit()
+    heroes = {hero.id: hero for hero in crud.get_all(db)}
+
+    assert hero_ids == [1, 2]
+    assert heroes[1].name == "Deadpool"
+    assert heroes[2].name == "Spider-Boy"
+
+
+def test_upsert_multi_by_unique_column(db: Session, crud: CRUDHero) -> None:
+    (existing_id,) = crud.create_multi(
+        db, objs_in=[HeroCreate(name="Deadpond", secret_name="Dive Wilson")]
+    )
+    db.commit()
+
+    hero_ids = crud.upsert_multi(
+        db,
+        objs_in=[
+            HeroCreate(name="Spider-Boy", secret_name="Pedro Parqueador"),
+            HeroCreate(name="Deadpond", secret_name="Wade Wilson", age=30),
+        ],
+        index_elements=["name"],
+        update_fields=["secret_name"],
+    )
+    db.commit()
+    heroes = {hero.id: hero for hero in crud.get_all(db)}
+
+    assert hero_ids[1] == existing_id
+    assert heroes[existing_id].secret_name == "Wade Wilson"
+    assert heroes[existing_id].age is None
+    assert heroes[hero_ids[0]].name == "Spider-Boy"
+
+
+def test_upsert_multi_applies_onupdate(db: Session, crud: CRUDHero) -> None:
+    crud.create_multi(db, objs_in=[{"id": 1, "name": "Deadpond", "secret_name": "Dive Wilson"}])
+    db.commit()
+
+    crud.upsert_multi(
+        db,
+        objs_in=[
+            {"id": 1, "name": "Deadpool", "secret_name": "Dive Wilson"},
+            {"id": 2, "name": "Spider-Boy", "secret_name": "Pedro Parqueador"},
+        ],
+    )
+    db.commit()
+    heroes = {hero.id: hero for hero in crud.get_all(db)}
+
+    assert heroes[1].updated_date is not None
+    assert heroes[2].updated_date is None
+
+
+def test_upsert_multi_rejects_repeated_conflict_keys(db: Session, crud: CRUDHero) -> None:
+    with pytest.raises(ValueError, match="name"):
+        crud.upsert_multi(
+            db,
+            objs_in=[
+                HeroCreate(name="Deadpond", secret_name="Dive Wilson"),
+                HeroCreate(name="Deadpond", secret_name="Wade Wilson"),
+            ],
+            index_elements=["name"],
+        )
+
+
+def test_upsert_multi_unsupported_dialect(
+    db: Session, crud: CRUDHero, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr("fastapi_starter.crud.base._DIALECT_INSERTS", {})
+
+    with pytest.raises(ValueError, match="sqlite"):
+        crud.upsert_multi(db, objs_in=[HeroCreate(name="Deadpond", secret_name="Dive Wilson")])
+
+
+def test_get_multi_keyset(db: Session, crud: CRUDHero) -> None:
+    crud.create_multi(
+        db,
+        objs_in=[
+            HeroCreate(name="Deadpond", secret_name="Dive Wilson"),
+            HeroCreate(name="Spider-Boy", secret_name="Pedro Parqueador"),
+            HeroCreate(name="Rusty-Man", secret_name="Tommy Sharp", age=48),
+        ],
+    )
+    db.commit()
+
+    page_1, cursor_1 = crud.get_multi_keyset(db, limit=2)
+    page_2, cursor_2 = crud.get_multi_keyset(db, cursor=cursor_1, limit=2)
+
+    assert [hero.name for hero in page_1] == ["Deadpond", "Spider-Boy"]
+    assert cursor_1 is not None
+    assert [hero.name for hero in page_2] == ["Rusty-Man"]
+    assert cursor_2 is None
+
+
+def test_get_multi_keyset_by_multiple_columns(db: Session) -> None:
+    crud = CRUDHero(Hero, keyset_columns=["secret_name", "id"])
+    crud.create_multi(
+        db,
+        objs_in=[
+            HeroCreate(name="Deadpond", secret_name="Wilson"),
+            HeroCreate(name="Spider-Boy", secret_name="Parqueador"),
+            HeroCreate(name="Rusty-Man", secret_name="Wilson"),
+        ],
+    )
+    db.commit()
+
+    names = []
+    cursor = None
+    while True:
+        page, cursor = crud.get_multi_keyset(db, cursor=cursor, limit=1)
+        names.extend(hero.name for hero in page)
+        if cursor is None:
+            break
+
+    assert names == ["Spider-Boy", "Deadpond", "Rusty-Man"]
+
+
+class RenamedHero(Base):
+    """Hero table mapped to attributes named differently from columns."""
+
+    __table__ = Hero.__table__
+    hero_id = Hero.__table__.c.id
+    code_name = Hero.__table__.c.secret_name
+
+
+def test_get_multi_keyset_by_renamed_attributes(db: Session) -> None:
+    CRUDHero(Hero).create_multi(
+        db,
+        objs_in=[
+            HeroCreate(name="Deadpond", secret_name="Wilson"),
+            HeroCreate(name="Spider-Boy", secret_name="Parqueador"),
+        ],
+    )
+    db.commit()
+    crud = CRUDBase(RenamedHero, keyset_columns=["secret_name", "id"])  # type: ignore
+
+    page_1, cursor = crud.get_multi_keyset(db, limit=1)
+    page_2, _ = crud.get_multi_keyset(db, cursor=cursor, limit=1)
+
+    assert [hero.code_name for hero in page_1 + page_2] == ["Parqueador", "Wilson"]
+
+
+def test_bulk_writes_by_renamed_attributes(db: Session) -> None:
+    crud: CRUDBase[RenamedHero, Any, Any] = CRUDBase(RenamedHero)
+
+    hero_ids = crud.create_multi(db, objs_in=[{"name": "Deadpond", "code_name": "Wilson"}])
+    crud.update_multi(db, objs_in=[{"hero_id": hero_ids[0], "code_name": "Dive Wilson"}])
+    crud.upsert_multi(
+        db,
+        objs_in=[{"name": "Deadpond", "code_name": "Wade Wilson", "age": 30}],
+        index_elements=["name"],
+        update_fields=["code_name"],
+    )
+    db.commit()
+    hero = crud.get(db, hero_ids[0])
+
+    assert hero is not None
+    assert (hero.code_name, hero.age) == ("Wade Wilson", None)
+    assert hero.updated_date is not None
+
+
+class ContextHero(Base):
+    __tablename__ = "context_hero"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(256), unique=True)
+    slug = Column(String(256), onupdate=lambda context: context.get_current_parameters()["name"])
+
+
+def test_upsert_multi_rejects_context_sensitive_onupdate(db: Session) -> None:
+    crud: CRUDBase[ContextHero, Any, Any] = CRUDBase(ContextHero)
+
+    with pytest.raises(ValueError, match="slug"):
+        crud.upsert_multi(db, objs_in=[{"id": 1, "name": "Deadpond"}])
+
+
+def test_get_multi_keyset_invalid_cursor(db: Session, crud: CRUDHero) -> None:
+    with pytest.raises(InvalidCursorError):
+        crud.get_multi_keyset(db, cursor=encode_cursor([1, 2]))
+
+
+def test_stream_all(db: Session, crud: CRUDHero) -> None:
+    crud.create_multi(
+        db,
+        objs_in=[HeroCreate(name=f"Hero-{i}", secret_name=f"Secret-{i}") for i in range(5)],
+    )
+    db.commit()
+
+    names = [hero.name for hero in crud.stream_all(db, chunk_size=2)]
+
+    assert sorted(names) == [f"Hero-{i}" for i in range(5)]
+
+
+@pytest.fixture(name="cached_crud")
+def cached_crud_fixture() -> CRUDHero:
+    return CRUDHero(Hero, cache=LRUCache())
+
+
+def _create_cached_hero(db: Session, cached_crud: CRUDHero) -> int:
+    (hero_id,) = cached_crud.create_multi(
+        db, objs_in=[HeroCreate(name="Deadpond", secret_name="Dive Wilson")]
+    )
+    db.commit()
+    cached_crud.get(db, obj_id=hero_id)
+    db.expunge_all()
+    return hero_id
+
+
+def test_get_reads_through_cache(db: Session, cached_crud: CRUDHero) -> None:
+    hero_id = _create_cached_hero(db, cached_crud)
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args))
+
+    hero_db = cached_crud.get(db, obj_id=hero_id)
+
+    assert hero_db is not None
+    assert hero_db.name == "Deadpond"
+    assert hero_db in db
+    assert not statements
+    assert cached_crud.cache.stats.hits == 1  # type: ignore
+    assert cached_crud.cache.stats.misses == 1  # type: ignore
+
+
+def test_update_invalidates_cache_after_commit(db: Session, cached_crud: CRUDHero) -> None:
+    hero_id = _create_cached_hero(db, cached_crud)
+    hero_db = cached_crud.get(db, obj_id=hero_id)
+
+    cached_crud.update(db, db_obj=hero_db, obj_in={"name": "Deadpool"})  # type: ignore
+    assert cached_crud.cache.get(f"hero:{hero_id}") is not None  # type: ignore
+    db.commit()
+    db.expunge_all()
+
+    assert cached_crud.cache.get(f"hero:{hero_id}") is None  # type: ignore
+    assert cached_crud.get(db, obj_id=hero_id).name == "Deadpool"  # type: ignore
+
+
+def test_rollback_keeps_cache(db: Session, cached_crud: CRUDHero) -> None:
+    hero_id = _create_cached_hero(db, cached_crud)
+
+    cached_crud.remove(db, obj_id=hero_id)
+    db.rollback()
+
+    assert cached_crud.cache.get(f"hero:{hero_id}") is not None  # type: ignore
+
+
+def test_bulk_update_invalidates_cache(db: Session, cached_crud: CRUDHero) -> None:
+    hero_id = _create_cached_hero(db, cached_crud)
+
+    cached_crud.update_multi(db, objs_in=[{"id": hero_id, "age": 30}])
+    db.commit()
+
+    assert cached_crud.cache.get(f"hero:{hero_id}") is None  # type: ignore
+
+
+def test_uncommitted_rows_not_cached(db: Session, cached_crud: CRUDHero) -> None:
+    (hero_id,) = cached_crud.create_multi(
+        db, objs_in=[HeroCreate(name="Deadpond", secret_name="Dive Wilson")]
+    )
+    assert cached_crud.get(db, obj_id=hero_id) is not None
+
+    db.rollback()
+
+    assert cached_crud.cache.get(f"hero:{hero_id}") is None  # type: ignore
+    assert cached_crud.get(db, obj_id=hero_id) is None
+
+
+def test_value_read_before_invalidation_not_cached(db: Session, cached_crud: CRUDHero) -> None:
+    hero_id = _create_cached_hero(db, cached_crud)
+    cache = cached_crud.cache
+    assert cache is not None
+    key = f"hero:{hero_id}"
+    cache.delete(key)
+
+    def invalidate(*args: Any) -> None:
+        # Another session commits an update while this one reads the old value
+        cache.delete(key)  # type: ignore
+
+    event.listen(db.get_bind(), "before_cursor_execute", invalidate)
+    try:
+        assert cached_crud.get(db, obj_id=hero_id) is not None
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", invalidate)
+
+    assert cache.get(key) is None
+
+
+class Sidekick(Base):
+    __tablename__ = "sidekick"
+
+    id: int = Column(Integer, primary_key=True)
+    joined: datetime.datetime = Column(DateTime, nullable=False)
+    powers = Column(JSON, nullable=True)
+
+
+class SidekickCreate(BaseModel):
+    joined: datetime.datetime
+    powers: Optional[Dict[str, Any]] = None
+
+
+def test_encode_obj_in_keeps_python_types_and_encodes_json() -> None:
+    joined = datetime.datetime(2022, 5, 18)
+
+    values = encode_obj_in(
+        SidekickCreate(joined=joined, powers={"since": joined}),
+        json_attributes=get_json_attributes(Sidekick),
+    )
+
+    assert values == {"joined": joined, "powers": {"since": "2022-05-18T00:00:00"}}
+
+
+class AliasedHeroCreate(BaseModel):
+    hero_name: str = Field(alias="name")
+    secret_name: str
+
+
+def test_encode_obj_in_uses_aliases() -> None:
+    values = encode_obj_in(
+        AliasedHeroCreate(name="Deadpond", secret_name="Dive Wilson"), frozenset()
+    )
+
+    assert values == {"name": "Deadpond", "secret_name": "Dive Wilson"}
+
+
+def test_update_skips_unknown_fields(db: Session, crud: CRUDHero) -> None:
+    hero_db = Hero(name="Deadpond", secret_name="Dive Wilson")
+
+    crud.update(db, db_obj=hero_db, obj_in={"name": "Deadpool", "unknown": "value"})
+
+    assert hero_db.name == "Deadpool"
+    assert not hasattr(hero_db, "unknown")
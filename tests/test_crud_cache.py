@@ -0,0 +1,51 @@
+import time
+
+from fastapi_starter.crud.cache import LRUCache
+
+
+def test_get_set() -> None:
+    cache = LRUCache()
+
+    cache.set("hero:1", {"name": "Deadpond"})
+
+    assert cache.get("hero:1") == {"name": "Deadpond"}
+    assert cache.get("hero:2") is None
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 1
+
+
+def test_least_recently_used_entry_is_evicted() -> None:
+    cache = LRUCache(max_size=2)
+    cache.set("hero:1", 1)
+    cache.set("hero:2", 2)
+    cache.get("hero:1")
+
+    cache.set("hero:3", 3)
+
+    assert cache.get("hero:2") is None
+    assert cache.get("hero:1") == 1
+    assert cache.get("hero:3") == 3
+    assert cache.stats.evictions == 1
+
+
+def test_expired_entry_is_removed() -> None:
+    cache = LRUCache(ttl=0.01)
+    cache.set("hero:1", 1)
+
+    time.sleep(0.02)
+
+    assert cache.get("hero:1") is None
+    assert len(cache) == 0
+    assert cache.stats.expirations == 1
+
+
+def test_delete_and_clear() -> None:
+    cache = LRUCache()
+    cache.set("hero:1", 1)
+    cache.set("hero:2", 2)
+
+    cache.delete("hero:1")
+    assert cache.get("hero:1") is None
+
+    cache.clear()
+    assert len(cache) == 0
@@ -0,0 +1,156 @@
+from typing import AsyncGenerator, Generator, Optional
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fastapi_starter.core.config import Settings
+from fastapi_starter.db import connectors
+from fastapi_starter.db.connectors import (
+    dispose_async_engine,
+    dispose_engines,
+    get_async_db,
+    reset_engines_after_fork,
+    split_pool_budget,
+)
+from fastapi_starter.util import gunicorn_conf
+
+
+@pytest.mark.parametrize(
+    ("pool_size", "max_overflow", "budget", "workers", "expected"),
+    [
+        (10, 5, None, 4, (10, 5)),
+        (10, 5, 100, 4, (10, 5)),
+        (10, 5, 48, 4, (10, 2)),
+        (10, 5, 20, 4, (5, 0)),
+        (10, 0, 4, 4, (1, 0)),
+        (10, 5, 20, 0, (10, 5)),
+    ],
+)
+def test_split_pool_budget(
+    pool_size: int,
+    max_overflow: int,
+    budget: Optional[int],
+    workers: int,
+    expected: tuple,
+) -> None:
+    assert split_pool_budget(pool_size, max_overflow, budget, workers) == expected
+
+
+def test_split_pool_budget_between_engines() -> None:
+    assert split_pool_budget(10, 5, 48, 4, engines=2) == (6, 0)
+
+
+def test_split_pool_budget_less_than_pools() -> None:
+    with pytest.raises(ValueError, match="less than 8 connection pools"):
+        split_pool_budget(10, 0, 7, 4, engines=2)
+
+
+@pytest.mark.parametrize(("async_engine", "expected"), [(True, (6, 0)), (False, (10, 2))])
+def test_primary_budget_split_with_async_engine(
+    settings: Settings, monkeypatch: pytest.MonkeyPatch, async_engine: bool, expected: tuple
+) -> None:
+    monkeypatch.setattr(settings, "SQLALCHEMY_ASYNC_ENGINE", async_engine)
+    monkeypatch.setattr(settings, "SQLALCHEMY_POOL_SIZE", 10)
+    monkeypatch.setattr(settings, "SQLALCHEMY_MAX_OVERFLOW", 5)
+    monkeypatch.setattr(settings, "SQLALCHEMY_POOL_BUDGET", 48)
+    monkeypatch.setattr(settings, "WORKERS", 4)
+
+    assert connectors._get_pool_limits(connectors._get_primary_engines()) == expected
+
+
+@pytest.mark.parametrize(
+    ("database_uri", "expected"),
+    [
+        ("postgresql://user:password@db/app", "postgresql+asyncpg://user:password@db/app"),
+        ("postgresql+psycopg2://user@db/app", "postgresql+asyncpg://user@db/app"),
+        ("sqlite://", "sqlite+aiosqlite://"),
+        ("sqlite+pysqlite:///app.db", "sqlite+aiosqlite:///app.db"),
+    ],
+)
+def test_async_database_uri_derived(
+    settings: Settings, monkeypatch: pytest.MonkeyPatch, database_uri: str, expected: str
+) -> None:
+    monkeypatch.setattr(settings, "SQLALCHEMY_DATABASE_URI", database_uri)
+
+    assert connectors._get_async_database_uri() == expected
+
+
+def test_async_database_uri_set_explicitly(
+    settings: Settings, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "SQLALCHEMY_DATABASE_URI", "mysql://db/app")
+    monkeypatch.setattr(settings, "SQLALCHEMY_ASYNC_DATABASE_URI", "mysql+aiomysql://db/app")
+
+    assert connectors._get_async_database_uri() == "mysql+aiomysql://db/app"
+
+
+def test_async_driver_not_derived(settings: Settings, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "SQLALCHEMY_DATABASE_URI", "mysql://db/app")
+
+    with pytest.raises(ValueError, match="SQLALCHEMY_ASYNC_DATABASE_URI"):
+        connectors._get_async_database_uri()
+
+
+@pytest.fixture(name="anyio_backend")
+def anyio_backend_fixture() -> str:
+    return "asyncio"
+
+
+@pytest.fixture(name="async_db")
+async def async_db_fixture() -> AsyncGenerator[AsyncSession, None]:
+    async for db in get_async_db():
+        yield db
+    await dispose_async_engine()
+    connectors._create_async_session_factory.cache_clear()
+    connectors._create_async_engine.cache_clear()
+
+
+@pytest.mark.anyio
+async def test_get_async_db(async_db: AsyncSession) -> None:
+    result = await async_db.execute(text("SELECT 1"))
+
+    assert result.scalar_one() == 1
+    assert async_db.get_bind().dialect.driver == "aiosqlite"
+
+
+@pytest.fixture(name="app_engine")
+def app_engine_fixture() -> Generator[Engine, None, None]:
+    app_engine = connectors._create_engine()
+    yield app_engine
+    app_engine.dispose()
+    connectors._create_engine.cache_clear()
+
+
+def test_reset_engines_after_fork_replaces_pool(app_engine: Engine) -> None:
+    pool = app_engine.pool
+
+    reset_engines_after_fork()
+
+    assert app_engine.pool is not pool
+
+
+def test_dispose_engines_replaces_pool(app_engine: Engine) -> None:
+    pool = app_engine.pool
+
+    dispose_engines()
+
+    assert app_engine.pool is not pool
+
+
+def test_gunicorn_post_fork_resets_engines(app_engine: Engine) -> None:
+    pool = app_engine.pool
+
+    gunicorn_conf.post_fork(None, None)
+
+    assert app_engine.pool is not pool
+
+
+def test_engines_disposed_on_shutdown(app: FastAPI, app_engine: Engine) -> None:
+    with TestClient(app):
+        pool = app_engine.pool
+
+    assert app_engine.pool is not pool
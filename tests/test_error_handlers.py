@@ -1,12 +1,16 @@
+import logging
+import time
 from typing import Any
 
 import pytest
 import structlog
 from _pytest.logging import LogCaptureFixture
 from fastapi import FastAPI
-from fastapi.exceptions import HTTPException
+from fastapi.exceptions import HTTPException, RequestValidationError
 from fastapi.testclient import TestClient
 
+from fastapi_starter.errors import ERROR_LOG_DEDUPLICATOR, ErrorLogDeduplicator
+
 logger: structlog.stdlib.BoundLogger = structlog.get_logger()
 
 
@@ -20,10 +24,20 @@ def app_fixture(app: FastAPI) -> FastAPI:
     def _raise_request_validation_error(not_passed_param: str) -> Any:
         return not_passed_param
 
+    @app.get("/_tests/_test_error_handlers/raise-request-validation-errors")
+    def _raise_request_validation_errors(first: int, second: int) -> Any:
+        return first + second
+
     @app.get("/_tests/_test_error_handlers/raise-unhandled-exception")
     def _raise_unhandled_exception() -> Any:
         raise ValueError("An error occurred")
 
+    @app.get("/_tests/_test_error_handlers/raise-unhandled-exceptions/{line}")
+    def _raise_unhandled_exceptions(line: int) -> Any:
+        if line == 1:
+            raise ValueError("An error occurred")
+        raise ValueError("Another error occurred")
+
     return app
 
 
@@ -75,3 +89,107 @@ def test_unhandled_exception_is_logged(client: TestClient, caplog: LogCaptureFix
     assert "event='unhandled_exception'" in caplog.text
     assert "status_code=500" in caplog.text
     assert "level='error'" in caplog.text
+
+
+def test_repeated_errors_logged_once_with_count(
+    client: TestClient, caplog: LogCaptureFixture, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    now = 1000.0
+    monkeypatch.setattr("fastapi_starter.errors.dedup.time.monotonic", lambda: now)
+    for _ in range(3):
+        client.get("/_tests/_test_error_handlers/raise-http/503")
+
+    assert caplog.text.count("event='http_error'") == 1
+    assert "repeated=" not in caplog.text
+
+    now += ERROR_LOG_DEDUPLICATOR.window
+    client.get("/_tests/_test_error_handlers/raise-http/503")
+
+    assert caplog.text.count("event='http_error'") == 2
+    assert "repeated=2" in caplog.text
+
+
+def test_validation_errors_deduplicated_by_location(
+    client: TestClient, caplog: LogCaptureFixture
+) -> None:
+    for query in ["first=x&second=1", "first=1&second=x", "first=x&second=1"]:
+        client.get(f"/_tests/_test_error_handlers/raise-request-validation-errors?{query}")
+
+    assert caplog.text.count("event='request_validation_error'") == 2
+
+
+def test_unhandled_exceptions_deduplicated_by_line(
+    client: TestClient, caplog: LogCaptureFixture
+) -> None:
+    for line in [1, 2, 1]:
+        with pytest.raises(ValueError):
+            client.get(f"/_tests/_test_error_handlers/raise-unhandled-exceptions/{line}")
+
+    assert caplog.text.count("event='unhandled_exception'") == 2
+
+
+def test_suppressed_errors_flushed(caplog: LogCaptureFixture) -> None:
+    deduplicator = ErrorLogDeduplicator(window=60.0)
+    for _ in range(4):
+        deduplicator.check(("http_error", 502))
+
+    deduplicator.flush()
+
+    assert "event='error_log_suppressed'" in caplog.text
+    assert "repeated=3" in caplog.text
+
+
+def test_suppressed_errors_logged_when_window_ends(caplog: LogCaptureFixture) -> None:
+    deduplicator = ErrorLogDeduplicator(window=0.05)
+    for _ in range(3):
+        deduplicator.check(("http_error", 502))
+
+    for _ in range(100):  # No other error comes
+        if "event='error_log_suppressed'" in caplog.text:
+            break
+        time.sleep(0.01)
+
+    assert "repeated=2" in caplog.text
+    assert deduplicator.check(("http_error", 502)) == 0
+
+
+def test_ended_windows_logged_on_check(
+    caplog: LogCaptureFixture, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    now = 1000.0
+    monkeypatch.setattr("fastapi_starter.errors.dedup.time.monotonic", lambda: now)
+    monkeypatch.setattr(ErrorLogDeduplicator, "_schedule_flush", lambda *_: None)
+    deduplicator = ErrorLogDeduplicator(window=60.0)
+    for key in ["a", "a", "b"]:
+        deduplicator.check(key)
+    now += 60.0
+
+    deduplicator.check("c")
+
+    assert "error='a' event='error_log_suppressed'" in caplog.text
+    assert "repeated=1" in caplog.text
+    assert caplog.text.count("event='error_log_suppressed'") == 1
+
+
+def test_least_recent_errors_evicted(caplog: LogCaptureFixture) -> None:
+    deduplicator = ErrorLogDeduplicator(window=60.0, max_keys=2)
+    for key in ["a", "a", "b", "c"]:
+        deduplicator.check(key)
+
+    assert "error='a' event='error_log_suppressed'" in caplog.text
+    assert deduplicator.check("a") == 0  # Logged again, window was forgotten
+    assert deduplicator.check("c") is None
+
+
+def test_validation_detail_not_serialized_when_filtered(
+    client: TestClient, caplog: LogCaptureFixture, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    def fail(*_: Any) -> str:
+        raise AssertionError("detail serialized")
+
+    monkeypatch.setattr(RequestValidationError, "json", fail)
+    caplog.set_level(logging.ERROR, logger="fastapi_starter.errors.handlers")
+
+    r = client.get("/_tests/_test_error_handlers/raise-request-validation-error")
+
+    assert r.status_code == 422
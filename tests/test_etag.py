@@ -0,0 +1,157 @@
+import datetime
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Callable, List
+
+import pytest
+from fastapi import APIRouter, FastAPI, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+from pydantic import BaseModel  # pylint: disable=no-name-in-module
+
+from fastapi_starter.responses import (
+    check_not_modified,
+    etag_matches,
+    updated_date_etag,
+)
+
+CREATED = datetime.datetime(2022, 5, 18, 12, 0)
+UPDATED = datetime.datetime(2022, 5, 19, 8, 30)
+HERO = SimpleNamespace(id=1, name="Deadpond", created_date=CREATED, updated_date=UPDATED)
+
+
+class Hero(BaseModel):
+    id: int
+    name: str
+
+    class Config:
+        orm_mode = True
+
+
+serialized: List[Any] = []
+
+
+router = APIRouter()
+
+
+@router.get("/_tests/_test_etag/heroes/1", response_model=Hero)
+def _read_hero(request: Request, response: Response) -> Any:
+    not_modified = check_not_modified(request, response, updated_date_etag(HERO))
+    if not_modified is not None:
+        return not_modified
+    serialized.append(HERO)
+    return HERO
+
+
+@router.get("/_tests/_test_etag/text")
+def _text(size: int = 10) -> Any:
+    return PlainTextResponse("x" * size, headers={"Cache-Control": "max-age=60"})
+
+
+@router.post("/_tests/_test_etag/text")
+def _post_text() -> Any:
+    return PlainTextResponse("posted")
+
+
+@router.get("/_tests/_test_etag/stream")
+def _stream() -> Any:
+    async def generate() -> AsyncIterator[str]:
+        yield "a"
+        yield "b"
+
+    return StreamingResponse(generate())
+
+
+@pytest.fixture(name="client", scope="module")
+def client_fixture(create_app: Callable[..., FastAPI]) -> TestClient:
+    return TestClient(
+        create_app(
+            router,
+            ETAG_ENABLED=True,
+            COMPRESSION_ENCODINGS=["gzip"],
+            COMPRESSION_MINIMUM_SIZE=100,
+        )
+    )
+
+
+def test_etag_computed_from_body(client: TestClient) -> None:
+    r = client.get("/_tests/_test_etag/text")
+
+    assert r.status_code == 200
+    assert r.headers["etag"].startswith('"')
+    assert client.get("/_tests/_test_etag/text").headers["etag"] == r.headers["etag"]
+    assert client.get("/_tests/_test_etag/text?size=11").headers["etag"] != r.headers["etag"]
+
+
+def test_not_modified_without_body(client: TestClient) -> None:
+    etag = client.get("/_tests/_test_etag/text").headers["etag"]
+
+    r = client.get("/_tests/_test_etag/text", headers={"If-None-Match": f'"other", {etag}'})
+
+    assert r.status_code == 304
+    assert r.content == b""
+    assert r.headers["etag"] == etag
+    assert r.headers["cache-control"] == "max-age=60"
+    assert "content-type" not in r.headers
+
+
+def test_compressed_response_has_weak_etag(client: TestClient) -> None:
+    r = client.get("/_tests/_test_etag/text?size=1000", headers={"Accept-Encoding": "gzip"})
+
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.headers["etag"].startswith('W/"')
+
+    r = client.get(
+        "/_tests/_test_etag/text?size=1000",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": r.headers["etag"]},
+    )
+
+    assert r.status_code == 304
+    assert r.headers["vary"] == "Accept-Encoding"
+
+
+def test_handler_etag_skips_serialization(client: TestClient) -> None:
+    r = client.get("/_tests/_test_etag/heroes/1")
+    etag = r.headers["etag"]
+
+    assert etag == 'W/"2022-05-19T08:30:00"'
+    assert len(serialized) == 1
+
+    r = client.get("/_tests/_test_etag/heroes/1", headers={"If-None-Match": etag})
+
+    assert r.status_code == 304
+    assert r.headers["etag"] == etag
+    assert len(serialized) == 1
+
+
+@pytest.mark.parametrize(
+    ("method", "path"),
+    [("POST", "/_tests/_test_etag/text"), ("GET", "/_tests/_test_etag/stream")],
+    ids=["post", "streaming"],
+)
+def test_etag_not_computed(client: TestClient, method: str, path: str) -> None:
+    r = client.request(method, path, headers={"If-None-Match": "*"})
+
+    assert r.status_code == 200
+    assert "etag" not in r.headers
+
+
+def test_etag_matches() -> None:
+    assert etag_matches('W/"a", "b"', '"a"')
+    assert etag_matches("*", '"a"')
+    assert not etag_matches('"b"', 'W/"a"')
+    assert not etag_matches(None, '"a"')
+
+
+def test_updated_date_etag() -> None:
+    created_only = SimpleNamespace(created_date=CREATED, updated_date=None)
+
+    assert updated_date_etag(created_only) == 'W/"2022-05-18T12:00:00"'
+    assert updated_date_etag([HERO, created_only]) == updated_date_etag([HERO, created_only])
+    assert updated_date_etag([HERO]) != updated_date_etag([HERO, created_only])
+
+
+def test_updated_date_etag_of_replaced_object() -> None:
+    other = SimpleNamespace(id=2, name="Spider-Boy", created_date=CREATED, updated_date=UPDATED)
+
+    # Same number of objects and latest date
+    assert updated_date_etag([HERO]) != updated_date_etag([other])
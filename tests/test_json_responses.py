@@ -0,0 +1,177 @@
+import datetime
+import uuid
+from decimal import Decimal
+from typing import Any, Callable, List, Optional
+
+import pytest
+from fastapi import APIRouter, FastAPI, Response
+from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi.testclient import TestClient
+from pydantic import (  # pylint: disable=no-name-in-module
+    BaseModel,
+    Field,
+    ValidationError,
+)
+
+from fastapi_starter.responses import (
+    DirectSerializationRoute,
+    FastJSONResponse,
+    JSONSerializer,
+    enable_direct_serialization,
+)
+
+
+class Power(BaseModel):
+    name: str
+    level: Decimal
+
+
+class Hero(BaseModel):
+    id: uuid.UUID
+    name: str
+    secret_name: str = Field(alias="secretName")
+    age: Optional[int] = None
+    created_at: datetime.datetime
+    powers: List[Power] = []
+
+
+class HeroInDB(Hero):
+    password: str
+
+
+HERO = {
+    "id": uuid.UUID("3f1c5f4e-9b1e-4f0a-8d4a-2b0c7c9d8e7f"),
+    "name": "Deadpond",
+    "secretName": "Dive Wilson",
+    "created_at": datetime.datetime(2022, 5, 18, 12, 30, 15, 123456),
+    "powers": [{"name": "swim", "level": Decimal("9.5")}],
+}
+
+
+def _add_routes(router: Any) -> None:
+    @router.get("/heroes", response_model=List[Hero])
+    def read_heroes() -> Any:
+        return [HeroInDB(**HERO, password="hunter2")]
+
+    @router.get("/heroes/async", response_model=List[Hero], response_model_exclude_none=True)
+    async def read_heroes_async() -> Any:
+        return [HERO]
+
+    @router.post("/heroes", response_model=Hero, status_code=201)
+    def create_hero(response: Response) -> Any:
+        response.headers["Location"] = "/heroes/1"
+        return HERO
+
+    @router.get("/heroes/invalid", response_model=Hero)
+    def read_invalid_hero() -> Any:
+        return {"name": "Nobody"}
+
+    @router.get("/heroes/raw", response_model=Hero)
+    def read_raw_hero() -> Any:
+        return PlainTextResponse("raw")
+
+    @router.get("/heroes/unset", response_model=List[Hero], response_model_exclude_unset=True)
+    def read_heroes_unset() -> Any:
+        return [Hero(**HERO)]
+
+
+router = APIRouter()
+_add_routes(router)
+
+
+@pytest.fixture(name="create_json_app", scope="module")
+def create_json_app_fixture(create_app: Callable[..., FastAPI]) -> Callable[..., FastAPI]:
+    def create_json_app(
+        direct: bool, serializer: JSONSerializer = JSONSerializer.STDLIB
+    ) -> FastAPI:
+        return create_app(
+            router, JSON_DIRECT_SERIALIZATION=direct, JSON_SERIALIZER=serializer.value
+        )
+
+    return create_json_app
+
+
+@pytest.mark.parametrize("serializer", list(JSONSerializer))
+@pytest.mark.parametrize(
+    "path", ["/heroes", "/heroes/async"], ids=["sync_endpoint", "async_endpoint"]
+)
+def test_direct_serialization_same_as_default(
+    create_json_app: Callable[..., FastAPI], serializer: JSONSerializer, path: str
+) -> None:
+    expected = TestClient(create_json_app(direct=False)).get(path)
+    r = TestClient(create_json_app(direct=True, serializer=serializer)).get(path)
+
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/json"
+    assert r.json() == expected.json()
+    assert "password" not in r.json()[0]
+    if serializer is JSONSerializer.STDLIB:
+        assert r.content == expected.content
+
+
+def test_direct_serialization_keeps_status_and_headers(
+    create_json_app: Callable[..., FastAPI]
+) -> None:
+    client = TestClient(create_json_app(direct=True))
+
+    r = client.post("/heroes")
+
+    assert r.status_code == 201
+    assert r.headers["location"] == "/heroes/1"
+    assert r.json()["secretName"] == "Dive Wilson"
+
+
+def test_direct_serialization_validates_response(create_json_app: Callable[..., FastAPI]) -> None:
+    client = TestClient(create_json_app(direct=True))
+
+    with pytest.raises(ValidationError):
+        client.get("/heroes/invalid")
+
+
+def test_direct_serialization_passes_responses_through(
+    create_json_app: Callable[..., FastAPI]
+) -> None:
+    client = TestClient(create_json_app(direct=True))
+
+    assert client.get("/heroes/raw").text == "raw"
+
+
+def test_direct_serialization_enabled_twice(create_json_app: Callable[..., FastAPI]) -> None:
+    app = create_json_app(direct=True)
+    enable_direct_serialization(app)
+
+    assert TestClient(app).get("/heroes").json()[0]["name"] == "Deadpond"
+
+
+def test_direct_serialization_route_class() -> None:
+    direct_router = APIRouter(route_class=DirectSerializationRoute)
+    _add_routes(direct_router)
+    app = FastAPI()
+    app.include_router(direct_router)
+
+    r = TestClient(app).get("/heroes")
+
+    assert r.json()[0]["created_at"] == "2022-05-18T12:30:15.123456"
+    assert r.json()[0]["powers"] == [{"name": "swim", "level": 9.5}]
+
+
+def test_fast_json_response_renders_like_json_response() -> None:
+    content = {"name": "Deadpond", "age": 42, "tags": ["a", "ü"], "nested": {"1": None}}
+
+    assert FastJSONResponse(content).body == JSONResponse(content).body
+
+
+def test_model_instances_serialized_without_validation(
+    create_json_app: Callable[..., FastAPI]
+) -> None:
+    app = create_json_app(direct=True)
+
+    assert TestClient(app).get("/heroes/unset").json() == [
+        {
+            "id": "3f1c5f4e-9b1e-4f0a-8d4a-2b0c7c9d8e7f",
+            "name": "Deadpond",
+            "secretName": "Dive Wilson",
+            "created_at": "2022-05-18T12:30:15.123456",
+            "powers": [{"name": "swim", "level": 9.5}],
+        }
+    ]
@@ -0,0 +1,143 @@
+import io
+import json
+import logging
+import queue
+import threading
+from typing import Iterator, List
+
+import pytest
+import structlog
+
+from fastapi_starter.middleware.log_queue import (
+    BoundedQueueHandler,
+    OverflowPolicy,
+    start_log_queue,
+    stop_log_queue,
+)
+from fastapi_starter.middleware.logging import LogRenderer, get_structlog_processors
+
+
+class SlowStream(io.StringIO):
+    def __init__(self) -> None:
+        super().__init__()
+        self.unblocked = threading.Event()
+
+    def write(self, s: str) -> int:
+        self.unblocked.wait(timeout=5)
+        return super().write(s)
+
+
+def _record(msg: str) -> logging.LogRecord:
+    return logging.makeLogRecord({"msg": msg, "levelno": logging.INFO, "levelname": "INFO"})
+
+
+@pytest.fixture(name="renderer", params=[LogRenderer.KEY_VALUE, LogRenderer.JSON])
+def renderer_fixture(request: pytest.FixtureRequest) -> Iterator[LogRenderer]:
+    config = structlog.get_config()
+    structlog.configure(
+        processors=list(get_structlog_processors("iso", True, False, request.param)),
+        logger_factory=structlog.stdlib.LoggerFactory(),
+        wrapper_class=structlog.stdlib.BoundLogger,
+    )
+    yield request.param
+    structlog.configure(**config)
+
+
+def _dropped_reports(output: str, renderer: LogRenderer) -> List[int]:
+    reports = []
+    for line in output.splitlines():
+        if renderer is LogRenderer.JSON and line.startswith("{"):
+            event = json.loads(line)
+            if event["event"] == "log_records_dropped":
+                assert event["level"] == "warning"
+                reports.append(event["dropped"])
+        elif "event='log_records_dropped'" in line:
+            assert "level='warning'" in line
+            reports.append(int(line.split("dropped=")[1].split()[0]))
+    return reports
+
+
+def _queued_messages(log_queue: "queue.Queue[logging.LogRecord]") -> List[str]:
+    return [record.getMessage() for record in list(log_queue.queue)]
+
+
+def test_drop_discards_new_records_and_counts_them() -> None:
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(2)
+    handler = BoundedQueueHandler(log_queue, OverflowPolicy.DROP)
+
+    for i in range(4):
+        handler.handle(_record(f"record-{i}"))
+
+    assert _queued_messages(log_queue) == ["record-0", "record-1"]
+    assert handler.dropped == 2
+
+
+def test_drop_oldest_keeps_newest_records() -> None:
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(2)
+    handler = BoundedQueueHandler(log_queue, OverflowPolicy.DROP_OLDEST)
+
+    for i in range(4):
+        handler.handle(_record(f"record-{i}"))
+
+    assert _queued_messages(log_queue) == ["record-2", "record-3"]
+    assert handler.dropped == 2
+
+
+def test_records_written_by_background_thread() -> None:
+    stream = SlowStream()
+    handler = start_log_queue(stream, max_size=10)
+
+    try:
+        handler.handle(_record("record-0"))  # Does not wait for slow stream
+
+        assert stream.getvalue() == ""
+    finally:
+        stream.unblocked.set()
+        stop_log_queue()
+    assert stream.getvalue() == "record-0\n"
+
+
+def test_queue_flushed_on_stop() -> None:
+    stream = SlowStream()
+    stream.unblocked.set()
+    handler = start_log_queue(stream, max_size=1000, overflow=OverflowPolicy.BLOCK)
+
+    for i in range(100):
+        handler.handle(_record(f"record-{i}"))
+    stop_log_queue()
+
+    assert stream.getvalue().splitlines() == [f"record-{i}" for i in range(100)]
+
+
+def test_dropped_records_count_written_on_stop(renderer: LogRenderer) -> None:
+    stream = SlowStream()
+    handler = start_log_queue(stream, max_size=1, overflow=OverflowPolicy.DROP)
+
+    for i in range(10):
+        handler.handle(_record(f"record-{i}"))
+    dropped = handler.dropped
+    stream.unblocked.set()
+    stop_log_queue()
+
+    assert dropped > 0
+    assert _dropped_reports(stream.getvalue(), renderer) == [dropped]
+
+
+def test_dropped_records_count_written_while_running(renderer: LogRenderer) -> None:
+    stream = SlowStream()
+    handler = start_log_queue(stream, max_size=1, overflow=OverflowPolicy.DROP, report_interval=0)
+
+    for i in range(10):
+        handler.handle(_record(f"record-{i}"))
+    dropped = handler.dropped
+    stream.unblocked.set()
+    try:
+        for _ in range(500):  # Reported after the records written next
+            if sum(_dropped_reports(stream.getvalue(), renderer)) == dropped:
+                break
+            threading.Event().wait(0.01)
+
+        assert dropped > 0
+        assert sum(_dropped_reports(stream.getvalue(), renderer)) == dropped
+    finally:
+        stop_log_queue()
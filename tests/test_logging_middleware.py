@@ -1,3 +1,4 @@
+import json
 import uuid
 from typing import Any
 
@@ -6,6 +7,17 @@ import structlog
 from _pytest.logging import LogCaptureFixture
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from fastapi_starter.core.config import Settings
+from fastapi_starter.middleware import LogRenderer
+from fastapi_starter.middleware.logging import (
+    StructlogLoggingMiddleware,
+    get_structlog_processors,
+)
 
 logger: structlog.stdlib.BoundLogger = structlog.get_logger()
 
@@ -17,6 +29,11 @@ def app_fixture(app: FastAPI) -> FastAPI:
         logger.info("test_route")
         return {"message": "test_route"}
 
+    @app.post("/_tests/_test_logging_middleware/{item_id}")
+    async def _test_logging_middleware_item_route(item_id: int, request: Request) -> Any:
+        await request.body()
+        return {"item_id": item_id}
+
     return app
 
 
@@ -40,3 +57,67 @@ def test_request_id_added_to_logs(client: TestClient, caplog: LogCaptureFixture)
     client.get("/_tests/_test_logging_middleware", headers={"X-Request-ID": request_id})
 
     assert f"request_id='{request_id}'" in caplog.text
+
+
+def test_request_context_added_to_logs(client: TestClient, caplog: LogCaptureFixture) -> None:
+    client.get("/_tests/_test_logging_middleware")
+
+    assert "method='GET'" in caplog.text
+    assert "/_tests/_test_logging_middleware'" in caplog.text
+    assert "remote_addr='testclient'" in caplog.text
+    assert "scheme='http'" in caplog.text
+
+
+def test_access_log(client: TestClient, caplog: LogCaptureFixture) -> None:
+    client.post("/_tests/_test_logging_middleware/42", data=b"12345")
+
+    assert "event='access'" in caplog.text
+    assert "route='/_tests/_test_logging_middleware/{item_id}'" in caplog.text
+    assert "status_code=200" in caplog.text
+    assert "request_bytes=5" in caplog.text
+    assert "response_bytes=14" in caplog.text
+    assert "duration_ms=" in caplog.text
+
+
+def test_access_log_excludes_healthcheck_endpoint(
+    client: TestClient, caplog: LogCaptureFixture, settings: Settings
+) -> None:
+    client.get(settings.HEALTHCHECK_ENDPOINT)
+
+    assert "event='access'" not in caplog.text
+
+
+def _create_sampled_app(sample_rate: float, error_sample_rate: float) -> Starlette:
+    def endpoint(request: Request) -> PlainTextResponse:
+        return PlainTextResponse("", status_code=int(request.path_params["status_code"]))
+
+    app = Starlette(routes=[Route("/{status_code}", endpoint)])
+    app.add_middleware(
+        StructlogLoggingMiddleware, sample_rate=sample_rate, error_sample_rate=error_sample_rate
+    )
+    return app
+
+
+def test_access_log_sampled_separately_for_errors(caplog: LogCaptureFixture) -> None:
+    with TestClient(_create_sampled_app(sample_rate=0.0, error_sample_rate=1.0)) as client:
+        client.get("/200")
+        client.get("/503")
+
+    assert "status_code=200" not in caplog.text
+    assert "status_code=503" in caplog.text
+
+
+def test_json_renderer_renders_unsorted_json() -> None:
+    renderer = get_structlog_processors("iso", False, False, LogRenderer.JSON)[-1]
+
+    rendered = renderer(None, "info", {"event": "test", "b": 2, "a": 1})
+
+    assert isinstance(rendered, str)
+    assert rendered.index('"b"') < rendered.index('"a"')
+    assert json.loads(rendered) == {"event": "test", "b": 2, "a": 1}
+
+
+def test_processor_chain_built_once() -> None:
+    processors = get_structlog_processors("iso", False, False, LogRenderer.JSON)
+
+    assert get_structlog_processors("iso", False, False, LogRenderer.JSON) is processors
@@ -0,0 +1,147 @@
+import multiprocessing
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from fastapi_starter.db.pool_stats import POOL_STATS, InstrumentedQueuePool, PoolStats
+from fastapi_starter.metrics import REGISTRY, Counter, Gauge, Histogram, MetricsRegistry
+from fastapi_starter.metrics.storage import MmapValues, read_values
+from fastapi_starter.util import gunicorn_conf
+
+
+@pytest.fixture(name="registry")
+def registry_fixture(tmp_path: Path) -> MetricsRegistry:
+    return MetricsRegistry(str(tmp_path))
+
+
+def _increment_in_child_process(counter: Counter) -> None:
+    counter.labels("/heroes").inc(2)
+
+
+def test_mmap_values_are_readable_from_file(tmp_path: Path) -> None:
+    path = str(tmp_path / "counter_1.db")
+    values = MmapValues(path, initial_size=64)
+
+    for i in range(10):  # Grows file beyond initial size
+        values.inc(f"key-{i}", i)
+    values.inc("key-1", 1.5)
+
+    assert dict(read_values(path)) == {**{f"key-{i}": float(i) for i in range(10)}, "key-1": 2.5}
+
+
+def test_counter_aggregated_across_processes(registry: MetricsRegistry) -> None:
+    counter = Counter("requests_total", "Requests.", ["route"], registry=registry)
+    counter.labels("/heroes").inc()
+
+    process = multiprocessing.get_context("fork").Process(
+        target=_increment_in_child_process, args=(counter,)
+    )
+    process.start()
+    process.join()
+
+    assert 'requests_total{route="/heroes"} 3.0' in registry.collect()
+
+
+def test_gauges_of_dead_process_removed(registry: MetricsRegistry, tmp_path: Path) -> None:
+    gauge = Gauge("in_progress", "In progress.", registry=registry)
+    gauge.set(2)
+    other_process = MmapValues(str(tmp_path / "gauge_99999.db"))
+    other_process.set(gauge.labels()._key, 5)  # pylint: disable=protected-access
+
+    assert "in_progress 7.0" in registry.collect()
+
+    registry.mark_process_dead(99999)
+
+    assert "in_progress 2.0" in registry.collect()
+
+
+def test_max_gauge_aggregation(registry: MetricsRegistry, tmp_path: Path) -> None:
+    gauge = Gauge("wait_max", "Max wait.", aggregate="max", registry=registry)
+    gauge.set(2)
+    other_process = MmapValues(str(tmp_path / "gauge_99999.db"))
+    other_process.set(gauge.labels()._key, 5)  # pylint: disable=protected-access
+
+    assert "wait_max 5.0" in registry.collect()
+
+
+def test_histogram_exposition(registry: MetricsRegistry) -> None:
+    histogram = Histogram("duration_seconds", "Duration.", buckets=(0.1, 1.0), registry=registry)
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    assert registry.collect() == (
+        "# HELP duration_seconds Duration.\n"
+        "# TYPE duration_seconds histogram\n"
+        'duration_seconds_bucket{le="0.1"} 1.0\n'
+        'duration_seconds_bucket{le="1.0"} 2.0\n'
+        'duration_seconds_bucket{le="+Inf"} 3.0\n'
+        "duration_seconds_sum 5.55\n"
+        "duration_seconds_count 3.0\n"
+    )
+
+
+def test_metrics_endpoint(client: TestClient) -> None:
+    client.get("/api/v1/health/liveness")
+    client.get("/_tests/_test_metrics/not_found")
+
+    r = client.get("/metrics")
+
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert (
+        'http_requests_total{method="GET",route="/api/v1/health/liveness",status_code="200"}'
+        in r.text
+    )
+    assert 'http_requests_total{method="GET",route="unmatched",status_code="404"}' in r.text
+    assert (
+        'http_request_duration_seconds_bucket{method="GET",route="/api/v1/health/liveness"'
+        in r.text
+    )
+    assert 'http_errors_total{error="http_error",status_code="404"}' in r.text
+    assert "http_requests_in_progress 1.0" in r.text  # Scrape request itself
+
+
+def test_errors_not_counted_without_metrics(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    client.get("/_tests/_test_metrics/not_found")
+    before = client.get("/metrics").text
+    monkeypatch.setattr(REGISTRY, "enabled", False)
+
+    client.get("/_tests/_test_metrics/not_found")
+    monkeypatch.setattr(REGISTRY, "enabled", True)
+
+    line = 'http_errors_total{error="http_error",status_code="404"}'
+    count = [row for row in client.get("/metrics").text.splitlines() if row.startswith(line)]
+    assert count == [row for row in before.splitlines() if row.startswith(line)]
+
+
+def test_pool_stats_collected(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    engine = create_engine("sqlite://", poolclass=InstrumentedQueuePool, future=True)
+    monkeypatch.setitem(POOL_STATS, "_test_metrics", PoolStats("_test_metrics", engine))
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+    r = client.get("/metrics")
+
+    assert 'db_pool_checkouts_total{pool="_test_metrics"} 1.0' in r.text
+    assert 'db_pool_connections_opened_total{pool="_test_metrics"} 1.0' in r.text
+    assert 'db_pool_checked_in_connections{pool="_test_metrics"} 1.0' in r.text
+
+
+def test_gunicorn_removes_only_metrics_files(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    for name in ("metrics_dir", "response_cache_dir", "rate_limit_dir"):
+        monkeypatch.setattr(gunicorn_conf, name, str(tmp_path / name))
+    shared = tmp_path / "metrics_dir"
+    shared.mkdir()
+    for name in ("counter_1.db", "gauge_1.db", "other.db", "notes.txt"):
+        (shared / name).write_text("")
+
+    gunicorn_conf.on_starting(None)
+
+    assert sorted(path.name for path in shared.iterdir()) == ["notes.txt", "other.db"]
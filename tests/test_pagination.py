@@ -0,0 +1,93 @@
+import datetime
+from typing import Any
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import Column, DateTime, Integer
+from sqlalchemy.orm import Session
+
+from fastapi_starter import schemas
+from fastapi_starter.api.deps import keyset_pagination
+from fastapi_starter.crud.base import CRUDBase
+from fastapi_starter.crud.pagination import (
+    InvalidCursorError,
+    decode_cursor,
+    encode_cursor,
+    parse_cursor_values,
+)
+from fastapi_starter.db import Base, get_db
+
+
+class Item(Base):
+    __tablename__ = "pagination_item"
+
+    id = Column(Integer, primary_key=True)
+
+
+@pytest.fixture(name="app", scope="module", autouse=True)
+def app_fixture(app: FastAPI) -> FastAPI:
+    @app.get("/_tests/_test_pagination", response_model=schemas.KeysetPagination)
+    def _pagination_route(
+        pagination: schemas.KeysetPagination = Depends(keyset_pagination),
+    ) -> Any:
+        return pagination
+
+    @app.get("/_tests/_test_pagination/items")
+    def _items_route(
+        pagination: schemas.KeysetPagination = Depends(keyset_pagination),
+        db: Session = Depends(get_db),
+    ) -> Any:
+        items, _ = CRUDBase(Item).get_multi_keyset(db, **pagination.dict())
+        return [item.id for item in items]
+
+    return app
+
+
+def test_cursor_round_trip() -> None:
+    columns = [Column("created", DateTime), Column("id", Integer)]
+    created = datetime.datetime(2022, 5, 18, 12, 30)
+
+    cursor = encode_cursor([created, 42])
+
+    assert parse_cursor_values(cursor, columns) == [created, 42]
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    ["not-a-cursor", encode_cursor([1])[:-1], "eyJhIjoxfQ", encode_cursor(["1"])],
+)
+def test_invalid_cursor(cursor: str) -> None:
+    with pytest.raises(InvalidCursorError):
+        parse_cursor_values(cursor, [Column("id", Integer)])
+
+
+def test_pagination_dependency(client: TestClient) -> None:
+    cursor = encode_cursor([1])
+
+    r = client.get("/_tests/_test_pagination", params={"cursor": cursor, "limit": 10})
+
+    assert r.status_code == 200
+    assert r.json() == {"cursor": cursor, "limit": 10}
+    assert decode_cursor(cursor) == [1]
+
+
+@pytest.mark.parametrize("params", [{"cursor": "not-a-cursor"}, {"limit": 0}, {"limit": 10_000}])
+def test_pagination_dependency_rejects_invalid_params(client: TestClient, params: dict) -> None:
+    r = client.get("/_tests/_test_pagination", params=params)
+
+    assert r.status_code in (400, 422)
+
+
+def test_page_schema() -> None:
+    page = schemas.Page[int](items=[1, 2], next_cursor="abc")
+
+    assert page.dict() == {"items": [1, 2], "next_cursor": "abc"}
+
+
+@pytest.mark.parametrize("values", [[1, 2], ["1"], [True]])
+def test_cursor_not_matching_keyset_columns_rejected(client: TestClient, values: list) -> None:
+    r = client.get("/_tests/_test_pagination/items", params={"cursor": encode_cursor(values)})
+
+    assert r.status_code == 400
+    assert r.json() == {"detail": "Invalid cursor"}
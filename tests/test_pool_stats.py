@@ -0,0 +1,99 @@
+import os
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DisconnectionError
+from structlog.contextvars import clear_contextvars, get_contextvars
+
+from fastapi_starter.core.config import Settings
+from fastapi_starter.db.pool_stats import InstrumentedQueuePool, PoolStats
+
+
+@pytest.fixture(name="pool_engine")
+def pool_engine_fixture(tmp_path: Path) -> Engine:
+    return create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=2,
+        max_overflow=1,
+        pool_pre_ping=True,
+        future=True,
+    )
+
+
+@pytest.fixture(name="pool_stats")
+def pool_stats_fixture(pool_engine: Engine) -> PoolStats:
+    return PoolStats("test", pool_engine)
+
+
+def test_checkouts_are_counted(pool_engine: Engine, pool_stats: PoolStats) -> None:
+    with pool_engine.connect() as conn_1, pool_engine.connect() as conn_2:
+        conn_1.execute(text("SELECT 1"))
+        conn_2.execute(text("SELECT 1"))
+        stats = pool_stats.snapshot()
+
+    assert stats["checked_out"] == 2
+    assert stats["checkouts"] == 2
+    assert stats["connections_opened"] == 2
+    assert stats["checkout_wait_seconds_total"] > 0
+    assert stats["connection_age_seconds_max"] > 0
+    assert pool_stats.snapshot()["checked_out"] == 0
+
+
+def test_overflow(pool_engine: Engine, pool_stats: PoolStats) -> None:
+    with pool_engine.connect(), pool_engine.connect(), pool_engine.connect():
+        stats = pool_stats.snapshot()
+
+    assert stats["overflow"] == 1
+
+
+def test_pre_ping_failures(pool_engine: Engine, pool_stats: PoolStats) -> None:
+    with pool_engine.connect() as conn:
+        conn.invalidate(DisconnectionError())
+
+    stats = pool_stats.snapshot()
+
+    assert stats["pre_ping_failures"] == 1
+    assert stats["invalidations"] == 1
+
+
+def test_stats_survive_engine_dispose(pool_engine: Engine, pool_stats: PoolStats) -> None:
+    pool_engine.dispose()
+
+    with pool_engine.connect():
+        pass
+
+    assert pool_stats.snapshot()["checkouts"] == 1
+
+
+def test_connections_of_disposed_pool_forgotten(pool_engine: Engine, pool_stats: PoolStats) -> None:
+    with pool_engine.connect():
+        pass
+    assert pool_stats.snapshot()["connection_age_seconds_max"] > 0
+
+    pool_engine.dispose(close=False)  # As after fork, pooled connections aren't closed
+
+    assert pool_stats.snapshot()["connection_age_seconds_max"] == 0.0
+
+
+def test_checkout_wait_bound_to_log_context(pool_engine: Engine, pool_stats: PoolStats) -> None:
+    clear_contextvars()
+
+    with pool_engine.connect():
+        context = get_contextvars()
+
+    assert "db_checkout_wait_ms" in context
+    assert context["db_pool_checked_out"] == 1
+    clear_contextvars()
+
+
+def test_pool_endpoint(client: TestClient, settings: Settings) -> None:
+    r = client.get(f"{settings.API_V1_STR}/health/pool")
+    data = r.json()
+
+    assert r.status_code == 200
+    assert data["pid"] == os.getpid()
+    assert isinstance(data["pools"], list)
@@ -0,0 +1,118 @@
+import json
+import marshal
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from fastapi_starter.middleware import ProfilerMode, ProfilingMiddleware
+from fastapi_starter.middleware.profiling import _deterministic_lock
+
+SLOW = "/_tests/_test_profiling/slow"
+
+router = APIRouter()
+
+
+@router.get(SLOW)
+def slow() -> Any:  # Sync endpoint runs in threadpool
+    time.sleep(0.05)
+    return {"message": "slow"}
+
+
+def test_not_profiled_without_secret_header(create_app: Callable[..., FastAPI]) -> None:
+    client = TestClient(create_app(router, PROFILING_SECRET="s3cret"))
+
+    r = client.get(SLOW, headers={"X-Profile": "wrong"})
+
+    assert r.json() == {"message": "slow"}
+    assert "x-profiled-status" not in r.headers
+
+
+def test_sampling_profile_returned_inline(create_app: Callable[..., FastAPI]) -> None:
+    client = TestClient(create_app(router, PROFILING_SECRET="s3cret"))
+
+    r = client.get(SLOW, headers={"X-Profile": "s3cret"})
+
+    assert r.headers["x-profiled-status"] == "200"
+    profile = r.json()
+    frame_names = {frame["name"] for frame in profile["shared"]["frames"]}
+    assert "slow" in frame_names  # Sampled from threadpool thread
+    assert all(p["type"] == "sampled" for p in profile["profiles"])
+
+
+def test_deterministic_profile_returned_inline(create_app: Callable[..., FastAPI]) -> None:
+    client = TestClient(
+        create_app(
+            router, PROFILING_SECRET="s3cret", PROFILING_MODE=ProfilerMode.DETERMINISTIC.value
+        )
+    )
+
+    r = client.get(SLOW, headers={"X-Profile": "s3cret"})
+
+    assert r.headers["content-type"].startswith("text/plain")
+    assert "function calls" in r.text
+
+
+def test_one_deterministic_profile_at_a_time(create_app: Callable[..., FastAPI]) -> None:
+    client = TestClient(
+        create_app(
+            router, PROFILING_SECRET="s3cret", PROFILING_MODE=ProfilerMode.DETERMINISTIC.value
+        )
+    )
+
+    with _deterministic_lock:  # Another request is being profiled
+        r = client.get(SLOW, headers={"X-Profile": "s3cret"})
+
+    assert r.json() == {"message": "slow"}
+    assert "x-profiled-status" not in r.headers
+
+
+@pytest.mark.parametrize(
+    ("mode", "suffix"),
+    [(ProfilerMode.SAMPLING, ".speedscope.json"), (ProfilerMode.DETERMINISTIC, ".prof")],
+)
+def test_sampled_profile_written_to_directory(
+    create_app: Callable[..., FastAPI], tmp_path: Path, mode: ProfilerMode, suffix: str
+) -> None:
+    client = TestClient(
+        create_app(
+            router,
+            PROFILING_SAMPLE_RATE=1.0,
+            PROFILING_PATHS=[SLOW],
+            PROFILING_MODE=mode.value,
+            PROFILING_DIR=str(tmp_path),
+        )
+    )
+
+    r = client.get(SLOW)
+
+    assert r.json() == {"message": "slow"}
+    (profile_path,) = tmp_path.iterdir()
+    assert profile_path.name.endswith(suffix)
+    if mode is ProfilerMode.SAMPLING:
+        assert json.loads(profile_path.read_bytes())["name"] == f"GET {SLOW}"
+    else:
+        assert marshal.loads(profile_path.read_bytes())
+
+
+def test_sampling_rule_limited_to_paths(create_app: Callable[..., FastAPI], tmp_path: Path) -> None:
+    client = TestClient(
+        create_app(
+            router,
+            PROFILING_SAMPLE_RATE=1.0,
+            PROFILING_PATHS=["/other"],
+            PROFILING_DIR=str(tmp_path),
+        )
+    )
+
+    client.get(SLOW)
+
+    assert not list(tmp_path.iterdir())
+
+
+def test_sample_rate_requires_directory(app: FastAPI) -> None:
+    with pytest.raises(ValueError):
+        ProfilingMiddleware(app, sample_rate=0.1)
@@ -0,0 +1,214 @@
+import multiprocessing
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from fastapi_starter import FastAPIStarterTemplate
+from fastapi_starter.core.config import Settings
+from fastapi_starter.middleware import (
+    RateLimit,
+    RateLimitMiddleware,
+    TokenBuckets,
+)
+from fastapi_starter.middleware.rate_limit import PROBES
+from fastapi_starter.util import gunicorn_conf
+
+PER_SECOND = RateLimit(rate=1.0, burst=2)
+
+
+HEROES = "/_tests/_test_rate_limit/heroes"
+LOGIN = "/_tests/_test_rate_limit/login"
+
+router = APIRouter()
+
+
+@router.get(HEROES + "/{hero_id}")
+def _read_hero(hero_id: int) -> Any:
+    return {"id": hero_id}
+
+
+@router.get(LOGIN)
+def _login() -> Any:
+    return {}
+
+
+def test_requests_over_limit_rejected(create_app: Callable[..., FastAPI]) -> None:
+    client = TestClient(create_app(router, RATE_LIMIT="2/minute"))
+
+    assert client.get(f"{HEROES}/1").status_code == 200
+    assert client.get(f"{HEROES}/2").status_code == 200
+    r = client.get(f"{HEROES}/1")
+
+    assert r.status_code == 429
+    assert r.json() == {"detail": "Too Many Requests"}
+    assert r.headers["retry-after"] == "30"
+
+
+def test_route_limit_has_own_bucket(create_app: Callable[..., FastAPI]) -> None:
+    client = TestClient(
+        create_app(
+            router, RATE_LIMIT="2/minute", RATE_LIMIT_ROUTES={HEROES + "/{hero_id}": "1/minute"}
+        )
+    )
+
+    assert client.get(f"{HEROES}/1").status_code == 200
+    assert client.get(f"{HEROES}/2").status_code == 429
+    assert client.get(LOGIN).status_code == 200
+    assert client.get(LOGIN).status_code == 200
+    assert client.get(LOGIN).status_code == 429
+
+
+def test_health_check_not_limited(create_app: Callable[..., FastAPI], settings: Settings) -> None:
+    client = TestClient(create_app(router, RATE_LIMIT="1/minute"))
+
+    assert [client.get(settings.HEALTHCHECK_ENDPOINT).status_code for _ in range(3)] == [200] * 3
+
+
+def test_api_key_buckets(create_app: Callable[..., FastAPI]) -> None:
+    client = TestClient(create_app(router, RATE_LIMIT="1/minute", RATE_LIMIT_KEY="api_key"))
+
+    assert client.get(LOGIN, headers={"X-API-Key": "a"}).status_code == 200
+    assert client.get(LOGIN, headers={"X-API-Key": "b"}).status_code == 200
+    assert client.get(LOGIN).status_code == 200  # Client address
+    assert client.get(LOGIN, headers={"X-API-Key": "a"}).status_code == 429
+
+
+def _from_address(app: ASGIApp, host: str) -> ASGIApp:
+    async def app_from_address(scope: Scope, receive: Receive, send: Send) -> None:
+        await app({**scope, "client": (host, 50000)}, receive, send)
+
+    return app_from_address
+
+
+def test_unvalidated_api_key_bucket_per_address(create_app: Callable[..., FastAPI]) -> None:
+    app = create_app(router, RATE_LIMIT="1/minute", RATE_LIMIT_KEY="api_key")
+    client, other_client = TestClient(app), TestClient(_from_address(app, "10.0.0.2"))
+
+    assert client.get(LOGIN, headers={"X-API-Key": "a"}).status_code == 200
+    assert other_client.get(LOGIN, headers={"X-API-Key": "a"}).status_code == 200
+    assert client.get(LOGIN, headers={"X-API-Key": "a"}).status_code == 429
+
+
+def test_invalid_api_key_limited_by_address(
+    create_app: Callable[..., FastAPI], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(
+        FastAPIStarterTemplate, "create_api_key_validator", lambda self: lambda key: key == "a"
+    )
+    client = TestClient(create_app(router, RATE_LIMIT="1/minute", RATE_LIMIT_KEY="api_key"))
+
+    assert client.get(LOGIN, headers={"X-API-Key": "a"}).status_code == 200
+    assert client.get(LOGIN, headers={"X-API-Key": "b"}).status_code == 200
+    assert client.get(LOGIN, headers={"X-API-Key": "c"}).status_code == 429
+    assert client.get(LOGIN).status_code == 429
+
+
+def test_custom_key_function(create_app: Callable[..., FastAPI]) -> None:
+    def tenant(scope: Scope) -> Optional[str]:
+        return dict(scope["headers"]).get(b"x-tenant", b"").decode() or None
+
+    # Key functions are not settings
+    client = TestClient(RateLimitMiddleware(create_app(router), limit="1/minute", key=tenant))
+
+    assert client.get(LOGIN, headers={"X-Tenant": "a"}).status_code == 200
+    assert client.get(LOGIN, headers={"X-Tenant": "a"}).status_code == 429
+    # Not limited without key
+    assert client.get(LOGIN).status_code == 200
+    assert client.get(LOGIN).status_code == 200
+
+
+def test_token_bucket_refills() -> None:
+    buckets = TokenBuckets(slots=16)
+
+    assert buckets.acquire("a", PER_SECOND, now=100.0) == 0
+    assert buckets.acquire("a", PER_SECOND, now=100.0) == 0
+    assert buckets.acquire("a", PER_SECOND, now=100.0) == pytest.approx(1.0)
+    assert buckets.acquire("a", PER_SECOND, now=100.5) == pytest.approx(0.5)
+    assert buckets.acquire("a", PER_SECOND, now=101.0) == 0
+    assert buckets.acquire("a", PER_SECOND, now=101.0) > 0
+    assert buckets.acquire("b", PER_SECOND, now=101.0) == 0
+
+
+def test_fullest_bucket_replaced() -> None:
+    buckets = TokenBuckets(slots=4)  # All keys share the same slots
+
+    for key in "abcd":
+        assert buckets.acquire(key, PER_SECOND, now=100.0) == 0
+    assert buckets.acquire("a", PER_SECOND, now=100.0) == 0
+    assert buckets.acquire("a", PER_SECOND, now=100.0) > 0
+    # Replaces one of the buckets with a single token taken
+    assert buckets.acquire("e", PER_SECOND, now=100.0) == 0
+    assert buckets.acquire("a", PER_SECOND, now=100.0) > 0
+
+
+def _acquire_in_child_process(path: str, count: int) -> None:
+    buckets = TokenBuckets(path, slots=16)
+    for _ in range(count):
+        buckets.acquire("client", RateLimit(rate=0.001, burst=10))
+
+
+def test_buckets_shared_across_processes(tmp_path: Path) -> None:
+    path = str(tmp_path / "buckets")
+    context = multiprocessing.get_context("fork")
+    processes = [
+        context.Process(target=_acquire_in_child_process, args=(path, 3)) for _ in range(3)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    buckets = TokenBuckets(path, slots=16)
+    limit = RateLimit(rate=0.001, burst=10)
+    assert buckets.acquire("client", limit) == 0
+    assert buckets.acquire("client", limit) > 0
+
+
+def _lock_buckets_in_child_process(path: str, locked: Any, release: Any) -> None:
+    buckets = TokenBuckets(path, slots=PROBES)  # One group of slots, starting at 0
+    buckets.acquire("other", PER_SECOND)
+    with buckets._locked(0):  # pylint: disable=protected-access
+        locked.set()
+        release.wait(5)
+
+
+def test_try_acquire_does_not_wait_for_lock(tmp_path: Path) -> None:
+    path = str(tmp_path / "buckets")
+    context = multiprocessing.get_context("fork")
+    locked, release = context.Event(), context.Event()
+    process = context.Process(target=_lock_buckets_in_child_process, args=(path, locked, release))
+    process.start()
+    assert locked.wait(5)
+    buckets = TokenBuckets(path, slots=PROBES)
+
+    assert buckets.try_acquire("client", PER_SECOND) is None
+    release.set()
+    process.join(5)
+    assert buckets.try_acquire("client", PER_SECOND) == 0
+
+
+def test_parse_rate_limit() -> None:
+    assert RateLimit.parse("100/minute") == RateLimit(rate=100 / 60, burst=100)
+    assert RateLimit.parse("5 / Seconds") == RateLimit(rate=5.0, burst=5)
+    for invalid in ("100", "0/second", "1/week"):
+        with pytest.raises(ValueError):
+            RateLimit.parse(invalid)
+
+
+def test_gunicorn_removes_only_buckets_file(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    for name in ("metrics_dir", "response_cache_dir", "rate_limit_dir"):
+        monkeypatch.setattr(gunicorn_conf, name, str(tmp_path / name))
+    shared = tmp_path / "rate_limit_dir"
+    shared.mkdir()
+    for name in ("buckets", "other"):
+        (shared / name).write_text("")
+
+    gunicorn_conf.on_starting(None)
+
+    assert [path.name for path in shared.iterdir()] == ["other"]
@@ -0,0 +1,80 @@
+from pathlib import Path
+from typing import List
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+from fastapi_starter.db.replicas import ReplicaRouter
+
+
+def _create_engine(path: Path) -> Engine:
+    return create_engine(f"sqlite:///{path}", poolclass=QueuePool, pool_pre_ping=True, future=True)
+
+
+def _database_name(engine: Engine) -> str:
+    return Path(str(engine.url.database)).stem
+
+
+@pytest.fixture(name="primary")
+def primary_fixture(tmp_path: Path) -> Engine:
+    return _create_engine(tmp_path / "primary.db")
+
+
+@pytest.fixture(name="replicas")
+def replicas_fixture(tmp_path: Path) -> List[Engine]:
+    return [_create_engine(tmp_path / f"replica-{i}.db") for i in range(2)]
+
+
+@pytest.fixture(name="unavailable_replica")
+def unavailable_replica_fixture(tmp_path: Path) -> Engine:
+    return _create_engine(tmp_path / "does-not-exist" / "replica.db")
+
+
+def test_unknown_selection_strategy(primary: Engine, replicas: List[Engine]) -> None:
+    with pytest.raises(ValueError):
+        ReplicaRouter(primary, replicas, selection="random")
+
+
+def test_round_robin(primary: Engine, replicas: List[Engine]) -> None:
+    router = ReplicaRouter(primary, replicas, selection="round_robin")
+
+    selected = []
+    for _ in range(4):
+        with router.connect() as conn:
+            selected.append(_database_name(conn.engine))
+
+    assert selected == ["replica-0", "replica-1", "replica-0", "replica-1"]
+
+
+def test_least_connections(primary: Engine, replicas: List[Engine]) -> None:
+    router = ReplicaRouter(primary, replicas, selection="least_connections")
+
+    with router.connect() as conn_1, router.connect() as conn_2:
+        assert _database_name(conn_1.engine) == "replica-0"
+        assert _database_name(conn_2.engine) == "replica-1"
+
+
+def test_unavailable_replica_is_skipped(
+    primary: Engine, replicas: List[Engine], unavailable_replica: Engine
+) -> None:
+    router = ReplicaRouter(primary, [unavailable_replica, replicas[0]])
+
+    with router.connect() as conn:
+        assert _database_name(conn.engine) == "replica-0"
+        assert conn.execute(text("SELECT 1")).scalar() == 1
+
+
+def test_fallback_to_primary(primary: Engine, unavailable_replica: Engine) -> None:
+    router = ReplicaRouter(primary, [unavailable_replica])
+
+    with router.connect() as conn:
+        assert _database_name(conn.engine) == "primary"
+
+
+def test_primary_used_without_replicas(primary: Engine) -> None:
+    router = ReplicaRouter(primary, [])
+
+    with router.connect() as conn:
+        assert _database_name(conn.engine) == "primary"
@@ -0,0 +1,208 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import anyio
+import pytest
+from fastapi import APIRouter, FastAPI, Response
+from fastapi.responses import PlainTextResponse
+
+from fastapi_starter.metrics import REGISTRY
+from fastapi_starter.responses import (
+    SingleFlight,
+    coalesce_requests,
+)
+
+calls: List[str] = []
+
+
+HEROES = "/_tests/_test_request_coalescing/heroes"
+COOKIE = "/_tests/_test_request_coalescing/cookie"
+TEXT = "/_tests/_test_request_coalescing/text"
+
+router = APIRouter()
+
+
+@router.get(HEROES + "/{hero_id}")
+@coalesce_requests()
+async def _read_hero(hero_id: int) -> Any:
+    calls.append("hero")
+    await anyio.sleep(0.05)
+    return {"id": hero_id}
+
+
+@router.get(COOKIE)
+@coalesce_requests()
+async def _cookie(response: Response) -> Any:
+    calls.append("cookie")
+    await anyio.sleep(0.05)
+    response.set_cookie("session", str(len(calls)))
+    return {}
+
+
+@router.get(TEXT)
+@coalesce_requests(vary_headers=[])
+async def _text() -> Any:
+    calls.append("text")
+    await anyio.sleep(0.05)
+    return PlainTextResponse("text")
+
+
+@pytest.fixture(name="coalescing_app", scope="module")
+def coalescing_app_fixture(create_app: Callable[..., FastAPI]) -> FastAPI:
+    return create_app(router)
+
+
+def _request(path: str, headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    path, _, query = path.partition("?")
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "scheme": "http",
+        "server": ("testserver", 80),
+        "client": ("testclient", 50000),
+        "method": "GET",
+        "path": path,
+        "root_path": "",
+        "query_string": query.encode(),
+        "headers": [
+            (b"host", b"testserver"),
+            *((k.lower().encode(), v.encode()) for k, v in (headers or {}).items()),
+        ],
+    }
+
+
+def _send_concurrently(app: FastAPI, *scopes: Dict[str, Any]) -> List[Tuple[int, bytes]]:
+    responses: List[Tuple[int, bytes]] = []
+
+    async def request(scope: Dict[str, Any]) -> None:
+        messages: List[Dict[str, Any]] = []
+
+        async def receive() -> Dict[str, Any]:
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message: Dict[str, Any]) -> None:
+            messages.append(message)
+
+        await app(scope, receive, send)
+        responses.append((messages[0]["status"], b"".join(m.get("body", b"") for m in messages)))
+
+    async def main() -> None:
+        async with anyio.create_task_group() as tg:
+            for scope in scopes:
+                tg.start_soon(request, scope)
+
+    anyio.run(main)
+    return responses
+
+
+def _coalesced(route: str) -> float:
+    prefix = f'http_coalesced_requests_total{{route="{route}"}} '
+    lines = [line for line in REGISTRY.collect().splitlines() if line.startswith(prefix)]
+    return float(lines[0].rsplit(" ", 1)[1]) if lines else 0.0
+
+
+def test_identical_requests_handled_once(
+    coalescing_app: FastAPI, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(REGISTRY, "enabled", True)
+    calls.clear()
+    coalesced = _coalesced(HEROES + "/{hero_id}")
+
+    responses = _send_concurrently(coalescing_app, *[_request(f"{HEROES}/1")] * 5)
+
+    assert responses == [(200, b'{"id":1}')] * 5
+    assert calls == ["hero"]
+    assert _coalesced(HEROES + "/{hero_id}") == coalesced + 4
+
+
+def test_different_requests_not_coalesced(coalescing_app: FastAPI) -> None:
+    calls.clear()
+
+    _send_concurrently(
+        coalescing_app,
+        _request(f"{HEROES}/1"),
+        _request(f"{HEROES}/2"),
+        _request(f"{HEROES}/1?q=1"),
+        _request(f"{HEROES}/1", {"Authorization": "Bearer a"}),
+        _request(f"{HEROES}/1", {"Authorization": "Bearer b"}),
+    )
+
+    assert calls == ["hero"] * 5
+
+
+def test_vary_headers(coalescing_app: FastAPI) -> None:
+    calls.clear()
+
+    _send_concurrently(
+        coalescing_app, _request(TEXT, {"Cookie": "a"}), _request(TEXT, {"Cookie": "b"})
+    )
+
+    assert calls == ["text"]
+
+
+def test_response_with_cookie_not_shared(coalescing_app: FastAPI) -> None:
+    calls.clear()
+
+    _send_concurrently(coalescing_app, *[_request(COOKIE)] * 3)
+
+    assert calls == ["cookie"] * 3
+
+
+def test_single_flight_shares_errors() -> None:
+    flights: SingleFlight[int] = SingleFlight()
+    errors: List[Exception] = []
+
+    async def fail() -> int:
+        await anyio.sleep(0.01)
+        raise ValueError("failed")
+
+    async def call() -> None:
+        try:
+            await flights.do("key", fail)
+        except ValueError as error:
+            errors.append(error)
+
+    async def main() -> None:
+        async with anyio.create_task_group() as tg:
+            for _ in range(3):
+                tg.start_soon(call)
+
+    anyio.run(main)
+
+    assert len(errors) == 3
+    assert len(set(map(id, errors))) == 1
+    assert len(flights) == 0
+
+
+def test_single_flight_after_cancelled_call() -> None:
+    flights: SingleFlight[int] = SingleFlight()
+    scopes: List[anyio.CancelScope] = []
+    results: List[Tuple[int, bool]] = []
+
+    async def slow() -> int:
+        await anyio.sleep(10)
+        return 1
+
+    async def fast() -> int:
+        return 2
+
+    async def cancelled() -> None:
+        with anyio.CancelScope() as scope:
+            scopes.append(scope)
+            await flights.do("key", slow)
+
+    async def wait() -> None:
+        results.append(await flights.do("key", fast))
+
+    async def main() -> None:
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(cancelled)
+            await anyio.sleep(0.01)
+            tg.start_soon(wait)
+            await anyio.sleep(0.01)
+            scopes[0].cancel()
+
+    anyio.run(main)
+
+    # Waiting caller runs its own call
+    assert results == [(2, False)]
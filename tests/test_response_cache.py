@@ -0,0 +1,245 @@
+import fcntl
+import multiprocessing
+import time
+from pathlib import Path
+from typing import Any, Callable, List, Tuple
+
+import anyio
+import pytest
+from fastapi import APIRouter, FastAPI, Header, Response
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+
+from fastapi_starter.responses import (
+    ResponseCache,
+    SharedMemoryCache,
+    cache_response,
+)
+from fastapi_starter.responses.cache import HIT, MISS, STALE, CachedResponse, _Entry
+from fastapi_starter.util import gunicorn_conf
+
+calls: List[str] = []
+
+
+HEROES = "/_tests/_test_response_cache/heroes/"
+COOKIE = "/_tests/_test_response_cache/cookie"
+MISSING = "/_tests/_test_response_cache/missing"
+
+router = APIRouter()
+
+
+@router.get(HEROES)
+@cache_response(ttl=60, vary_query=["skip"], vary_headers=["Accept-Language"])
+def _read_heroes(skip: int = 0, accept_language: str = Header("en")) -> Any:
+    calls.append("heroes")
+    return {"skip": skip, "language": accept_language}
+
+
+@router.get(COOKIE)
+@cache_response(ttl=60)
+def _cookie(response: Response) -> Any:
+    calls.append("cookie")
+    response.set_cookie("session", "secret")
+    return {}
+
+
+@router.get(MISSING)
+@cache_response(ttl=60)
+def _missing() -> Any:
+    calls.append("missing")
+    return PlainTextResponse("missing", status_code=404)
+
+
+@pytest.fixture(name="client")
+def client_fixture(create_app: Callable[..., FastAPI]) -> TestClient:
+    calls.clear()
+    # Configures the response cache again, without entries of previous tests
+    return TestClient(create_app(router))
+
+
+def test_cached_response_served_without_calling_route(client: TestClient) -> None:
+    r = client.get(f"{HEROES}?skip=1")
+
+    assert r.headers["x-cache"] == MISS
+    r = client.get(f"{HEROES}?skip=1&unknown=1")
+
+    assert r.headers["x-cache"] == HIT
+    assert r.json() == {"skip": 1, "language": "en"}
+    assert r.headers["content-type"] == "application/json"
+    assert calls == ["heroes"]
+
+
+def test_cache_varies_by_query_and_headers(client: TestClient) -> None:
+    client.get(HEROES)
+    client.get(f"{HEROES}?skip=1")
+    r = client.get(HEROES, headers={"Accept-Language": "de"})
+
+    assert r.json() == {"skip": 0, "language": "de"}
+    assert calls == ["heroes"] * 3
+
+
+@pytest.mark.parametrize("path", [COOKIE, MISSING])
+def test_response_not_cached(client: TestClient, path: str) -> None:
+    client.get(path)
+    r = client.get(path)
+
+    assert r.headers["x-cache"] == MISS
+    assert len(calls) == 2
+
+
+def test_concurrent_requests_computed_once() -> None:
+    cache = ResponseCache()
+    computed = 0
+    results: List[Tuple[CachedResponse, str]] = []
+
+    async def compute() -> Tuple[CachedResponse, bool]:
+        nonlocal computed
+        computed += 1
+        await anyio.sleep(0.05)
+        return CachedResponse(200, [], b"body"), True
+
+    async def get() -> None:
+        results.append(await cache.get_or_compute("key", 60, compute))
+
+    async def main() -> None:
+        async with anyio.create_task_group() as tg:
+            for _ in range(5):
+                tg.start_soon(get)
+
+    anyio.run(main)
+
+    assert computed == 1
+    assert sorted(status for _, status in results) == [HIT] * 4 + [MISS]
+    assert all(response.body == b"body" for response, _ in results)
+
+
+def test_shared_tier_serves_other_workers(tmp_path: Path) -> None:
+    worker, other_worker = ResponseCache(), ResponseCache()
+    worker.configure(shared_dir=str(tmp_path))
+    other_worker.configure(shared_dir=str(tmp_path))
+    response = CachedResponse(200, [(b"content-type", b"text/plain")], b"body")
+
+    worker.set("key", response, 60)
+    entry = other_worker.get("key")
+
+    assert entry is not None
+    assert entry.response == response
+
+
+def _hold_recompute_lock(path: str, locked: Any, release: Any) -> None:
+    shared = SharedMemoryCache(path, slots=16, slot_size=1024)
+    assert shared.try_lock("key")
+    locked.set()
+    release.wait(5)
+    shared.set("key", time.time() + 60, time.time() + 120, CachedResponse(200, [], b"new").encode())
+    shared.unlock("key")
+
+
+def test_only_one_worker_recomputes(tmp_path: Path) -> None:
+    path = str(tmp_path / "cache")
+    context = multiprocessing.get_context("fork")
+    locked, release = context.Event(), context.Event()
+    process = context.Process(target=_hold_recompute_lock, args=(path, locked, release))
+    process.start()
+    assert locked.wait(5)
+    cache = ResponseCache(shared=SharedMemoryCache(path, slots=16, slot_size=1024))
+
+    async def compute() -> Tuple[CachedResponse, bool]:
+        return CachedResponse(200, [], b"computed"), True
+
+    # Expired entry is served stale while the other worker recomputes
+    now = time.time()
+    cache.local.set("key", _Entry(now - 1, now + 60, CachedResponse(200, [], b"old")))
+    response, status = anyio.run(cache.get_or_compute, "key", 60, compute)
+    assert (response.body, status) == (b"old", STALE)
+
+    # Without entry, wait for the other worker
+    cache.local.clear()
+    release.set()
+    response, status = anyio.run(cache.get_or_compute, "key", 60, compute)
+    process.join(5)
+    assert (response.body, status) == (b"new", HIT)
+
+
+def _try_lock_in_child_process(path: str, key: str, result: Any) -> None:
+    result.put(SharedMemoryCache(path, slots=1, slot_size=1024).try_lock(key))
+
+
+def test_recompute_lock_held_until_last_unlock(tmp_path: Path) -> None:
+    path = str(tmp_path / "cache")
+    shared = SharedMemoryCache(path, slots=1, slot_size=1024)  # Keys share the slot
+    context = multiprocessing.get_context("fork")
+
+    def locked_by_other_worker() -> bool:
+        result = context.Queue()
+        process = context.Process(target=_try_lock_in_child_process, args=(path, "c", result))
+        process.start()
+        process.join(5)
+        return not result.get(timeout=5)
+
+    assert shared.try_lock("a")
+    assert shared.try_lock("b")
+    shared.unlock("a")
+    assert locked_by_other_worker()
+    shared.unlock("b")
+    assert not locked_by_other_worker()
+
+
+def test_shared_memory_cache(tmp_path: Path) -> None:
+    shared = SharedMemoryCache(str(tmp_path / "cache"), slots=1, slot_size=1024)
+
+    assert shared.get("a") is None
+    assert shared.set("a", 1.0, 2.0, b"value")
+    assert shared.get("a") == (1.0, 2.0, b"value")
+    assert not shared.set("b", 1.0, 2.0, b"x" * 1024)
+    # Only one slot, replaced by another key
+    assert shared.set("b", 1.0, 2.0, b"other")
+    assert shared.get("a") is None
+
+
+def _hold_write_lock(path: str, locked: Any, release: Any) -> None:
+    with open(path, "r+b") as file:
+        fcntl.lockf(file.fileno(), fcntl.LOCK_EX, 1, 0)  # Slot 0
+        locked.set()
+        release.wait(5)
+
+
+def test_shared_write_skipped_while_slot_is_written(tmp_path: Path) -> None:
+    path = str(tmp_path / "cache")
+    shared = SharedMemoryCache(path, slots=1, slot_size=1024)
+    assert shared.set("a", 1.0, 2.0, b"value")
+    context = multiprocessing.get_context("fork")
+    locked, release = context.Event(), context.Event()
+    process = context.Process(target=_hold_write_lock, args=(path, locked, release))
+    process.start()
+    assert locked.wait(5)
+
+    try:
+        assert not shared.set("a", 1.0, 2.0, b"new")  # Does not wait
+    finally:
+        release.set()
+        process.join(5)
+    assert shared.get("a") == (1.0, 2.0, b"value")
+    assert shared.set("a", 1.0, 2.0, b"new")
+
+
+def test_cached_response_encoding() -> None:
+    response = CachedResponse(200, [(b"content-type", b"a:b"), (b"etag", b'"1"')], b"\r\nbody")
+
+    assert CachedResponse.decode(response.encode()) == response
+    assert CachedResponse.decode(CachedResponse(204, [], b"").encode()) == CachedResponse(
+        204, [], b""
+    )
+
+
+def test_gunicorn_removes_only_cache_file(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    for name in ("metrics_dir", "response_cache_dir", "rate_limit_dir"):
+        monkeypatch.setattr(gunicorn_conf, name, str(tmp_path / name))
+    shared = tmp_path / "response_cache_dir"
+    shared.mkdir()
+    for name in ("responses.cache", "other.cache"):
+        (shared / name).write_text("")
+
+    gunicorn_conf.on_starting(None)
+
+    assert [path.name for path in shared.iterdir()] == ["other.cache"]
@@ -0,0 +1,64 @@
+import pytest
+from _pytest.logging import LogCaptureFixture
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+
+from fastapi_starter.db.statements import (
+    get_statement_timeout_connect_args,
+    instrument_statements,
+)
+
+
+def _create_instrumented_engine(slow_query_ms: float) -> Engine:
+    engine = create_engine("sqlite://", future=True)
+    instrument_statements(engine, slow_query_ms=slow_query_ms)
+    return engine
+
+
+def test_slow_query_is_logged(caplog: LogCaptureFixture) -> None:
+    engine = _create_instrumented_engine(slow_query_ms=0)
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+    assert "event='slow_query'" in caplog.text
+    assert "statement='SELECT 1'" in caplog.text
+    assert "duration_ms=" in caplog.text
+
+
+def test_fast_query_is_not_logged(caplog: LogCaptureFixture) -> None:
+    engine = _create_instrumented_engine(slow_query_ms=60_000)
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+    assert "slow_query" not in caplog.text
+
+
+def test_failed_query_does_not_break_timing(caplog: LogCaptureFixture) -> None:
+    engine = _create_instrumented_engine(slow_query_ms=0)
+
+    with engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text("SELECT * FROM does_not_exist"))
+        conn.execute(text("SELECT 2"))
+
+    assert "statement='SELECT 2'" in caplog.text
+
+
+@pytest.mark.parametrize(
+    ("database_uri", "timeout", "expected"),
+    [
+        ("postgresql://localhost/app", None, {}),
+        ("postgresql://localhost/app", 5000, {"options": "-c statement_timeout=5000"}),
+        (
+            "postgresql+asyncpg://localhost/app",
+            5000,
+            {"server_settings": {"statement_timeout": "5000"}},
+        ),
+        ("sqlite://", 5000, {}),
+    ],
+)
+def test_statement_timeout_connect_args(database_uri: str, timeout: int, expected: dict) -> None:
+    assert get_statement_timeout_connect_args(database_uri, timeout) == expected
@@ -0,0 +1,73 @@
+import json
+from typing import Any, AsyncIterator, Iterator, Optional
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel  # pylint: disable=no-name-in-module
+
+from fastapi_starter.responses import csv_response, ndjson_response
+
+
+class HeroRow:
+    def __init__(self, name: str, age: Optional[int] = None):
+        self.name = name
+        self.age = age
+
+
+class HeroSchema(BaseModel):
+    name: str
+    age: Optional[int] = None
+
+    class Config:
+        orm_mode = True
+
+
+def _rows() -> Iterator[HeroRow]:
+    for i in range(5):
+        yield HeroRow(name=f"Hero-{i}", age=i)
+
+
+async def _async_rows() -> AsyncIterator[HeroRow]:
+    for row in _rows():
+        yield row
+
+
+@pytest.fixture(name="app", scope="module", autouse=True)
+def app_fixture(app: FastAPI) -> FastAPI:
+    @app.get("/_tests/_test_streaming_responses/ndjson")
+    def _ndjson_route() -> Any:
+        return ndjson_response(_rows(), HeroSchema, chunk_size=2)
+
+    @app.get("/_tests/_test_streaming_responses/ndjson-async")
+    async def _ndjson_async_route() -> Any:
+        return ndjson_response(_async_rows(), HeroSchema, chunk_size=2)
+
+    @app.get("/_tests/_test_streaming_responses/csv")
+    def _csv_route() -> Any:
+        return csv_response(_rows(), HeroSchema, chunk_size=2, filename="heroes.csv")
+
+    return app
+
+
+@pytest.mark.parametrize("path", ["ndjson", "ndjson-async"])
+def test_ndjson_response(client: TestClient, path: str) -> None:
+    r = client.get(f"/_tests/_test_streaming_responses/{path}")
+    lines = r.text.splitlines()
+
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in lines] == [
+        {"name": f"Hero-{i}", "age": i} for i in range(5)
+    ]
+
+
+def test_csv_response(client: TestClient) -> None:
+    r = client.get("/_tests/_test_streaming_responses/csv")
+    lines = r.text.splitlines()
+
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/csv")
+    assert r.headers["content-disposition"] == 'attachment; filename="heroes.csv"'
+    assert lines[0] == "name,age"
+    assert lines[1:] == [f"Hero-{i},{i}" for i in range(5)]
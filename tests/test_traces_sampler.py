@@ -0,0 +1,149 @@
+from typing import Any, Callable, Dict, Generator, List, Optional
+
+import pytest
+import sentry_sdk
+from fastapi import APIRouter, FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from fastapi_starter import FastAPIStarterTemplate
+from fastapi_starter.core.config import Settings
+from fastapi_starter.tracing import SamplingFeedbackMiddleware, TracesSampler
+
+HEROES = "/_tests/_test_traces_sampler/heroes"
+VILLAINS = "/_tests/_test_traces_sampler/villains"
+
+router = APIRouter()
+
+
+@router.get(HEROES + "/{hero_id}")
+def _read_hero(hero_id: int) -> Any:
+    if hero_id == 0:
+        raise HTTPException(status_code=503)
+    return {"hero_id": hero_id}
+
+
+@router.get(VILLAINS)
+def _read_villains() -> Any:
+    return []
+
+
+@pytest.fixture(name="sampled_app", scope="module")
+def sampled_app_fixture(create_app: Callable[..., FastAPI]) -> FastAPI:
+    return create_app(router)
+
+
+def _context(path: str, parent_sampled: Optional[bool] = None) -> Dict[str, Any]:
+    return {
+        "asgi_scope": {"type": "http", "path": path},
+        "transaction_context": {"name": "generic ASGI request", "op": "http.server"},
+        "parent_sampled": parent_sampled,
+    }
+
+
+@pytest.fixture(name="sampler")
+def sampler_fixture(sampled_app: FastAPI, settings: Settings) -> TracesSampler:
+    return TracesSampler(
+        sampled_app,
+        default_rate=0.1,
+        route_rates={VILLAINS: 0.5},
+        exclude_paths=[f"{settings.API_V1_STR}/health/"],
+    )
+
+
+def test_health_checks_never_sampled(sampler: TracesSampler, settings: Settings) -> None:
+    assert sampler(_context(settings.HEALTHCHECK_ENDPOINT)) == 0.0
+    assert sampler(_context(settings.HEALTHCHECK_ENDPOINT, parent_sampled=True)) == 0.0
+
+
+def test_parent_decision_kept(sampler: TracesSampler) -> None:
+    assert sampler(_context(f"{HEROES}/1", parent_sampled=True)) == 1.0
+    assert sampler(_context(f"{HEROES}/1", parent_sampled=False)) == 0.0
+
+
+def test_rate_by_route_template(sampler: TracesSampler) -> None:
+    assert sampler(_context(f"{HEROES}/1")) == 0.1
+    assert sampler(_context(VILLAINS)) == 0.5
+    assert sampler(_context("/unknown")) == 0.1
+    assert sampler.resolve_route(f"{HEROES}/2") == HEROES + "/{hero_id}"
+
+
+def test_failing_route_boosted(sampler: TracesSampler) -> None:
+    client = TestClient(SamplingFeedbackMiddleware(sampler.app, sampler=sampler))
+
+    client.get(f"{HEROES}/0")
+
+    assert sampler(_context(f"{HEROES}/1")) == pytest.approx(1.0)
+    assert sampler(_context(VILLAINS)) == 0.5
+
+
+def test_slow_route_boosted(sampled_app: FastAPI) -> None:
+    sampler = TracesSampler(sampled_app, default_rate=0.01, slow_threshold=0.2, boost=10)
+
+    for _ in range(5):
+        sampler.observe(VILLAINS, duration=2.0, status_code=200)
+
+    assert sampler(_context(VILLAINS)) == pytest.approx(0.1)
+    assert sampler(_context(f"{HEROES}/1")) == pytest.approx(0.01)
+
+
+def test_adaptive_rate_targets_traces_per_second(
+    sampled_app: FastAPI, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    now = 100.0
+    monkeypatch.setattr("fastapi_starter.tracing.sampling.time.monotonic", lambda: now)
+    sampler = TracesSampler(sampled_app, default_rate=1.0, target_per_second=5)
+
+    for _ in range(49):
+        assert sampler(_context(f"{HEROES}/1")) == 1.0
+    now += 1.0
+
+    assert sampler(_context(f"{HEROES}/1")) == pytest.approx(0.1)  # 50 requests per second
+    assert sampler(_context(VILLAINS)) == pytest.approx(0.1)
+
+
+class RecordingTracesSampler(TracesSampler):
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.paths: List[str] = []
+
+    def __call__(self, sampling_context: Dict[str, Any]) -> float:
+        self.paths.append(sampling_context["asgi_scope"]["path"])
+        super().__call__(sampling_context)
+        return 0.0  # Nothing is sent
+
+
+class SentryTemplate(FastAPIStarterTemplate):
+    sampler: RecordingTracesSampler
+
+    def init_settings(self) -> Settings:
+        return super().init_settings().copy(update={"SENTRY_DSN": "https://key@sentry.invalid/1"})
+
+    def create_traces_sampler(self) -> TracesSampler:
+        self.sampler = RecordingTracesSampler(self.app, default_rate=1.0)
+        return self.sampler
+
+
+@pytest.fixture(name="sentry_template")
+def sentry_template_fixture(
+    settings: Settings, monkeypatch: pytest.MonkeyPatch
+) -> Generator[SentryTemplate, None, None]:
+    # Without the Starlette integration of newer sentry-sdk, like the locked version
+    init = sentry_sdk.init
+    monkeypatch.setattr(
+        sentry_sdk, "init", lambda **options: init(**options, auto_enabling_integrations=False)
+    )
+    template = SentryTemplate()
+    template.create_app()
+    yield template
+    sentry_sdk.Hub.current.bind_client(None)
+
+
+def test_app_samples_request_transactions(sentry_template: SentryTemplate) -> None:
+    client = TestClient(sentry_template.app)
+
+    r = client.get(f"{sentry_template.settings.API_V1_STR}/health/liveness")
+
+    assert r.status_code == 200
+    assert sentry_template.sampler.paths == [
+        f"{sentry_template.settings.API_V1_STR}/health/liveness"
+    ]
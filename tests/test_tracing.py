@@ -0,0 +1,197 @@
+import json
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, Generator, Iterator, List
+
+import pytest
+from fastapi import APIRouter, Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection
+
+from fastapi_starter.tracing import (
+    TRACER,
+    FileSpanExporter,
+    InMemorySpanExporter,
+    Span,
+    instrument_engine,
+    start_span,
+)
+from fastapi_starter.tracing.exporters import encode_otlp_span
+
+db_engine = create_engine("sqlite://", future=True)
+instrument_engine(db_engine)
+
+
+def get_connection() -> Generator[Connection, None, None]:
+    with db_engine.connect() as connection:
+        yield connection
+
+
+ITEMS = "/_tests/_test_tracing/items"
+
+router = APIRouter()
+
+
+@router.get(ITEMS + "/{item_id}")
+def read_item(item_id: int, connection: Connection = Depends(get_connection)) -> Any:
+    return {"item_id": connection.execute(text("SELECT :id"), {"id": item_id}).scalar()}
+
+
+@pytest.fixture(name="traced_app", scope="module")
+def traced_app_fixture(create_app: Callable[..., FastAPI]) -> FastAPI:
+    app = create_app(router, TRACING_EXPORTER="memory")
+    # Spans are exported to the exporter of each test, if any
+    TRACER.shutdown()
+    return app
+
+
+@pytest.fixture(name="exporter")
+def exporter_fixture(traced_app: FastAPI) -> Iterator[InMemorySpanExporter]:
+    exporter = InMemorySpanExporter()
+    TRACER.configure([exporter])
+    yield exporter
+    TRACER.shutdown()
+
+
+@pytest.fixture(name="client")
+def client_fixture(traced_app: FastAPI) -> TestClient:
+    return TestClient(traced_app)
+
+
+def _by_name(spans: List[Span]) -> Dict[str, Span]:
+    return {span.name: span for span in spans}
+
+
+def test_request_spans_nested(exporter: InMemorySpanExporter, client: TestClient) -> None:
+    r = client.get(f"{ITEMS}/3")
+
+    assert r.json() == {"item_id": 3}
+    spans = _by_name(exporter.spans)
+    middleware = [
+        "middleware TrustedHostMiddleware",
+        "middleware MetricsMiddleware",
+        "middleware CorrelationIdMiddleware",
+        "middleware StructlogLoggingMiddleware",
+    ]
+    assert set(spans) == {
+        "http.request",
+        *middleware,
+        "dependency get_connection",
+        "endpoint read_item",
+        "sql",
+    }
+    root = spans["http.request"]
+    assert root.parent_id is None
+    assert root.attributes == {
+        "method": "GET",
+        "path": f"{ITEMS}/3",
+        "request_id": r.headers["x-request-id"],
+        "status_code": 200,
+        "route": ITEMS + "/{item_id}",
+    }
+    # Middleware spans nested from the outermost one, inside the request span
+    parent = root
+    for name in middleware:
+        assert spans[name].parent_id == parent.span_id
+        parent = spans[name]
+    assert spans["dependency get_connection"].parent_id == parent.span_id
+    assert spans["endpoint read_item"].parent_id == parent.span_id
+    assert spans["sql"].parent_id == spans["endpoint read_item"].span_id
+    assert spans["sql"].attributes["statement"] == "SELECT ?"
+    assert all(span.end_time_ns is not None for span in exporter.spans)
+
+
+def test_request_id_recorded_not_used_as_trace_id(
+    exporter: InMemorySpanExporter, client: TestClient
+) -> None:
+    request_id = uuid.uuid4().hex
+
+    client.get(f"{ITEMS}/1", headers={"X-Request-ID": request_id})
+
+    (trace_id,) = {span.trace_id for span in exporter.spans}
+    assert trace_id != request_id
+    assert len(trace_id) == 32
+    assert _by_name(exporter.spans)["http.request"].attributes["request_id"] == request_id
+
+
+def test_dependency_overrides_still_apply(
+    exporter: InMemorySpanExporter, client: TestClient
+) -> None:
+    class FakeConnection:
+        def execute(self, *_: Any) -> Any:
+            return self
+
+        def scalar(self) -> int:
+            return 42
+
+    app: FastAPI = client.app  # type: ignore
+    app.dependency_overrides[get_connection] = FakeConnection
+    try:
+        r = client.get(f"{ITEMS}/1")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert r.json() == {"item_id": 42}
+    assert "sql" not in _by_name(exporter.spans)
+
+
+def test_error_recorded_on_span(exporter: InMemorySpanExporter) -> None:
+    with pytest.raises(ValueError):
+        with start_span("outer"):
+            with start_span("inner"):
+                raise ValueError("boom")
+
+    assert [(span.name, span.error) for span in exporter.spans] == [
+        ("outer", "ValueError"),
+        ("inner", "ValueError"),
+    ]
+
+
+def test_sql_outside_of_span_not_traced(exporter: InMemorySpanExporter) -> None:
+    with db_engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+    assert not exporter.spans
+
+
+def test_disabled_tracer_does_nothing(client: TestClient) -> None:
+    with start_span("noop") as span:
+        assert span is None
+
+    assert client.get(f"{ITEMS}/5").json() == {"item_id": 5}
+
+
+def test_file_exporter(tmp_path: Path) -> None:
+    path = tmp_path / "traces.jsonl"
+    TRACER.configure([FileSpanExporter(str(path))])
+    try:
+        with start_span("outer", user="alice"):
+            with start_span("inner"):
+                pass
+    finally:
+        TRACER.shutdown()
+
+    spans = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [span["name"] for span in spans] == ["outer", "inner"]
+    assert spans[0]["attributes"] == {"user": "alice"}
+    assert spans[1]["parent_id"] == spans[0]["span_id"]
+
+
+def test_encode_otlp_span(exporter: InMemorySpanExporter) -> None:
+    with start_span("outer", status_code=200, sampled=True, ratio=0.5, route="/items"):
+        with start_span("inner"):
+            pass
+
+    outer, inner = (encode_otlp_span(span) for span in exporter.spans)
+    assert len(outer["traceId"]) == 32 and len(outer["spanId"]) == 16
+    assert "parentSpanId" not in outer
+    assert inner["parentSpanId"] == outer["spanId"]
+    assert int(outer["endTimeUnixNano"]) >= int(outer["startTimeUnixNano"])
+    assert outer["attributes"] == [
+        {"key": "status_code", "value": {"intValue": "200"}},
+        {"key": "sampled", "value": {"boolValue": True}},
+        {"key": "ratio", "value": {"doubleValue": 0.5}},
+        {"key": "route", "value": {"stringValue": "/items"}},
+    ]
+    assert outer["status"] == {"code": 1}